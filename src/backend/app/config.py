@@ -7,16 +7,68 @@ from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
-class Settings(BaseSettings):
-    """App settings."""
+class ProfilingSettings(BaseSettings):
+    """
+    Settings of the in-process profilers (CSV, Parquet, semantic embeddings).
+    They need no database, so profiling a frame outside the app (scripts,
+    benchmarks) does not require DATABASE_URL; see `get_profiling_settings`.
+    """
+
+    # Profiling
+    PARQUET_BATCH_ROWS: int = 1_000_000  # rows of consecutive Parquet row groups decoded at once
+    CSV_MEMORY_BUDGET: int = 512 * 1024 * 1024  # peak bytes for parsing + profiling one CSV chunk
+    CSV_SAMPLE_ROWS: int = 10_000  # leading rows used to infer and lock CSV dtypes
+
+    # Semantic drift (services/semantic.py)
+    SEMANTIC_ENABLED: bool = True  # embed text values while profiling
+    SEMANTIC_MODEL: Optional[str] = None  # local sentence-transformers model (name or path); hashed n-grams if unset
+    SEMANTIC_DIMENSIONS: int = 256  # of the hashed n-gram embeddings
+    SEMANTIC_MAX_CHARS: int = 64  # leading characters of a value that are embedded
+    SEMANTIC_SAMPLE_VALUES: int = 1000  # most frequent distinct values embedded per profiled batch
+    SEMANTIC_BATCH_SIZE: int = 512  # values per embedding call
+    SEMANTIC_CACHE_SIZE: int = 20_000  # embeddings kept per process (LRU, keyed by value hash)
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=True,
+        extra="ignore",  # the app's other settings may share the environment / .env
+    )
+
+
+class Settings(ProfilingSettings):
+    """App settings (the profilers' included)."""
     
     # API
     API_TITLE: str = "Lineage Auditor API"
     API_VERSION: str = "0.1.0"
     DEBUG: bool = False
     
+    # Startup
+    SCHEMA_CHECK: str = "versioned"  # "always" migrate on boot, "versioned" only when models/migrations changed, "never"
+    FAST_STARTUP: bool = False  # warm the lineage index and re-queue interrupted jobs after startup, not before serving
+
     # Database
     DATABASE_URL: str
+    DB_POOL_MIN_SIZE: int = 2
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_ACQUIRE_TIMEOUT: float = 10.0
+    DB_COMMAND_TIMEOUT: float = 30.0
+    DB_STATEMENT_CACHE_SIZE: int = 256
+    DB_MAX_INACTIVE_CONNECTION_LIFETIME: float = 300.0
+    DB_BULK_BATCH_SIZE: int = 1000  # rows per multi-row INSERT statement
+    DB_BULK_COPY_THRESHOLD: int = 5000  # plain inserts this large without RETURNING use COPY
+
+    # List endpoints (keyset pagination / NDJSON streaming)
+    LIST_PAGE_SIZE: int = 100
+    LIST_MAX_PAGE_SIZE: int = 1000
+    LIST_STREAM_PREFETCH: int = 500  # rows fetched per server-side cursor round trip
+
+    # Response cache (services/cache.py)
+    CACHE_ENABLED: bool = True
+    CACHE_BACKEND: str = "memory"  # "memory" (per worker) or "postgres" (+ LISTEN/NOTIFY invalidation)
+    CACHE_TTL_SECONDS: float = 60.0
+    CACHE_MAX_ENTRIES: int = 4096
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
     
     # MinIO
     MINIO_ENDPOINT: str = "localhost:9000"
@@ -24,17 +76,64 @@ class Settings(BaseSettings):
     MINIO_SECRET_KEY: str = "minioadmin"
     MINIO_BUCKET: str = "datasets"
     MINIO_USE_SSL: bool = False
+    MINIO_PART_SIZE: int = 8 * 1024 * 1024
+    MINIO_PARALLEL_UPLOADS: int = 4  # multipart parts uploaded concurrently per object
+    MINIO_MAX_CONNECTIONS: int = 16  # HTTP connections kept by the shared MinIO client
+    STORAGE_READ_BLOCK_SIZE: int = 8 * 1024 * 1024  # bytes per ranged GET when reading stored files
+
+    # Uploads
+    UPLOAD_STREAMING: bool = False  # stream uploads to storage/profiler in chunks
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_BUFFER_SIZE: int = 16 * 1024 * 1024  # max bytes buffered per stage
+    DEDUP_ENABLED: bool = True  # reuse stored objects and profiles of identical uploads
+
+    # Background jobs
+    JOB_WORKERS: int = 2  # profiling processes
+    JOB_MAX_CONCURRENCY: int = 2  # jobs running at once
+    JOB_MAX_PENDING: int = 16  # queued + running jobs before uploads get 429
+    JOB_MAX_SPOOL_BYTES: int = 10 * 1024 * 1024 * 1024  # spooled upload bytes before 429
+    JOB_SPOOL_DIR: str = "storage/spool"
+    JOB_HEARTBEAT_SECONDS: float = 15.0  # how often a process renews its jobs (and claims orphaned ones)
+    JOB_LEASE_SECONDS: float = 60.0  # a job whose heartbeat is older than this is claimed by another process
+
+    # Lineage graph index
+    LINEAGE_GRAPH_REFRESH_SECONDS: float = 5.0  # catch up on edges written by other workers
+    LINEAGE_GRAPH_RELOAD_SECONDS: float = 300.0  # full reload (picks up deletions)
+    LINEAGE_TRAVERSAL_MODE: str = "memory"  # "memory" (graph index) or "db" (recursive CTE / closure)
+    LINEAGE_CLOSURE_ENABLED: bool = False  # maintain lineage_closure on edge writes
+    LINEAGE_MAX_DEPTH: int = 100  # hard cap for database-side traversal
+
+    # Root-cause ranking
+    ROOT_CAUSE_CACHE_SIZE: int = 1024  # memoized diagnoses, one per dataset
+    ROOT_CAUSE_VERSION_CHECK_SECONDS: float = 5.0  # how stale other workers' issues/edges may be
+    ROOT_CAUSE_TIME_DECAY_HOURS: float = 24.0  # upstream issue this much earlier weighs 1/e
+    ROOT_CAUSE_DEPTH_DECAY: float = 0.85  # per extra hop between culprit and dataset
     
+    # Scheduled detection (services/scheduler.py)
+    DETECTION_INTERVAL_SECONDS: float = 300.0  # between sweeps; 0 disables the scheduler
+    DETECTION_CONCURRENCY: int = 8  # datasets checked at once (each holds a pooled connection briefly)
+    DETECTION_BASELINE: str = "previous"  # "previous" profile or the dataset's "first" one
+    DETECTION_ALPHA: float = 0.05  # significance level of the drift tests
+    DETECTION_NULL_SPIKE_PCT: float = 5.0  # null-percentage points that count as a spike
+
+    # Metrics (utils/metrics.py, GET /metrics)
+    METRICS_ENABLED: bool = True  # time requests by route
+    METRICS_SLOW_REQUEST_SECONDS: float = 2.0  # log a stage breakdown of slower requests; 0 disables
+    METRICS_SLOW_SAMPLE_RATE: float = 1.0  # share of slow requests that are logged
+
     # Airflow (for lineage extraction)
 
     AIRFLOW_HOME: str = "/opt/airflow"
     AIRFLOW_DAGS_FOLDER: str = "/opt/airflow/dags"
+    AIRFLOW_LINEAGE_CACHE: str = "storage/airflow_lineage.json"  # parsed DAG files, keyed by mtime and hash
+    AIRFLOW_REGISTER_DATASETS: bool = True  # create datasets for URIs no dataset is named after
 
     VITE_API_URL: Optional[str] = None
 
     model_config = SettingsConfigDict(
         env_file=".env",
         case_sensitive=True,
+        extra="forbid",
     )
 
 
@@ -46,3 +145,18 @@ def get_settings() -> Settings:
     if _settings_instance is None:
         _settings_instance = Settings()
     return _settings_instance
+
+
+_profiling_settings_instance = None
+
+def get_profiling_settings() -> ProfilingSettings:
+    """
+    The profilers' settings: the app's once loaded, else read on their own
+    (from the same environment), so they do not require DATABASE_URL.
+    """
+    global _profiling_settings_instance
+    if _settings_instance is not None:
+        return _settings_instance
+    if _profiling_settings_instance is None:
+        _profiling_settings_instance = ProfilingSettings()
+    return _profiling_settings_instance
@@ -1,36 +1,153 @@
 """
 Database connection and session management.
-"""
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from app.config import get_settings
-settings = get_settings()
 
-from app.models.dataset import Base
+`init_db` creates missing tables and applies the added columns/indexes
+through SQLAlchemy. At startup `ensure_schema` runs it only when needed
+(SCHEMA_CHECK): a boot against a database whose recorded schema fingerprint
+matches this code's costs one query and does not import SQLAlchemy.
+"""
+import asyncio
+import hashlib
 import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
-# Create engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_pre_ping=True  # Verify connections before using
-)
+# Created on first use (see get_engine)
+_engine = None
+_session_factory = None
+
+
+def get_engine():
+    """The SQLAlchemy engine used for schema management."""
+    global _engine
+    if _engine is None:
+        from sqlalchemy import create_engine
+
+        settings = get_settings()
+        _engine = create_engine(
+            settings.DATABASE_URL,
+            echo=settings.DEBUG,
+            pool_pre_ping=True  # Verify connections before using
+        )
+    return _engine
+
+
+# Columns added to existing tables after their first release. create_all()
+# only creates missing tables, so these are added to older databases here.
+ADDED_COLUMNS = [
+    ("dataset_profiles", "sketches", "JSON"),
+    ("datasets", "content_hash", "VARCHAR"),
+    ("jobs", "content_hash", "VARCHAR"),
+    ("jobs", "owner", "VARCHAR"),
+    ("jobs", "heartbeat_at", "TIMESTAMP WITHOUT TIME ZONE"),
+]
+
+
+# Indexes added to existing tables after their first release; a tuple of
+# columns is a composite index (named like the models' __table_args__).
+ADDED_INDEXES = [
+    ("lineage", "source_dataset_id"),
+    ("lineage", "target_dataset_id"),
+    ("dataset_profiles", "dataset_id"),
+    ("issues", "dataset_id"),
+    ("datasets", "content_hash"),  # upload dedup (services/dedup.py)
+    # keyset pagination (utils/pagination.py)
+    ("datasets", ("created_at", "id")),
+    ("dataset_profiles", ("dataset_id", "created_at", "id")),
+    ("issues", ("detected_at", "id")),
+    ("issues", ("dataset_id", "detected_at", "id")),
+]
+
+TABLE_SCHEMA_VERSION = "schema_version"
+# sources that define what init_db creates
+SCHEMA_SOURCES = [Path(__file__).parent / "models" / "dataset.py", Path(__file__).parent / "models" / "enums.py"]
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _add_missing_columns():
+    from sqlalchemy import inspect, text
+
+    engine = get_engine()
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, ddl_type in ADDED_COLUMNS:
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+                logger.info("Added column %s.%s", table, column)
+
+
+def _add_missing_indexes():
+    from sqlalchemy import text
+
+    with get_engine().begin() as conn:
+        for table, columns in ADDED_INDEXES:
+            columns = (columns,) if isinstance(columns, str) else columns
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_{'_'.join(columns)} ON {table} ({', '.join(columns)})"
+            ))
 
 
 def init_db():
     """Initialize database (create tables)."""
-    Base.metadata.create_all(bind=engine)
+    from app.models.dataset import Base
+
+    Base.metadata.create_all(bind=get_engine())
+    _add_missing_columns()
+    _add_missing_indexes()
     logger.info("Database initialized")
 
 
-def get_db() -> Session:
+def schema_fingerprint() -> str:
+    """Hash of the models and the added columns/indexes: changes whenever init_db would."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in SCHEMA_SOURCES:
+        digest.update(path.read_bytes())
+    digest.update(repr((ADDED_COLUMNS, ADDED_INDEXES)).encode())
+    return digest.hexdigest()
+
+
+async def ensure_schema(mode: Optional[str] = None) -> bool:
+    """
+    Bring the schema up to date at startup. `mode` (default SCHEMA_CHECK):
+    "always" runs init_db, "versioned" runs it only when the fingerprint
+    recorded in schema_version differs from `schema_fingerprint()`, "never"
+    skips it. Returns whether init_db ran.
+    """
+    import asyncpg
+    from app.supabase_client import fetch, table_upsert
+
+    mode = mode or get_settings().SCHEMA_CHECK
+    if mode == "never":
+        return False
+    fingerprint = schema_fingerprint()
+    if mode == "versioned":
+        try:
+            rows = await fetch(f"SELECT fingerprint FROM {TABLE_SCHEMA_VERSION} WHERE id = 1")
+        except asyncpg.UndefinedTableError:
+            rows = []
+        if rows and rows[0]["fingerprint"] == fingerprint:
+            logger.info("Database schema up to date (%s)", fingerprint)
+            return False
+    await asyncio.to_thread(init_db)
+    await table_upsert(
+        TABLE_SCHEMA_VERSION, {"id": 1, "fingerprint": fingerprint, "applied_at": datetime.utcnow()}, returning="minimal"
+    )
+    return True
+
+
+def get_db():
     """Dependency for FastAPI to get DB session."""
-    db = SessionLocal()
+    global _session_factory
+    if _session_factory is None:
+        from sqlalchemy.orm import sessionmaker
+
+        _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    db = _session_factory()
     try:
         yield db
     finally:
@@ -1,12 +1,23 @@
 from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import logging
 import os
 
 from app.config import get_settings
-from app.routers import datasets, profiles, issues, lineage
-from app.database import init_db  # just import, don't call here
+from app.routers import datasets, profiles, issues, lineage, jobs, diagnosis, detection
+from app.database import ensure_schema
+from app.supabase_client import init_pool, close_pool, pool_stats
+from app.services.jobs import recover_jobs, shutdown_jobs, job_stats
+from app.services.lineage_graph import get_lineage_graph
+from app.services.lineage_db import ensure_closure
+from app.services.cache import start_cache, stop_cache, cache_stats
+from app.utils.storage import close_storage
+from app.services.dedup import dedup_stats
+from app.services.scheduler import start_scheduler, stop_scheduler, scheduler_stats
+from app.services.semantic import semantic_stats
+from app.utils.metrics import MetricsMiddleware, register_collector, render as render_metrics, CONTENT_TYPE
 
 settings = get_settings()
 
@@ -36,19 +47,71 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "X-Total-Count"],
 )
+# outermost, so request latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
+
+register_collector("db_pool", pool_stats)
+register_collector("cache", cache_stats)
+register_collector("dedup", dedup_stats)
+register_collector("jobs", job_stats)
+register_collector("detection", scheduler_stats)
+register_collector("semantic", semantic_stats)
 
 app.include_router(datasets.router, prefix="/api/datasets", tags=["datasets"])
 app.include_router(profiles.router, prefix="/api/profiles", tags=["profiles"])
 app.include_router(issues.router, prefix="/api/issues", tags=["issues"])
 app.include_router(lineage.router, prefix="/api/lineage", tags=["lineage"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(diagnosis.router, prefix="/api/diagnosis", tags=["diagnosis"])
+app.include_router(detection.router, prefix="/api/detection", tags=["detection"])
+
+
+_warm_up_task = None
+
+
+async def _warm_up() -> None:
+    await recover_jobs()
+    if settings.LINEAGE_TRAVERSAL_MODE == "memory":
+        await get_lineage_graph()  # warm the lineage index
+
+
+async def _warm_up_in_background() -> None:
+    started = asyncio.get_running_loop().time()
+    try:
+        await _warm_up()
+        logger.info("Warm-up finished in %.2fs", asyncio.get_running_loop().time() - started)
+    except Exception as e:
+        logger.error("Warm-up failed: %s", e, exc_info=True)
 
 
 @app.on_event("startup")
-def on_startup() -> None:
-    # This is where DB tables get created
-    init_db()
-    logger.info("Database initialized")
+async def on_startup() -> None:
+    global _warm_up_task
+    await init_pool()
+    # This is where DB tables get created (skipped while the schema is current, see SCHEMA_CHECK)
+    await ensure_schema()
+    await start_cache()
+    if settings.LINEAGE_CLOSURE_ENABLED:
+        await ensure_closure()
+    if settings.FAST_STARTUP:
+        # serve at once; requests meanwhile build the lineage index on demand
+        _warm_up_task = asyncio.get_running_loop().create_task(_warm_up_in_background())
+    else:
+        await _warm_up()
+    start_scheduler()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    if _warm_up_task is not None and not _warm_up_task.done():
+        _warm_up_task.cancel()
+    await stop_scheduler()
+    await shutdown_jobs()
+    await stop_cache()
+    await close_pool()
+    close_storage()
 
 
 @app.get("/", include_in_schema=False)
@@ -61,4 +124,28 @@ async def health_check():
     return {"status": "ok", "version": settings.API_VERSION}
 
 
+@app.get("/health/db")
+async def db_health():
+    """Connection pool saturation and acquire wait-time metrics."""
+    return pool_stats()
+
+
+@app.get("/health/cache")
+async def cache_health():
+    """Response cache hit/miss counters and size."""
+    return cache_stats()
+
+
+@app.get("/health/dedup")
+async def dedup_health():
+    """Upload dedup hit rate and bytes saved."""
+    return dedup_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Request, query and stage latencies plus the /health/* counters, in the Prometheus text format."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+
 logger.info(f"Lineage Auditor API initialized (v{settings.API_VERSION})")
@@ -1,11 +1,13 @@
 """
 Database models for datasets, profiles, issues, and lineage.
 """
-from sqlalchemy import Column, String, DateTime, Integer, Float, JSON, Boolean, ForeignKey, Enum, Text
+from sqlalchemy import Column, String, DateTime, Integer, Float, JSON, Boolean, ForeignKey, Enum, Text, Numeric, Index, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
-import enum
+
+# the enums live in app.models.enums, which does not import SQLAlchemy
+from app.models.enums import IssueType, IssueSeverity, JobStatus
 
 Base = declarative_base()
 
@@ -13,15 +15,17 @@ Base = declarative_base()
 class Dataset(Base):
     """Dataset table – stores dataset metadata."""
     __tablename__ = "datasets"
+    __table_args__ = (Index("ix_datasets_created_at_id", "created_at", "id"),)
     
     id = Column(String, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now())
     row_count = Column(Integer)
     column_count = Column(Integer)
     storage_path = Column(String)  # Path in MinIO
+    content_hash = Column(String, index=True)  # BLAKE2b-256 of the uploaded file (services/dedup.py)
     
     # Relationships
     profiles = relationship("DatasetProfile", back_populates="dataset", cascade="all, delete-orphan")
@@ -33,48 +37,36 @@ class Dataset(Base):
 class DatasetProfile(Base):
     """Dataset profile – stores statistics for a dataset snapshot."""
     __tablename__ = "dataset_profiles"
+    __table_args__ = (Index("ix_dataset_profiles_dataset_id_created_at_id", "dataset_id", "created_at", "id"),)
     
     id = Column(String, primary_key=True, index=True)
-    dataset_id = Column(String, ForeignKey("datasets.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    dataset_id = Column(String, ForeignKey("datasets.id"), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
     columns_metadata = Column(JSON)  # { "col_name": { "dtype": "int", "null_count": 10, ... } }
     statistics = Column(JSON)  # { "col_name": { "mean": 5.2, "std": 1.1, ... } }
     sample_rows = Column(JSON)  # First N rows for inspection
+    sketches = Column(JSON)  # Mergeable HLL/KLL/moment sketches (services/sketches.py)
     
     dataset = relationship("Dataset", back_populates="profiles")
 
 
-class IssueType(str, enum.Enum):
-    """Types of issues detected."""
-    SCHEMA_CHANGE = "schema_change"
-    DISTRIBUTION_DRIFT = "distribution_drift"
-    SEMANTIC_DRIFT = "semantic_drift"
-    NULL_SPIKE = "null_spike"
-    CARDINALITY_ANOMALY = "cardinality_anomaly"
-    LABEL_FLIP = "label_flip"
-
-
-class IssueSeverity(str, enum.Enum):
-    """Severity levels."""
-    LOW = "low"
-    MEDIUM = "medium"
-    HIGH = "high"
-    CRITICAL = "critical"
-
-
 class Issue(Base):
     """Issue table – detected data quality issues."""
     __tablename__ = "issues"
+    __table_args__ = (
+        Index("ix_issues_detected_at_id", "detected_at", "id"),
+        Index("ix_issues_dataset_id_detected_at_id", "dataset_id", "detected_at", "id"),
+    )
     
     id = Column(String, primary_key=True, index=True)
-    dataset_id = Column(String, ForeignKey("datasets.id"), nullable=False)
+    dataset_id = Column(String, ForeignKey("datasets.id"), nullable=False, index=True)
     issue_type = Column(Enum(IssueType), nullable=False)
     severity = Column(Enum(IssueSeverity), nullable=False)
     column_name = Column(String)
     description = Column(Text)
     evidence = Column(JSON)  # { "before": {...}, "after": {...}, "p_value": 0.001 }
-    detected_at = Column(DateTime, default=datetime.utcnow)
-    resolved = Column(Boolean, default=False)
+    detected_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    resolved = Column(Boolean, default=False, server_default="false")
     resolution_notes = Column(Text)
     
     dataset = relationship("Dataset", back_populates="issues")
@@ -85,12 +77,71 @@ class Lineage(Base):
     __tablename__ = "lineage"
     
     id = Column(String, primary_key=True, index=True)
-    source_dataset_id = Column(String, ForeignKey("datasets.id"), nullable=False)
-    target_dataset_id = Column(String, ForeignKey("datasets.id"), nullable=False)
+    source_dataset_id = Column(String, ForeignKey("datasets.id"), nullable=False, index=True)
+    target_dataset_id = Column(String, ForeignKey("datasets.id"), nullable=False, index=True)
     job_name = Column(String)  # Name of the job that produced target from source
     job_type = Column(String)  # "join", "aggregate", "filter", "transform", etc.
-    created_at = Column(DateTime, default=datetime.utcnow)
-    confidence = Column(Float, default=1.0)  # 0-1 confidence score
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    confidence = Column(Float, default=1.0, server_default="1.0")  # 0-1 confidence score
     
     source = relationship("Dataset", foreign_keys=[source_dataset_id], back_populates="lineage_targets")
     target = relationship("Dataset", foreign_keys=[target_dataset_id], back_populates="lineage_sources")
+
+
+class LineageClosure(Base):
+    """
+    Lineage closure table – one row per (ancestor, descendant, path length)
+    with the number of such paths, so edge deletions can be applied exactly.
+    """
+    __tablename__ = "lineage_closure"
+
+    ancestor_id = Column(String, primary_key=True)
+    descendant_id = Column(String, primary_key=True, index=True)
+    depth = Column(Integer, primary_key=True)
+    path_count = Column(Numeric, nullable=False, default=1)  # may exceed bigint in dense DAGs
+
+
+class Job(Base):
+    """Job table – background upload/profiling jobs."""
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    job_type = Column(String, nullable=False)  # "upload"
+    status = Column(String, nullable=False, default=JobStatus.QUEUED.value, server_default=JobStatus.QUEUED.value)
+    stage = Column(String)  # current/last stage: "queued", "profile", "storage", "persist", "done"
+    filename = Column(String)
+    name = Column(String)  # dataset name to create
+    spool_path = Column(String)  # upload spooled to disk, removed when the job ends
+    content_hash = Column(String)  # of the spooled file, computed while spooling
+    dataset_id = Column(String)
+    profile_id = Column(String)
+    error = Column(Text)
+    timings = Column(JSON)  # { "queued": 0.01, "profile": 1.2, "storage": 0.3, "persist": 0.05 }
+    owner = Column(String)  # process running the job (services/jobs.py WORKER_ID)
+    heartbeat_at = Column(DateTime)  # renewed by the owner; an expired one lets another process claim the job
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
+class DetectionState(Base):
+    """
+    Detection state – the (baseline, current) profile pair each dataset's
+    detectors last ran on, so scheduled sweeps skip unchanged datasets.
+    """
+    __tablename__ = "detection_state"
+
+    dataset_id = Column(String, ForeignKey("datasets.id"), primary_key=True)
+    baseline_profile_id = Column(String, nullable=False)
+    current_profile_id = Column(String, nullable=False)
+    issues_created = Column(Integer, nullable=False, default=0, server_default="0")
+    checked_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+
+
+class SchemaVersion(Base):
+    """Schema version – fingerprint of the models and migrations last applied (see database.ensure_schema)."""
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True)  # a single row, id 1
+    fingerprint = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
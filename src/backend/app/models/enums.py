@@ -0,0 +1,31 @@
+"""
+Enumerations shared by the models, schemas and services. Kept apart from
+app.models.dataset so that importing them does not import SQLAlchemy.
+"""
+import enum
+
+
+class IssueType(str, enum.Enum):
+    """Types of issues detected."""
+    SCHEMA_CHANGE = "schema_change"
+    DISTRIBUTION_DRIFT = "distribution_drift"
+    SEMANTIC_DRIFT = "semantic_drift"
+    NULL_SPIKE = "null_spike"
+    CARDINALITY_ANOMALY = "cardinality_anomaly"
+    LABEL_FLIP = "label_flip"
+
+
+class IssueSeverity(str, enum.Enum):
+    """Severity levels."""
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+    CRITICAL = "critical"
+
+
+class JobStatus(str, enum.Enum):
+    """Background job states."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
@@ -2,14 +2,23 @@
 """
 Datasets API router.
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.supabase_client import table_select, table_insert
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from app.supabase_client import table_select, table_insert, transaction
+from app.utils.pagination import list_response
 from app.schemas.dataset import DatasetCreate, DatasetResponse
+from app.schemas.job import JobResponse
+import json
 import uuid
+import asyncio
 import logging
-from io import BytesIO
-import pandas as pd
-from app.services.profiler import DatasetProfiler
+import tempfile
+from app.services.jobs import submit_upload, get_profile_executor, JobQueueFull
+from app.services.cache import cached_json, invalidate
+from app.services.dedup import new_hasher, find_by_hash, record_upload
+from app.utils.pagination import NDJSON_MEDIA_TYPE
+from app.utils.metrics import stage
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -19,89 +28,182 @@ TABLE_DATASETS = "datasets"
 router = APIRouter()
 
 
+async def save_dataset(
+    dataset_id: str,
+    name: str,
+    storage_path: str | None,
+    row_count: int,
+    column_count: int,
+    profile_data: dict,
+    content_hash: str | None = None,
+) -> tuple[dict, dict | None]:
+    """
+    Write the dataset row and its profile row on one connection in one
+    transaction; a failed profile insert only rolls back its savepoint.
+    Returns (dataset row, profile row or None).
+    """
+    from app.routers.profiles import create_profile
+
+    dataset_payload = {
+        "id": dataset_id,
+        "name": name,
+        "row_count": row_count,
+        "column_count": column_count,
+        "storage_path": storage_path,
+        "content_hash": content_hash,
+    }
+    async with transaction():
+        created_dataset = await table_insert(TABLE_DATASETS, dataset_payload)
+        created_profile = None
+        try:
+            created_profile = await create_profile(dataset_id, profile_data)
+        except Exception as e_prof:
+            logger.error("Profile creation failed: %s", e_prof)
+    await invalidate(dataset_id)
+    return created_dataset, created_profile
+
+
+DATASET_FIELDS = {
+    name: name
+    for name in (
+        "id", "name", "description", "row_count", "column_count", "storage_path", "content_hash",
+        "created_at", "updated_at",
+    )
+}
+
+
 @router.get("/", response_model=list[DatasetResponse])
-async def list_datasets():
-    """List all datasets."""
-    rows = await table_select(TABLE_DATASETS, columns="id,name,row_count,column_count,storage_path,created_at")
-    return rows
+async def list_datasets(
+    limit: int | None = Query(None, ge=1),
+    cursor: str | None = None,
+    fields: str | None = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """
+    List datasets, newest first.
+
+    - limit / cursor: page size and the X-Next-Cursor of the previous page
+      (neither: every row in one array)
+    - fields: comma-separated columns to return (default: DatasetResponse)
+    - format: "ndjson" streams all remaining rows, one per line
+    """
+    return await list_response(
+        TABLE_DATASETS, DATASET_FIELDS, DatasetResponse.model_fields,
+        fields=fields, limit=limit, cursor=cursor, format=format,
+    )
+
+
+async def _spool_upload(file: UploadFile, spool) -> tuple[int, str]:
+    """Copy an upload to `spool` chunk by chunk, hashing it on the way; returns (size, content hash)."""
+    chunk_size = get_settings().UPLOAD_CHUNK_SIZE
+    hasher = new_hasher()
+    size = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        hasher.update(chunk)
+        size += len(chunk)
+        await asyncio.to_thread(spool.write, chunk)
+    await asyncio.to_thread(spool.flush)
+    return size, hasher.hexdigest()
+
+
+async def _store_and_profile(dataset_id: str, filename: str, path: str, content_hash: str):
+    """Store and profile a spooled upload; returns (storage_path, profile, row_count, column_count)."""
+    # the profilers (pandas, pyarrow) are imported on first upload, not at startup
+    from app.services.csv_profiler import ChunkedCSVProfiler
+    from app.services.parquet_profiler import profile_parquet
+    from app.utils.storage import store_file
+
+    # CSV is profiled in memory-bounded chunks and Parquet from its footer and
+    # row groups, both read from the spool; the transfer to MinIO (multipart,
+    # from the same file) runs meanwhile. Storage and profiling happen before
+    # any DB work so the pooled connection is only held for the writes themselves.
+    async def profile():
+        with stage("profile"):
+            if filename.endswith(".csv"):
+                return await asyncio.to_thread(ChunkedCSVProfiler.profile, path)
+            return await profile_parquet(path, get_profile_executor())
+
+    async def store():
+        with stage("store"):
+            return await asyncio.to_thread(store_file, dataset_id, filename, path, content_hash)
+
+    profiled, storage_path = await asyncio.gather(profile(), store(), return_exceptions=True)
+    if isinstance(profiled, BaseException):
+        raise profiled
+    if isinstance(storage_path, BaseException):
+        # If even the fallback failed unexpectedly, log and continue;
+        # the dataset row is written with storage_path None
+        logger.error("Storage error (both MinIO and fallback): %s", storage_path)
+        storage_path = None
+    return storage_path, profiled["profile"], profiled["row_count"], profiled["column_count"]
 
 
 @router.post("/upload", response_model=DatasetResponse)
 async def upload_dataset(
     file: UploadFile = File(...),
     name: str | None = None,
+    streaming: bool | None = None,
 ):
-    """Upload a CSV/Parquet dataset."""
+    """
+    Upload a CSV/Parquet dataset.
+
+    With `streaming` (default: UPLOAD_STREAMING) the file is copied to storage
+    and profiled in chunks as it arrives; otherwise it is spooled to a
+    temporary file, then stored and profiled from there (CSV within
+    CSV_MEMORY_BUDGET). Neither reads the file into memory whole.
+    Re-uploading identical content creates a new dataset that shares the
+    stored object and a copy of the earlier profile.
+    """
     try:
         if name is None:
             name = file.filename
 
-        # Read file into memory
-        contents = await file.read()
-
-        # Parse into DataFrame
-        if file.filename.endswith(".csv"):
-            df = pd.read_csv(BytesIO(contents))
-        elif file.filename.endswith(".parquet"):
-            df = pd.read_parquet(BytesIO(contents))
-        else:
+        if not file.filename.endswith((".csv", ".parquet")):
             raise HTTPException(status_code=400, detail="Only CSV and Parquet supported")
 
-        # Create dataset record (storage_path set later)
         dataset_id = str(uuid.uuid4())
-        dataset_payload = {
-            "id": dataset_id,
-            "name": name,
-            "row_count": len(df),
-            "column_count": len(df.columns),
-            "storage_path": None,
-        }
-
-        # Insert dataset row via Supabase
-        inserted_dataset = await table_insert(TABLE_DATASETS, dataset_payload)
-        # Supabase returns list representation
-        created_dataset = inserted_dataset[0] if isinstance(inserted_dataset, list) and inserted_dataset else inserted_dataset
-
-        # Try to upload to MinIO; fallback to local
-        try:
-            from app.utils.storage import upload_to_minio, save_local_file
-            try:
-                storage_path = upload_to_minio(dataset_id, file.filename, contents)
-                logger.info("Uploaded to MinIO: %s", storage_path)
-            except Exception as e_minio:
-                # MinIO failed — save locally and log the error
-                logger.warning("MinIO upload failed: %s. Saving local copy.", e_minio)
-                storage_path = save_local_file(dataset_id, file.filename, contents)
-                logger.info("Saved local fallback: %s", storage_path)
-
-            # persist storage_path on dataset row via update
-            # Supabase PATCH via table_update (not included here to keep small) — do a simple update call:
-            try:
-                # Update storage_path field
-                from app.supabase_client import table_update
-                updated = await table_update(
-                    TABLE_DATASETS,
-                    {"storage_path": storage_path},
-                    filters=f"id=eq.{dataset_id}"
-                )
-                if isinstance(updated, list) and updated:
-                    created_dataset = updated[0]
-            except Exception as e_up:
-                logger.warning("Failed to persist storage_path to dataset row: %s", e_up)
-
-        except Exception as e_storage:
-            # If even the fallback failed unexpectedly, log and continue profiling
-            logger.error("Storage error (both MinIO and fallback): %s", e_storage)
-            # We still proceed, dataset exists but storage_path is None
-
-        # Profile it
-        profile_data = DatasetProfiler.profile(df)
-        # Create profile row using helper from profiles router (or call directly)
-        from app.routers.profiles import create_profile
-        try:
-            created_profile = await create_profile(dataset_id, profile_data)
-        except Exception as e_prof:
-            logger.error("Profile creation failed: %s", e_prof)
+        if streaming is None:
+            streaming = get_settings().UPLOAD_STREAMING
+
+        if streaming:
+            from app.services.ingestion import ingest_upload
+
+            ingested = await ingest_upload(file, dataset_id)
+            storage_path = ingested["storage_path"]
+            content_hash = ingested["content_hash"]
+            profile_data = ingested["profile"]
+            row_count = ingested["row_count"]
+            column_count = ingested["column_count"]
+        else:
+            # Spool to disk (hashing as it is copied) rather than into memory
+            suffix = ".csv" if file.filename.endswith(".csv") else ".parquet"
+            with tempfile.NamedTemporaryFile(suffix=suffix) as spool:
+                with stage("read"):
+                    size, content_hash = await _spool_upload(file, spool)
+
+                # Same bytes as an earlier upload: reuse its stored object and profile
+                with stage("dedup_lookup"):
+                    existing = await find_by_hash(content_hash)
+                record_upload(size, hit=existing is not None, profile_reused=existing is not None)
+                if existing is not None:
+                    logger.info("Upload of %s matches dataset %s; reusing its object and profile",
+                                file.filename, existing["dataset_id"])
+                    storage_path = existing["storage_path"]
+                    profile_data = existing["profile"]
+                    row_count = existing["row_count"]
+                    column_count = existing["column_count"]
+                else:
+                    storage_path, profile_data, row_count, column_count = await _store_and_profile(
+                        dataset_id, file.filename, spool.name, content_hash
+                    )
+
+        with stage("db_insert"):
+            created_dataset, _ = await save_dataset(
+                dataset_id, name, storage_path, row_count, column_count, profile_data, content_hash
+            )
 
         logger.info(f"Dataset {dataset_id} uploaded and profiled (storage_path={created_dataset.get('storage_path')})")
         # return dataset object in same shape as DatasetResponse expects
@@ -114,12 +216,123 @@ async def upload_dataset(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/upload/async", response_model=JobResponse, status_code=202)
+async def upload_dataset_async(file: UploadFile = File(...), name: str | None = None):
+    """
+    Upload a CSV/Parquet dataset for background profiling.
+
+    Returns the queued job at once; poll GET /api/jobs/{id} for its status
+    and the resulting dataset/profile ids. Answers 429 when the job queue
+    or upload spool is full.
+    """
+    if not file.filename.endswith((".csv", ".parquet")):
+        raise HTTPException(status_code=400, detail="Only CSV and Parquet supported")
+    try:
+        return await submit_upload(file, name)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Job queue full: {e}", headers={"Retry-After": "5"})
+    except Exception as e:
+        logger.error(f"Upload error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{dataset_id}", response_model=DatasetResponse)
-async def get_dataset(dataset_id: str):
+async def get_dataset(dataset_id: str, request: Request):
     """
-    Return dataset metadata by id.
+    Return dataset metadata by id (cached, with ETag).
     """
-    row = await table_select(TABLE_DATASETS, columns="id,name,row_count,column_count,storage_path,created_at", filters=f"id=eq.{dataset_id}", params={"limit":"1"})
-    if not row:
+    async def build():
+        row = await table_select(TABLE_DATASETS, columns="id,name,description,row_count,column_count,storage_path,content_hash,created_at,updated_at", filters=f"id=eq.{dataset_id}", params={"limit":"1"})
+        if not row:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+        return DatasetResponse.model_validate(row[0])
+
+    return await cached_json(request, [dataset_id], build)
+
+
+NEXT_OFFSET_HEADER = "X-Next-Offset"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def _dumps_row(row) -> str:
+    return json.dumps(row, default=str, separators=(",", ":"))
+
+
+@router.get("/{dataset_id}/rows")
+async def get_dataset_rows(
+    dataset_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int | None = Query(None, ge=1),
+    columns: str | None = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """
+    Rows of the stored file, read lazily from MinIO or the local fallback.
+
+    - offset / limit: page start and size (default LIST_PAGE_SIZE, capped at
+      LIST_MAX_PAGE_SIZE); X-Next-Offset is the next page's offset and is
+      absent on the last page, X-Total-Count is set for Parquet and locally
+      stored Arrow
+    - columns: comma-separated columns to return (default: all)
+    - format: "ndjson" streams rows from `offset` (all of them without a limit)
+    """
+    from app.services.dataset_reader import DatasetReader
+
+    settings = get_settings()
+    rows = await table_select(TABLE_DATASETS, columns="storage_path", filters=f"id=eq.{dataset_id}", params={"limit": "1"})
+    if not rows:
         raise HTTPException(status_code=404, detail="Dataset not found")
-    return row[0]
+    storage_path = rows[0]["storage_path"]
+    if not storage_path:
+        raise HTTPException(status_code=404, detail="Dataset has no stored file")
+    try:
+        reader = DatasetReader(storage_path)
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    names = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+
+    def open_page(page_limit):
+        """Validate the projection and decode the first batch (in a worker thread)."""
+        batches = reader.batches(offset, page_limit, names)
+        return batches, next(batches, [])
+
+    page_limit = limit if format == "ndjson" else min(limit or settings.LIST_PAGE_SIZE, settings.LIST_MAX_PAGE_SIZE)
+    # one row past the page tells whether there is a next page
+    try:
+        batches, first = await asyncio.to_thread(open_page, page_limit if format == "ndjson" else page_limit + 1)
+    except FileNotFoundError:
+        reader.close()
+        raise HTTPException(status_code=404, detail="Stored file not found")
+    except KeyError as e:
+        reader.close()
+        raise HTTPException(status_code=400, detail=e.args[0])
+    except Exception as e:
+        reader.close()
+        logger.error("Reading %s failed: %s", storage_path, e)
+        raise HTTPException(status_code=503, detail="Could not read stored file")
+
+    if format == "ndjson":
+        def lines():
+            # a sync generator: Starlette iterates it in its thread pool
+            try:
+                batch = first
+                while batch:
+                    yield "".join(_dumps_row(row) + "\n" for row in batch)
+                    batch = next(batches, None)
+            finally:
+                reader.close()
+
+        return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+    try:
+        page = first + [row for batch in await asyncio.to_thread(list, batches) for row in batch]
+        total = await asyncio.to_thread(reader.row_count)
+    finally:
+        reader.close()
+    headers = {}
+    if len(page) > page_limit:
+        page = page[:page_limit]
+        headers[NEXT_OFFSET_HEADER] = str(offset + page_limit)
+    if total is not None:
+        headers[TOTAL_COUNT_HEADER] = str(total)
+    return Response("[" + ",".join(_dumps_row(row) for row in page) + "]", media_type="application/json", headers=headers)
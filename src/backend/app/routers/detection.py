@@ -0,0 +1,26 @@
+# src/backend/app/routers/detection.py
+"""
+Detection API router.
+"""
+from fastapi import APIRouter, HTTPException, Query
+from app.services.scheduler import run_sweep, scheduler_stats
+
+router = APIRouter()
+
+
+@router.post("/sweep")
+async def sweep(force: bool = Query(False, description="Re-check datasets whose profiles did not change")):
+    """
+    Run detection now on every dataset whose baseline/newest profile pair
+    changed since its last check, and return the sweep summary.
+    """
+    try:
+        return await run_sweep(force=force)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/status")
+async def status():
+    """Scheduler state, cumulative counters and the last sweep's summary."""
+    return scheduler_stats()
@@ -0,0 +1,25 @@
+# src/backend/app/routers/diagnosis.py
+"""
+Diagnosis API router.
+"""
+from fastapi import APIRouter, Query
+from app.services.root_cause import diagnose
+
+router = APIRouter()
+
+
+@router.get("/{dataset_id}")
+async def get_root_causes(
+    dataset_id: str,
+    max_depth: int | None = Query(None, ge=1),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """
+    Upstream datasets ranked as likely causes of a dataset's open issues.
+
+    Each culprit carries its score, normalized likelihood, most confident
+    lineage path and the issue pairs behind the score. Results are cached
+    until issues or lineage edges change.
+    """
+    result = await diagnose(dataset_id, max_depth=max_depth)
+    return {**result, "culprits": result["culprits"][:limit]}
@@ -2,9 +2,15 @@
 """
 Issues API router.
 """
-from fastapi import APIRouter, HTTPException
-from app.supabase_client import table_select
-from app.schemas.issue import IssueResponse
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, HTTPException, Query
+from app.supabase_client import table_insert_many
+from app.utils.pagination import list_response
+from app.schemas.issue import IssueCreate, IssueResponse, IssueBulkResponse
+import asyncpg
+import uuid
 
 # Adjust table name if different
 TABLE_ISSUES = "issues"
@@ -12,16 +18,91 @@ TABLE_ISSUES = "issues"
 router = APIRouter()
 
 
+ISSUE_FIELDS = {
+    name: name
+    for name in ("id", "dataset_id", "column_name", "description", "evidence", "detected_at", "resolved", "resolution_notes")
+}
+# the Postgres enums hold member names; the API uses the (lower-case) values
+ISSUE_FIELDS.update(issue_type="lower(issue_type::text)", severity="lower(severity::text)")
+ISSUE_ORDER = ("detected_at", "id")
+
+
 @router.get("/", response_model=list[IssueResponse])
-async def list_issues():
-    """List all detected issues."""
-    rows = await table_select(TABLE_ISSUES, columns="id,dataset_id,issue_type,details,detected_at", params={"order":"detected_at.desc"})
-    return rows
+async def list_issues(
+    limit: int | None = Query(None, ge=1),
+    cursor: str | None = None,
+    fields: str | None = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """
+    List detected issues, newest first.
+
+    - limit / cursor: page size and the X-Next-Cursor of the previous page
+      (neither: every row in one array)
+    - fields: comma-separated columns to return (default: IssueResponse)
+    - format: "ndjson" streams all remaining rows, one per line
+    """
+    return await list_response(
+        TABLE_ISSUES, ISSUE_FIELDS, IssueResponse.model_fields,
+        fields=fields, order_by=ISSUE_ORDER, limit=limit, cursor=cursor, format=format,
+    )
 
 
 @router.get("/dataset/{dataset_id}", response_model=list[IssueResponse])
-async def get_dataset_issues(dataset_id: str):
-    """Get issues for a specific dataset."""
-    filters = f"dataset_id=eq.{dataset_id}"
-    rows = await table_select(TABLE_ISSUES, columns="id,dataset_id,issue_type,details,detected_at", filters=filters, params={"order":"detected_at.desc"})
-    return rows
+async def get_dataset_issues(
+    dataset_id: str,
+    limit: int | None = Query(None, ge=1),
+    cursor: str | None = None,
+    fields: str | None = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """Get issues for a specific dataset (paginated like list_issues)."""
+    return await list_response(
+        TABLE_ISSUES, ISSUE_FIELDS, IssueResponse.model_fields, filters=f"dataset_id=eq.{dataset_id}",
+        fields=fields, order_by=ISSUE_ORDER, limit=limit, cursor=cursor, format=format,
+    )
+
+
+@router.post("/bulk", response_model=IssueBulkResponse, status_code=201)
+async def create_issues_bulk(issues: List[IssueCreate]):
+    """Record many issues (e.g. one drift run's findings) in one transaction."""
+    try:
+        ids = await insert_issues([issue.model_dump() for issue in issues])
+    except asyncpg.ForeignKeyViolationError:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return {"inserted": len(ids), "ids": ids}
+
+
+def _utc_naive(value: Any) -> Any:
+    """`detected_at` is a timestamp without time zone, in UTC."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+async def insert_issues(issues: List[Dict[str, Any]]) -> List[str]:
+    """
+    Helper to bulk insert issues (dicts shaped like IssueCreate). Not an
+    endpoint by itself. Returns the new issue ids.
+    """
+    from app.services.root_cause import invalidate_root_causes
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "dataset_id": issue["dataset_id"],
+            # the Postgres enum holds member names
+            "issue_type": getattr(issue["issue_type"], "name", issue["issue_type"]),
+            "severity": getattr(issue.get("severity"), "name", issue.get("severity") or "MEDIUM"),
+            "column_name": issue.get("column_name"),
+            "description": issue.get("description"),
+            "evidence": issue.get("evidence") or {},
+            "detected_at": _utc_naive(issue.get("detected_at")) or now,
+        }
+        for issue in issues
+    ]
+    if rows:
+        await table_insert_many(TABLE_ISSUES, rows, returning="minimal")
+        invalidate_root_causes()
+    return [row["id"] for row in rows]
@@ -0,0 +1,24 @@
+# src/backend/app/routers/jobs.py
+"""
+Jobs API router.
+"""
+from fastapi import APIRouter, HTTPException
+from app.schemas.job import JobResponse
+from app.services.jobs import get_job, job_stats
+
+router = APIRouter()
+
+
+@router.get("/stats")
+async def get_job_stats():
+    """Queue depth and spool usage of this worker."""
+    return job_stats()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job_status(job_id: str):
+    """Status, stage timings and resulting dataset/profile ids of a job."""
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
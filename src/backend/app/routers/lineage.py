@@ -2,8 +2,21 @@
 """
 Lineage API router.
 """
-from fastapi import APIRouter
-from app.supabase_client import table_select
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import List
+from app.supabase_client import table_select, table_insert, table_insert_many, table_delete, transaction
+from app.schemas.lineage import LineageCreate, LineageResponse, LineageBulkResponse
+from app.services.lineage_graph import record_edge, forget_edge, UPSTREAM, DOWNSTREAM
+from app.services.lineage_db import (
+    query_lineage, closure_add_edge, closure_remove_edge, rebuild_closure, LineageCycleError,
+)
+from app.services.root_cause import invalidate_root_causes
+from app.services.airflow_lineage import scan_dags
+from app.services.cache import cached_json, invalidate
+from app.config import get_settings
+import asyncpg
+import uuid
+import time
 
 # Adjust table name if different
 TABLE_LINEAGE = "lineage"
@@ -12,8 +25,12 @@ router = APIRouter()
 
 
 @router.get("/{dataset_id}")
-async def get_lineage(dataset_id: str):
-    """Get lineage (upstream and downstream) for a dataset."""
+async def get_lineage(dataset_id: str, request: Request):
+    """Get lineage (upstream and downstream) for a dataset (cached, with ETag)."""
+    return await cached_json(request, [dataset_id], lambda: _direct_lineage(dataset_id))
+
+
+async def _direct_lineage(dataset_id: str) -> dict:
     # Upstream (sources): target_dataset_id == dataset_id
     upstream = await table_select(TABLE_LINEAGE, columns="source_dataset_id,job_name,job_type", filters=f"target_dataset_id=eq.{dataset_id}")
     # Downstream (targets): source_dataset_id == dataset_id
@@ -38,3 +55,113 @@ async def get_lineage(dataset_id: str):
             for edge in downstream
         ],
     }
+
+
+@router.post("/", response_model=LineageResponse, status_code=201)
+async def create_lineage(edge: LineageCreate):
+    """Record that `target_dataset_id` is produced from `source_dataset_id`."""
+    payload = {"id": str(uuid.uuid4()), **edge.model_dump()}
+    try:
+        async with transaction():
+            row = await table_insert(TABLE_LINEAGE, payload)
+            if get_settings().LINEAGE_CLOSURE_ENABLED:
+                await closure_add_edge(row["source_dataset_id"], row["target_dataset_id"])
+    except asyncpg.ForeignKeyViolationError:
+        raise HTTPException(status_code=404, detail="Source or target dataset not found")
+    except LineageCycleError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    record_edge(row)
+    invalidate_root_causes()
+    await invalidate(row["source_dataset_id"], row["target_dataset_id"])
+    return row
+
+
+@router.post("/bulk", response_model=LineageBulkResponse, status_code=201)
+async def create_lineage_bulk(edges: List[LineageCreate]):
+    """
+    Record many lineage edges (e.g. from a DAG scan) in one transaction;
+    a missing dataset or a cycle rejects the whole batch.
+    """
+    payload = [{"id": str(uuid.uuid4()), **edge.model_dump()} for edge in edges]
+    try:
+        async with transaction():
+            rows = await table_insert_many(TABLE_LINEAGE, payload)
+            if get_settings().LINEAGE_CLOSURE_ENABLED:
+                for row in rows:
+                    await closure_add_edge(row["source_dataset_id"], row["target_dataset_id"])
+    except asyncpg.ForeignKeyViolationError:
+        raise HTTPException(status_code=404, detail="Source or target dataset not found")
+    except LineageCycleError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    for row in rows:
+        record_edge(row)
+    invalidate_root_causes()
+    await invalidate(*(row[key] for row in rows for key in ("source_dataset_id", "target_dataset_id")))
+    return {"inserted": len(rows), "ids": [row["id"] for row in rows]}
+
+
+@router.delete("/{edge_id}", response_model=LineageResponse)
+async def delete_lineage(edge_id: str):
+    """Delete a lineage edge."""
+    async with transaction():
+        rows = await table_delete(TABLE_LINEAGE, filters=f"id=eq.{edge_id}")
+        if rows and get_settings().LINEAGE_CLOSURE_ENABLED:
+            await closure_remove_edge(rows[0]["source_dataset_id"], rows[0]["target_dataset_id"])
+    if not rows:
+        raise HTTPException(status_code=404, detail="Lineage edge not found")
+    forget_edge(edge_id)
+    invalidate_root_causes()
+    await invalidate(rows[0]["source_dataset_id"], rows[0]["target_dataset_id"])
+    return rows[0]
+
+
+@router.post("/closure/rebuild")
+async def rebuild_lineage_closure():
+    """Recompute the lineage closure table from the lineage table."""
+    try:
+        return {"rows": await rebuild_closure()}
+    except LineageCycleError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/airflow/scan")
+async def scan_airflow_dags(force: bool = Query(False, description="Re-parse files the cache says are unchanged")):
+    """
+    Extract lineage from the DAG files in AIRFLOW_DAGS_FOLDER (parsed
+    statically, only changed files) and upsert it as lineage edges.
+    """
+    try:
+        return await scan_dags(force=force)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/{dataset_id}/graph")
+async def get_lineage_graph_for(
+    dataset_id: str,
+    direction: str = Query("both", pattern="^(upstream|downstream|both)$"),
+    max_depth: int | None = Query(None, ge=1),
+    job_types: str | None = None,
+    paths: bool = False,
+    mode: str | None = Query(None, pattern="^(memory|db)$"),
+):
+    """
+    Transitive lineage of a dataset.
+
+    - direction: upstream, downstream or both
+    - max_depth: hops to follow (default: unlimited)
+    - job_types: comma-separated job types to follow (default: all)
+    - paths: include each node's path from `dataset_id`
+    - mode: "memory" (graph index) or "db" (closure table / recursive CTE);
+      default LINEAGE_TRAVERSAL_MODE
+    """
+    started = time.perf_counter()
+    mode = mode or get_settings().LINEAGE_TRAVERSAL_MODE
+    types = [t for t in job_types.split(",") if t] if job_types else None
+    directions = [UPSTREAM, DOWNSTREAM] if direction == "both" else [direction]
+
+    result = {"dataset_id": dataset_id, "mode": mode}
+    for d in directions:
+        result[d] = await query_lineage(dataset_id, d, max_depth=max_depth, job_types=types, paths=paths, mode=mode)
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
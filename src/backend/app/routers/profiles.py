@@ -2,9 +2,11 @@
 """
 Profiles API router.
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from app.supabase_client import table_select, table_insert
+from app.utils.pagination import list_response
 from app.schemas.dataset import DatasetProfileResponse
+from app.services.cache import cached_json, invalidate
 import uuid
 
 # Adjust this if your table name differs
@@ -13,23 +15,95 @@ TABLE_PROFILES = "dataset_profiles"
 router = APIRouter()
 
 
+PROFILE_FIELDS = {
+    name: name
+    for name in ("id", "dataset_id", "created_at", "columns_metadata", "statistics", "sample_rows", "sketches")
+}
+
+
 @router.get("/{dataset_id}", response_model=list[DatasetProfileResponse])
-async def get_profiles(dataset_id: str):
-    """Get all profiles for a dataset."""
-    # select columns - include JSON fields as stored
-    filters = f"dataset_id=eq.{dataset_id}"
-    rows = await table_select(TABLE_PROFILES, columns="id,dataset_id,columns_metadata,statistics,sample_rows,created_at", filters=filters, params={"order":"created_at.desc"})
-    return rows
+async def get_profiles(
+    dataset_id: str,
+    limit: int | None = Query(None, ge=1),
+    cursor: str | None = None,
+    fields: str | None = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """
+    Get a dataset's profiles, newest first.
+
+    - limit / cursor: page size and the X-Next-Cursor of the previous page
+      (neither: every row in one array)
+    - fields: comma-separated columns to return (default: DatasetProfileResponse;
+      e.g. `fields=id,created_at` skips the JSON payloads)
+    - format: "ndjson" streams all remaining rows, one per line
+    """
+    return await list_response(
+        TABLE_PROFILES, PROFILE_FIELDS, DatasetProfileResponse.model_fields, filters=f"dataset_id=eq.{dataset_id}",
+        fields=fields, limit=limit, cursor=cursor, format=format,
+    )
 
 
 @router.get("/{dataset_id}/latest", response_model=DatasetProfileResponse)
-async def get_latest_profile(dataset_id: str):
-    """Get latest profile for a dataset."""
-    filters = f"dataset_id=eq.{dataset_id}"
-    rows = await table_select(TABLE_PROFILES, columns="id,dataset_id,columns_metadata,statistics,sample_rows,created_at", filters=filters, params={"order":"created_at.desc", "limit":"1"})
-    if not rows:
+async def get_latest_profile(dataset_id: str, request: Request):
+    """Get latest profile for a dataset (cached, with ETag)."""
+    async def build():
+        filters = f"dataset_id=eq.{dataset_id}"
+        rows = await table_select(TABLE_PROFILES, columns="id,dataset_id,columns_metadata,statistics,created_at", filters=filters, params={"order":"created_at.desc", "limit":"1"})
+        if not rows:
+            raise HTTPException(status_code=404, detail="No profile found")
+        return DatasetProfileResponse.model_validate(rows[0])
+
+    return await cached_json(request, [dataset_id], build)
+
+
+@router.get("/{dataset_id}/drift")
+async def get_profile_drift(
+    dataset_id: str,
+    baseline_profile_id: str | None = None,
+    current_profile_id: str | None = None,
+    alpha: float = 0.05,
+):
+    """
+    Distribution drift between two profiles, from their stored sketches:
+    KS/PSI/Wasserstein per numeric column, chi-square/Jensen-Shannon per
+    categorical column and embedding-centroid distance per text column.
+
+    Defaults to the dataset's latest profile against the one before it;
+    `baseline_profile_id` may belong to another dataset (e.g. a lineage source).
+    """
+    columns = "id,dataset_id,sketches,created_at"
+    if current_profile_id:
+        current = await table_select(TABLE_PROFILES, columns=columns, filters=f"id=eq.{current_profile_id}&dataset_id=eq.{dataset_id}", params={"limit": 1})
+    else:
+        current = await table_select(TABLE_PROFILES, columns=columns, filters=f"dataset_id=eq.{dataset_id}", params={"order": "created_at.desc", "limit": 2})
+    if baseline_profile_id:
+        baseline = await table_select(TABLE_PROFILES, columns=columns, filters=f"id=eq.{baseline_profile_id}", params={"limit": 1})
+    elif current_profile_id:
+        # the profile created before the requested one
+        history = await table_select(TABLE_PROFILES, columns=columns, filters=f"dataset_id=eq.{dataset_id}", params={"order": "created_at.desc"})
+        ids = [row["id"] for row in history]
+        baseline = history[ids.index(current_profile_id) + 1:][:1] if current_profile_id in ids else []
+    else:
+        baseline = current[1:]
+
+    if not current:
         raise HTTPException(status_code=404, detail="No profile found")
-    return rows[0]
+    if not baseline:
+        raise HTTPException(status_code=404, detail="No baseline profile to compare against")
+    current, baseline = current[0], baseline[0]
+    if not current.get("sketches") or not baseline.get("sketches"):
+        raise HTTPException(status_code=422, detail="Profiles have no stored sketches; re-profile the dataset")
+
+    from app.services.drift import DriftEngine  # scipy, on first use
+
+    return {
+        "baseline_profile_id": baseline["id"],
+        "current_profile_id": current["id"],
+        "columns": DriftEngine.compare(baseline, current, alpha=alpha),
+        "categorical": DriftEngine.compare_categorical(baseline, current, alpha=alpha),
+        "semantic": DriftEngine.compare_semantic(baseline, current, alpha=alpha),
+    }
 
 
 # If you had endpoints that create profiles, keep the logic but use table_insert:
@@ -43,7 +117,9 @@ async def create_profile(dataset_id: str, profile_payload: dict):
         "columns_metadata": profile_payload.get("columns_metadata"),
         "statistics": profile_payload.get("statistics"),
         "sample_rows": profile_payload.get("sample_rows"),
+        "sketches": profile_payload.get("sketches"),
     }
     inserted = await table_insert(TABLE_PROFILES, payload)
+    await invalidate(dataset_id)
     # table_insert returns a list when representation is returned
     return inserted[0] if isinstance(inserted, list) and inserted else inserted
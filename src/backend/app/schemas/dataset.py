@@ -21,6 +21,7 @@ class DatasetResponse(BaseModel):
     updated_at: datetime
     row_count: Optional[int]
     column_count: Optional[int]
+    content_hash: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -1,8 +1,26 @@
 """Schemas for issue endpoints."""
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from datetime import datetime
 from typing import Optional
-from app.models.dataset import IssueType, IssueSeverity
+from app.models.enums import IssueType, IssueSeverity
+
+
+def _enum_value(enum_cls, value):
+    """Accept enum names too: SQLAlchemy stores the member name in Postgres."""
+    if isinstance(value, str) and value in enum_cls.__members__:
+        return enum_cls[value]
+    return value
+
+
+class IssueCreate(BaseModel):
+    """Schema for recording an issue."""
+    dataset_id: str
+    issue_type: IssueType
+    severity: IssueSeverity = IssueSeverity.MEDIUM
+    column_name: Optional[str] = None
+    description: str
+    evidence: dict = {}
+    detected_at: Optional[datetime] = None
 
 
 class IssueResponse(BaseModel):
@@ -16,6 +34,22 @@ class IssueResponse(BaseModel):
     evidence: dict
     detected_at: datetime
     resolved: bool
+
+    @field_validator("issue_type", mode="before")
+    @classmethod
+    def _issue_type(cls, value):
+        return _enum_value(IssueType, value)
+
+    @field_validator("severity", mode="before")
+    @classmethod
+    def _severity(cls, value):
+        return _enum_value(IssueSeverity, value)
     
     class Config:
         from_attributes = True
+
+
+class IssueBulkResponse(BaseModel):
+    """Schema for bulk issue ingestion response."""
+    inserted: int
+    ids: list[str]
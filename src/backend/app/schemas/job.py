@@ -0,0 +1,24 @@
+"""Schemas for job endpoints."""
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+from app.models.enums import JobStatus
+
+
+class JobResponse(BaseModel):
+    """Schema for job response."""
+    id: str
+    job_type: str
+    status: JobStatus
+    stage: Optional[str] = None
+    filename: Optional[str] = None
+    dataset_id: Optional[str] = None
+    profile_id: Optional[str] = None
+    error: Optional[str] = None
+    timings: Optional[dict] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
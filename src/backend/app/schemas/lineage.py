@@ -0,0 +1,39 @@
+"""Schemas for lineage endpoints."""
+from pydantic import BaseModel, Field, model_validator
+from datetime import datetime
+from typing import Optional
+
+
+class LineageCreate(BaseModel):
+    """Schema for creating a lineage edge."""
+    source_dataset_id: str
+    target_dataset_id: str
+    job_name: Optional[str] = None
+    job_type: Optional[str] = None
+    confidence: float = Field(default=1.0, ge=0, le=1)
+
+    @model_validator(mode="after")
+    def _not_self_loop(self):
+        if self.source_dataset_id == self.target_dataset_id:
+            raise ValueError("A dataset cannot be its own lineage source")
+        return self
+
+
+class LineageResponse(BaseModel):
+    """Schema for lineage edge response."""
+    id: str
+    source_dataset_id: str
+    target_dataset_id: str
+    job_name: Optional[str]
+    job_type: Optional[str]
+    confidence: Optional[float]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class LineageBulkResponse(BaseModel):
+    """Schema for bulk lineage ingestion response."""
+    inserted: int
+    ids: list[str]
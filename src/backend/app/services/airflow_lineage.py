@@ -0,0 +1,737 @@
+"""
+Airflow lineage extraction – reads the DAG files in AIRFLOW_DAGS_FOLDER with
+`ast` (nothing is imported or executed, so Airflow need not be installed)
+and turns each task's dataset inputs and outputs into `lineage` edges.
+
+A task's outputs are its `outlets`. Its inputs, with the edge confidence:
+  - its own `inlets`                                            1.0
+  - the outlets of its direct upstream tasks                    0.8
+  - what reaches it through upstream tasks that write nothing,
+    and the datasets that trigger its DAG (`schedule=[...]`)    0.6
+Datasets are `Dataset(...)` / `Asset(...)` / `File(...)` / `Table(...)`
+values or plain strings; dependencies come from `>>` / `<<`, `chain()`,
+`cross_downstream()`, `set_upstream()` / `set_downstream()` and TaskFlow
+calls (`load(transform(extract()))`).
+
+Files are parsed in the shared process pool. A per-file cache (mtime and
+size, then BLAKE2b of the content) persisted in AIRFLOW_LINEAGE_CACHE means
+a rescan parses only the files that changed. Edge ids are derived from
+(source, target, job), so a rescan upserts the same rows; edges a changed or
+deleted file no longer yields are removed.
+"""
+import os
+import re
+import ast
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+PARSER_VERSION = 1  # bump when parsing changes, to invalidate cached results
+INLINE_FILES = 8  # parse this few changed files in a thread rather than the pool
+_EDGE_NAMESPACE = uuid.UUID("5d0c1f0e-8a43-4c5e-9b5e-4f6a2a7d3c11")
+
+DATASET_CALLS = {"Dataset", "Asset", "File", "Table"}
+DAG_CALLS = {"DAG"}
+GROUP_CALLS = {"TaskGroup"}
+EXPLICIT, DIRECT, INDIRECT = 1.0, 0.8, 0.6
+
+_cache: Optional[Dict[str, Any]] = None
+_scan_lock: Optional[asyncio.Lock] = None
+
+
+# --- parsing (runs in worker processes) ---
+
+class _Dataset:
+    def __init__(self, uri: str):
+        self.uri = uri
+
+
+class _Task:
+    def __init__(self, task_id: str, operator: str):
+        self.task_id = task_id
+        self.operator = operator
+        self.inlets: List[str] = []
+        self.outlets: List[str] = []
+        self.upstream: List["_Task"] = []
+
+
+class _Dag:
+    def __init__(self, dag_id: str, schedule: List[str]):
+        self.dag_id = dag_id
+        self.schedule = schedule
+        self.tasks: List[_Task] = []
+
+
+class _TaskFn:
+    """A TaskFlow (`@task`) function: each call makes a task."""
+
+    def __init__(self, name: str, operator: str, inlets: List[str], outlets: List[str]):
+        self.name = name
+        self.operator = operator
+        self.inlets = inlets
+        self.outlets = outlets
+        self.calls = 0
+
+
+class _GroupFn:
+    """A `@task_group` function: each call adds its body's tasks under a group id."""
+
+    def __init__(self, node: ast.FunctionDef, group_id: str):
+        self.node = node
+        self.group_id = group_id
+
+
+def _name(node: ast.AST) -> Optional[str]:
+    """`Foo` / `mod.Foo` / `task.bash` -> the last name (`Foo`, `bash`), else None."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _flatten(value) -> list:
+    if isinstance(value, (list, tuple)):
+        return [item for v in value for item in _flatten(v)]
+    return [] if value is None else [value]
+
+
+def _tasks(value) -> List[_Task]:
+    return [v for v in _flatten(value) if isinstance(v, _Task)]
+
+
+def _uris(value) -> List[str]:
+    uris = []
+    for v in _flatten(value):
+        if isinstance(v, _Dataset):
+            uris.append(v.uri)
+        elif isinstance(v, str) and v:
+            uris.append(v)
+    return uris
+
+
+class _DagFileParser:
+    """Evaluates the statically knowable parts of one DAG file."""
+
+    def __init__(self):
+        self.env: Dict[str, Any] = {}
+        self.dags: List[_Dag] = []
+        self.dag_stack: List[_Dag] = []
+        self.groups: List[str] = []
+
+    # statements
+
+    def run(self, body: List[ast.stmt]) -> None:
+        for stmt in body:
+            self.stmt(stmt)
+
+    def stmt(self, node: ast.stmt) -> None:
+        if isinstance(node, ast.Assign):
+            value = self.eval(node.value)
+            for target in node.targets:
+                self.assign(target, value)
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            self.assign(node.target, self.eval(node.value))
+        elif isinstance(node, (ast.Expr, ast.Return)) and node.value is not None:
+            self.eval(node.value)
+        elif isinstance(node, (ast.With, ast.AsyncWith)):
+            self.with_(node)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self.function(node)
+        elif isinstance(node, (ast.If, ast.For, ast.AsyncFor, ast.While)):
+            self.run(node.body)
+            self.run(node.orelse)
+        elif isinstance(node, ast.Try):
+            self.run(node.body)
+            self.run(node.orelse)
+            self.run(node.finalbody)
+
+    def assign(self, target: ast.AST, value) -> None:
+        if isinstance(target, ast.Name):
+            self.env[target.id] = value
+        elif isinstance(target, (ast.Tuple, ast.List)) and isinstance(value, list) \
+                and len(value) == len(target.elts):
+            for t, v in zip(target.elts, value):
+                self.assign(t, v)
+
+    def with_(self, node) -> None:
+        pushed_dag, groups = 0, []
+        for item in node.items:
+            value = self.eval(item.context_expr)
+            if isinstance(value, _Dag):
+                self.dag_stack.append(value)
+                pushed_dag += 1
+            elif isinstance(item.context_expr, ast.Call) and _name(item.context_expr.func) in GROUP_CALLS:
+                self.groups.append(self.str_arg(item.context_expr, 0, "group_id") or "group")
+                dag = self.dag_stack[-1] if self.dag_stack else None
+                groups.append((item.optional_vars, dag, len(dag.tasks) if dag else 0))
+                continue
+            if item.optional_vars is not None:
+                self.assign(item.optional_vars, value)
+        self.run(node.body)
+        del self.dag_stack[len(self.dag_stack) - pushed_dag:]
+        del self.groups[len(self.groups) - len(groups):]
+        for target, dag, before in groups:
+            if target is not None and dag is not None:
+                self.assign(target, dag.tasks[before:])  # `group >> task` links all its tasks
+
+    def function(self, node) -> None:
+        for decorator in node.decorator_list:
+            call = decorator if isinstance(decorator, ast.Call) else None
+            func = call.func if call else decorator
+            name = _name(func)
+            base = _name(func.value) if isinstance(func, ast.Attribute) else name
+            if name == "dag":
+                dag = self.new_dag(self.str_kwarg(call, "dag_id") or node.name, call)
+                self.dag_stack.append(dag)
+                self.run(node.body)
+                self.dag_stack.pop()
+                return
+            if name == "task_group":
+                self.env[node.name] = _GroupFn(node, self.str_arg(call, 0, "group_id") or node.name)
+                return
+            if base == "task":
+                operator = "task" if name == "task" else f"task.{name}"
+                self.env[node.name] = _TaskFn(
+                    self.str_kwarg(call, "task_id") or node.name,
+                    operator,
+                    _uris(self.kwarg(call, "inlets")),
+                    _uris(self.kwarg(call, "outlets")),
+                )
+                return
+
+    # expressions
+
+    def kwarg(self, call: Optional[ast.Call], key: str):
+        if call is not None:
+            for kw in call.keywords:
+                if kw.arg == key:
+                    return self.eval(kw.value)
+        return None
+
+    def str_kwarg(self, call: Optional[ast.Call], key: str) -> Optional[str]:
+        value = self.kwarg(call, key)
+        return value if isinstance(value, str) else None
+
+    def str_arg(self, call: Optional[ast.Call], index: int, key: str) -> Optional[str]:
+        if call is not None and len(call.args) > index:
+            value = self.eval(call.args[index])
+            if isinstance(value, str):
+                return value
+        return self.str_kwarg(call, key)
+
+    def eval(self, node: Optional[ast.AST]):
+        if node is None:
+            return None
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name):
+            return self.env.get(node.id)
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            return [self.eval(e) for e in node.elts]
+        if isinstance(node, ast.JoinedStr):
+            parts = []
+            for value in node.values:
+                v = self.eval(value.value if isinstance(value, ast.FormattedValue) else value)
+                if not isinstance(v, (str, int, float)):
+                    return None
+                parts.append(str(v))
+            return "".join(parts)
+        if isinstance(node, ast.BinOp):
+            return self.binop(node)
+        if isinstance(node, ast.Call):
+            return self.call(node)
+        return None
+
+    def binop(self, node: ast.BinOp):
+        left, right = self.eval(node.left), self.eval(node.right)
+        if isinstance(node.op, ast.RShift):
+            self.depend(left, right)
+            return right
+        if isinstance(node.op, ast.LShift):
+            self.depend(right, left)
+            return right
+        if isinstance(node.op, (ast.BitOr, ast.BitAnd)):
+            return _flatten(left) + _flatten(right)  # DatasetAny / DatasetAll conditions
+        if isinstance(node.op, ast.Add) and isinstance(left, str) and isinstance(right, str):
+            return left + right
+        if isinstance(node.op, ast.Mod) and isinstance(left, str) and isinstance(right, (str, int, float)):
+            try:
+                return left % right
+            except (TypeError, ValueError):
+                return None
+        return None
+
+    def depend(self, upstream, downstream) -> None:
+        ups, downs = _tasks(upstream), _tasks(downstream)
+        for down in downs:
+            for up in ups:
+                if up is not down and up not in down.upstream:
+                    down.upstream.append(up)
+
+    def call(self, node: ast.Call):
+        func = node.func
+        name = _name(func)
+
+        if isinstance(func, ast.Attribute) and name in ("set_downstream", "set_upstream") and node.args:
+            owner, other = self.eval(func.value), self.eval(node.args[0])
+            if name == "set_downstream":
+                self.depend(owner, other)
+            else:
+                self.depend(other, owner)
+            return None
+        if isinstance(func, ast.Attribute) and name in ("format", "join") and isinstance(func.value, ast.Constant):
+            args = [self.eval(a) for a in node.args]
+            try:
+                if name == "join":
+                    return func.value.value.join(args[0]) if args and isinstance(args[0], list) else None
+                return func.value.value.format(*args)
+            except (TypeError, ValueError, IndexError, KeyError, AttributeError):
+                return None
+
+        if name in DATASET_CALLS:
+            if name == "Table":
+                parts = [self.str_kwarg(node, key) for key in ("cluster", "database", "name")]
+                uri = ".".join(p for p in parts if p)
+            else:
+                uri = self.str_kwarg(node, "uri") or self.str_kwarg(node, "url") or self.str_arg(node, 0, "name")
+            return _Dataset(uri) if uri else None
+        if name in DAG_CALLS:
+            return self.new_dag(self.str_arg(node, 0, "dag_id"), node)
+        if name in ("chain", "chain_linear"):
+            values = [self.eval(a) for a in node.args]
+            for up, down in zip(values, values[1:]):
+                self.depend(up, down)
+            return None
+        if name == "cross_downstream" and len(node.args) >= 2:
+            self.depend(self.eval(node.args[0]), self.eval(node.args[1]))
+            return None
+
+        target = self.env.get(name) if isinstance(func, ast.Name) else None
+        if isinstance(target, _TaskFn):
+            return self.taskflow_call(target, node)
+        if isinstance(target, _GroupFn):
+            return self.group_call(target, node)
+        if isinstance(func, ast.Call) and _name(func.func) == "override":
+            # my_task.override(task_id="x")(...)
+            inner = self.env.get(_name(func.func.value)) if isinstance(func.func, ast.Attribute) else None
+            if isinstance(inner, _TaskFn):
+                return self.taskflow_call(inner, node, self.str_kwarg(func, "task_id"))
+
+        task_id = self.str_kwarg(node, "task_id")
+        if task_id is not None or (name or "").endswith(("Operator", "Sensor")):
+            return self.new_task(task_id or name, name or "operator", node)
+
+        for arg in node.args:  # e.g. nested task calls
+            self.eval(arg)
+        return None
+
+    def new_dag(self, dag_id: Optional[str], call: Optional[ast.Call]) -> _Dag:
+        # only datasets count: a string schedule is a cron expression or preset
+        schedule = [v.uri for v in _flatten(self.kwarg(call, "schedule")) if isinstance(v, _Dataset)]
+        dag = _Dag(dag_id or "dag", schedule)
+        self.dags.append(dag)
+        return dag
+
+    def current_dag(self, call: Optional[ast.Call]) -> Optional[_Dag]:
+        dag = self.kwarg(call, "dag")
+        if isinstance(dag, _Dag):
+            return dag
+        return self.dag_stack[-1] if self.dag_stack else None
+
+    def new_task(self, task_id: str, operator: str, call: Optional[ast.Call]) -> _Task:
+        prefix = ".".join(self.groups)
+        task = _Task(f"{prefix}.{task_id}" if prefix else task_id, operator)
+        if call is not None:
+            task.inlets = _uris(self.kwarg(call, "inlets"))
+            task.outlets = _uris(self.kwarg(call, "outlets"))
+        dag = self.current_dag(call)
+        if dag is not None:
+            dag.tasks.append(task)
+        return task
+
+    def taskflow_call(self, fn: _TaskFn, node: ast.Call, task_id: Optional[str] = None) -> _Task:
+        # repeated calls get Airflow's "name__1", "name__2" ids
+        task_id = task_id or (fn.name if not fn.calls else f"{fn.name}__{fn.calls}")
+        fn.calls += 1
+        task = self.new_task(task_id, fn.operator, None)
+        task.inlets, task.outlets = list(fn.inlets), list(fn.outlets)
+        for arg in list(node.args) + [kw.value for kw in node.keywords]:
+            self.depend(self.eval(arg), task)  # passing a task's result makes it upstream
+        return task
+
+    def group_call(self, fn: _GroupFn, node: ast.Call):
+        dag = self.dag_stack[-1] if self.dag_stack else None
+        before = len(dag.tasks) if dag else 0
+        args = {param.arg: self.eval(arg) for param, arg in zip(fn.node.args.args, node.args)}
+        saved, self.env = self.env, {**self.env, **args}  # the body's names are local
+        self.groups.append(fn.group_id)
+        self.run(fn.node.body)
+        self.groups.pop()
+        self.env = saved
+        return dag.tasks[before:] if dag else None
+
+
+def extract_edges(dag: _Dag) -> List[Dict[str, Any]]:
+    """Dataset-level edges of one DAG, as dicts of source/target URI, job and confidence."""
+    reach: Dict[int, Dict[str, float]] = {}
+
+    def available(task: _Task, seen: frozenset) -> Dict[str, float]:
+        """Datasets handed downstream by `task`, with the confidence of an edge from each."""
+        if id(task) in reach:
+            return reach[id(task)]
+        if task.outlets:
+            result = {uri: DIRECT for uri in task.outlets}
+        else:
+            # writes nothing: pass on what it reads, one step less certain
+            result = {uri: INDIRECT for uri in inputs(task, seen | {id(task)})}
+        reach[id(task)] = result
+        return result
+
+    def inputs(task: _Task, seen: frozenset = frozenset()) -> Dict[str, float]:
+        found = {uri: INDIRECT for uri in dag.schedule} if not task.upstream else {}
+        for up in task.upstream:
+            if id(up) in seen:
+                continue  # a dependency cycle (Airflow would reject the DAG)
+            for uri, confidence in available(up, seen | {id(task)}).items():
+                found[uri] = max(found.get(uri, 0.0), confidence)
+        for uri in task.inlets:
+            found[uri] = EXPLICIT
+        return found
+
+    edges = []
+    for task in dag.tasks:
+        if not task.outlets:
+            continue
+        for source, confidence in inputs(task).items():
+            for target in task.outlets:
+                if source != target:
+                    edges.append({
+                        "source": source,
+                        "target": target,
+                        "job_name": f"{dag.dag_id}.{task.task_id}",
+                        "job_type": task.operator,
+                        "confidence": confidence,
+                    })
+    return edges
+
+
+def parse_dag_source(source: str, filename: str = "<dag>") -> Dict[str, Any]:
+    """
+    Lineage of one DAG file's source.
+
+    Returns:
+        {"dags": [dag_id, ...], "tasks": int, "edges": [{"source", "target", "job_name", "job_type", "confidence"}]}
+    """
+    parser = _DagFileParser()
+    parser.run(ast.parse(source, filename=filename).body)
+    return {
+        "dags": [dag.dag_id for dag in parser.dags],
+        "tasks": sum(len(dag.tasks) for dag in parser.dags),
+        "edges": [edge for dag in parser.dags for edge in extract_edges(dag)],
+    }
+
+
+def parse_dag_files(files: List[Tuple[str, Optional[str]]]) -> List[Dict[str, Any]]:
+    """
+    Hash and parse DAG files. Runs in a worker process.
+
+    `files` holds (path, cached content hash) pairs; a file whose content
+    still has the cached hash is not parsed again ({"unchanged": True}).
+    Like Airflow's safe mode, files that mention neither "airflow" nor
+    "dag" are skipped.
+    """
+    results = []
+    for path, cached_hash in files:
+        entry: Dict[str, Any] = {"path": path}
+        try:
+            stat = os.stat(path)
+            with open(path, "rb") as fh:
+                content = fh.read()
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size,
+                         hash=hashlib.blake2b(content, digest_size=32).hexdigest())
+            if entry["hash"] == cached_hash:
+                entry["unchanged"] = True
+            else:
+                lowered = content.lower()
+                if b"airflow" in lowered and b"dag" in lowered:
+                    entry.update(parse_dag_source(content.decode("utf-8", errors="replace"), path))
+                else:
+                    entry.update(dags=[], tasks=0, edges=[])
+        except (OSError, SyntaxError, ValueError, RecursionError) as e:
+            entry.update(dags=[], tasks=0, edges=[], error=f"{type(e).__name__}: {e}")
+        results.append(entry)
+    return results
+
+
+# --- scanning ---
+
+def _ignore_patterns(folder: Path) -> List[re.Pattern]:
+    ignore = folder / ".airflowignore"
+    if not ignore.is_file():
+        return []
+    patterns = []
+    for line in ignore.read_text(errors="replace").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            try:
+                patterns.append(re.compile(line))
+            except re.error:
+                logger.warning("Ignoring invalid .airflowignore pattern %r", line)
+    return patterns
+
+
+def list_dag_files(folder: str) -> Dict[str, os.stat_result]:
+    """Python files under `folder` not matched by its .airflowignore, with their stat."""
+    root = Path(folder)
+    patterns = _ignore_patterns(root)
+    found = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d != "__pycache__" and not d.startswith(".")]
+        for filename in filenames:
+            if not filename.endswith(".py"):
+                continue
+            path = os.path.join(dirpath, filename)
+            relative = os.path.relpath(path, root)
+            if any(p.search(relative) for p in patterns):
+                continue
+            found[path] = os.stat(path)
+    return found
+
+
+def _load_cache() -> Dict[str, Any]:
+    global _cache
+    if _cache is None:
+        _cache = {}
+        path = Path(get_settings().AIRFLOW_LINEAGE_CACHE)
+        if path.is_file():
+            try:
+                data = json.loads(path.read_text())
+                if data.get("version") == PARSER_VERSION:
+                    _cache = data.get("files", {})
+            except (OSError, ValueError) as e:
+                logger.warning("Could not read the Airflow lineage cache %s: %s", path, e)
+    return _cache
+
+
+def _save_cache(files: Dict[str, Any]) -> None:
+    path = Path(get_settings().AIRFLOW_LINEAGE_CACHE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps({"version": PARSER_VERSION, "files": files}))
+    os.replace(tmp, path)
+
+
+async def _parse_changed(changed: List[Tuple[str, Optional[str]]]) -> List[Dict[str, Any]]:
+    if len(changed) <= INLINE_FILES:
+        return await asyncio.to_thread(parse_dag_files, changed)
+    from app.services.jobs import get_profile_executor
+
+    executor = get_profile_executor()
+    loop = asyncio.get_running_loop()
+    # a few batches per worker: amortizes IPC, still balances uneven files
+    batches = max(1, min(len(changed), get_settings().JOB_WORKERS * 4))
+    size = -(-len(changed) // batches)
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(executor, parse_dag_files, changed[i:i + size])
+        for i in range(0, len(changed), size)
+    ))
+    return [entry for part in parts for entry in part]
+
+
+def _edge_id(source_id: str, target_id: str, job_name: str) -> str:
+    return str(uuid.uuid5(_EDGE_NAMESPACE, f"{source_id}\x00{target_id}\x00{job_name}"))
+
+
+async def _resolve_datasets(uris: List[str]) -> Tuple[Dict[str, str], int]:
+    """
+    Dataset id per URI: the newest dataset named like the URI, else (with
+    AIRFLOW_REGISTER_DATASETS) a new file-less dataset. Returns (ids, registered).
+    """
+    from app.supabase_client import fetch, table_insert_many
+
+    if not uris:
+        return {}, 0
+    rows = await fetch(
+        "SELECT DISTINCT ON (name) name, id FROM datasets WHERE name = ANY($1::text[]) "
+        "ORDER BY name, created_at DESC, id DESC",
+        uris,
+    )
+    ids = {row["name"]: row["id"] for row in rows}
+    missing = [uri for uri in uris if uri not in ids]
+    if missing and get_settings().AIRFLOW_REGISTER_DATASETS:
+        new = [
+            {"id": str(uuid.uuid5(_EDGE_NAMESPACE, uri)), "name": uri, "description": "Registered from Airflow DAG lineage"}
+            for uri in missing
+        ]
+        await table_insert_many("datasets", new, on_conflict="id", ignore_duplicates=True, returning="minimal")
+        ids.update({row["name"]: row["id"] for row in new})
+        return ids, len(new)
+    return ids, 0
+
+
+async def _write_edges(edges: List[Dict[str, Any]], stale_ids: List[str]) -> Dict[str, Any]:
+    """Upsert edges (dicts shaped like lineage rows) and delete stale ones."""
+    from app.supabase_client import fetch, execute, table_insert_many, transaction
+    from app.services.lineage_db import closure_add_edge, closure_remove_edge, LineageCycleError
+    from app.services.lineage_graph import record_edge, forget_edge, TABLE_LINEAGE
+    from app.services.root_cause import invalidate_root_causes
+    from app.services.cache import invalidate
+
+    closure = get_settings().LINEAGE_CLOSURE_ENABLED
+    cycles = []
+    async with transaction():
+        removed = await fetch(
+            f"DELETE FROM {TABLE_LINEAGE} WHERE id = ANY($1::text[]) RETURNING id, source_dataset_id, target_dataset_id",
+            stale_ids,
+        ) if stale_ids else []
+        if closure:
+            for row in removed:
+                await closure_remove_edge(row["source_dataset_id"], row["target_dataset_id"])
+        # ids already stored only get their job type / confidence refreshed:
+        # their closure paths are already counted
+        before = {
+            row["id"]: (row["job_type"], row["confidence"])
+            for row in await fetch(
+                f"SELECT id, job_type, confidence FROM {TABLE_LINEAGE} WHERE id = ANY($1::text[])",
+                [edge["id"] for edge in edges],
+            )
+        } if edges else {}
+        written = await table_insert_many(
+            TABLE_LINEAGE, edges, on_conflict="id", update_columns=("job_type", "confidence")
+        ) if edges else []
+        inserted = [row for row in written if row["id"] not in before]
+        updated = [
+            row for row in written
+            if row["id"] in before and before[row["id"]] != (row["job_type"], row["confidence"])
+        ]
+        if closure:
+            kept = []
+            for row in inserted:
+                try:
+                    async with transaction():  # savepoint: a cycle drops only this edge
+                        await closure_add_edge(row["source_dataset_id"], row["target_dataset_id"])
+                    kept.append(row)
+                except LineageCycleError:
+                    cycles.append(row)
+            if cycles:
+                await execute(f"DELETE FROM {TABLE_LINEAGE} WHERE id = ANY($1::text[])", [row["id"] for row in cycles])
+            inserted = kept
+
+    for row in removed + updated:
+        forget_edge(row["id"])
+    for row in inserted + updated:
+        record_edge(row)
+    changed = removed + inserted + updated
+    if changed:
+        invalidate_root_causes()
+        await invalidate(*{row[key] for row in changed for key in ("source_dataset_id", "target_dataset_id")})
+    return {
+        "inserted": len(inserted),
+        "updated": len(updated),
+        "removed": len(removed),
+        "cycles": [f"{row['job_name']}: {row['source_dataset_id']} -> {row['target_dataset_id']}" for row in cycles],
+    }
+
+
+async def scan_dags(folder: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+    """
+    Extract lineage from the DAG folder (default AIRFLOW_DAGS_FOLDER) and
+    write it to the `lineage` table. With `force` every file is re-parsed.
+    """
+    global _scan_lock, _cache
+    if _scan_lock is None:
+        _scan_lock = asyncio.Lock()
+    async with _scan_lock:
+        started = time.perf_counter()
+        folder = folder or get_settings().AIRFLOW_DAGS_FOLDER
+        if not os.path.isdir(folder):
+            raise FileNotFoundError(f"DAG folder not found: {folder}")
+        root = os.path.join(os.path.abspath(folder), "")
+        previous = _load_cache()
+        cache = {} if force else previous
+
+        files = await asyncio.to_thread(list_dag_files, root)
+        entries, changed = {}, []
+        for path, stat in files.items():
+            entry = cache.get(path)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                entries[path] = entry
+            else:
+                changed.append((path, entry["hash"] if entry else None))
+        parsed = 0
+        for result in await _parse_changed(changed):
+            path = result.pop("path")
+            if result.pop("unchanged", False):
+                entries[path] = {**cache[path], "mtime_ns": result["mtime_ns"], "size": result["size"]}
+            else:
+                entries[path] = result
+                parsed += 1
+
+        # every edge yielded by the folder, keyed by the URIs and job
+        found = {}
+        for entry in entries.values():
+            for edge in entry.get("edges", []):
+                key = (edge["source"], edge["target"], edge["job_name"])
+                if key not in found or edge["confidence"] > found[key]["confidence"]:
+                    found[key] = edge
+        uris = sorted({uri for source, target, _ in found for uri in (source, target)})
+        ids, registered = await _resolve_datasets(uris)
+        rows = {}
+        for (source, target, job_name), edge in found.items():
+            if source in ids and target in ids and ids[source] != ids[target]:
+                row_id = _edge_id(ids[source], ids[target], job_name)
+                rows[row_id] = {
+                    "id": row_id,
+                    "source_dataset_id": ids[source],
+                    "target_dataset_id": ids[target],
+                    "job_name": job_name,
+                    "job_type": edge["job_type"],
+                    "confidence": edge["confidence"],
+                }
+        previous_ids = {
+            row_id for path, entry in previous.items() if path.startswith(root) for row_id in entry.get("edge_ids", [])
+        }
+        stale = sorted(previous_ids - rows.keys())
+        written = await _write_edges(list(rows.values()), stale)
+
+        # remember which rows each file produced, to remove them once it stops
+        for entry in entries.values():
+            entry["edge_ids"] = sorted({
+                _edge_id(ids[e["source"]], ids[e["target"]], e["job_name"])
+                for e in entry.get("edges", [])
+                if e["source"] in ids and e["target"] in ids and ids[e["source"]] != ids[e["target"]]
+            })
+        # files of other folders keep their entries
+        _cache = {**{path: entry for path, entry in previous.items() if not path.startswith(root)}, **entries}
+        await asyncio.to_thread(_save_cache, _cache)
+
+        errors = {path: entry["error"] for path, entry in entries.items() if entry.get("error")}
+        summary = {
+            "files": len(files),
+            "parsed": parsed,
+            "cached": len(files) - parsed,
+            "dags": sum(len(entry.get("dags", [])) for entry in entries.values()),
+            "tasks": sum(entry.get("tasks", 0) for entry in entries.values()),
+            "edges": len(rows),
+            **written,
+            "datasets_registered": registered,
+            "unresolved_datasets": [uri for uri in uris if uri not in ids],
+            "errors": errors,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info(
+            "Airflow lineage scan: %d files (%d parsed), %d edges (+%d/~%d/-%d) in %.2fs",
+            summary["files"], parsed, summary["edges"], written["inserted"], written["updated"], written["removed"],
+            summary["seconds"],
+        )
+        return summary
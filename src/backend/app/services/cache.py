@@ -0,0 +1,266 @@
+"""
+Read-through response cache for hot dashboard read paths.
+
+Rendered JSON bodies are kept in a per-process LRU, bounded by entry count
+and total bytes, with a TTL. Each entry is tagged with the datasets it
+shows; writes call `invalidate(*dataset_ids)` once they have committed.
+With CACHE_BACKEND="postgres" invalidations are also broadcast with
+NOTIFY, and every worker LISTENs, so all uvicorn workers drop the same
+entries. Clients that send the entry's ETag in If-None-Match get a 304.
+"""
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "lineage_auditor_cache"
+_NOTIFY_PAYLOAD_LIMIT = 7000  # bytes; Postgres caps NOTIFY payloads at 8000
+
+
+class ResponseCache:
+    """
+    LRU of (body, etag) per key with TTL and size-bounded eviction.
+
+    Every tag has a generation counter that `invalidate` bumps; a value
+    computed while one of its tags was invalidated is not stored, so a
+    slow read racing a write cannot re-cache stale data.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (body, etag, tags, expires)
+        self._by_tag: Dict[str, set] = {}
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0  # bumped by clear()
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        if entry[3] < time.monotonic():
+            self._drop(key)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[0], entry[1]
+
+    def generation(self, tags: Iterable[str]) -> tuple:
+        return (self._epoch, *(self._generations.get(tag, 0) for tag in tags))
+
+    def put(self, key: str, body: bytes, etag: str, tags: tuple, generation: tuple) -> bool:
+        """Store an entry unless one of its tags was invalidated since `generation` was read."""
+        if self.generation(tags) != generation or len(body) > self.max_bytes:
+            return False
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (body, etag, tags, time.monotonic() + self.ttl)
+        self._bytes += len(body)
+        for tag in tags:
+            self._by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.stats["evictions"] += 1
+        return True
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """Drop every entry tagged with any of `tags`; returns how many."""
+        dropped = 0
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            for key in self._by_tag.pop(tag, ()):
+                if key in self._entries:
+                    self._drop(key)
+                    dropped += 1
+        self.stats["invalidations"] += dropped
+        return dropped
+
+    def clear(self) -> None:
+        self._epoch += 1
+        self._entries.clear()
+        self._by_tag.clear()
+        self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        body, _, tags, _ = self._entries.pop(key)
+        self._bytes -= len(body)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def info(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": self.stats["hits"] / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+        }
+
+
+_cache: Optional[ResponseCache] = None
+_listener = None  # dedicated asyncpg connection for LISTEN
+_listener_task: Optional[asyncio.Task] = None
+
+
+def get_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        _cache = ResponseCache(settings.CACHE_MAX_ENTRIES, settings.CACHE_MAX_BYTES, settings.CACHE_TTL_SECONDS)
+    return _cache
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in {t.strip().removeprefix("W/") for t in header.split(",")}
+
+
+def _response(request: Request, body: bytes, etag: str, cache_status: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Cache": cache_status}
+    if _not_modified(request, etag):
+        get_cache().stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def cached_json(request: Request, tags: Iterable[str], build: Callable[[], Awaitable[Any]]) -> Response:
+    """
+    Serve `build()`'s JSON-able result through the cache, keyed by the
+    request path and query and tagged with `tags` (dataset ids).
+    Exceptions from `build` (e.g. a 404) propagate and are not cached.
+    """
+    tags = tuple(tags)
+    if not get_settings().CACHE_ENABLED:
+        body = json.dumps(jsonable_encoder(await build()), separators=(",", ":")).encode()
+        return _response(request, body, _etag(body), "BYPASS")
+
+    cache = get_cache()
+    key = request.url.path + ("?" + str(request.query_params) if request.query_params else "")
+    hit = cache.get(key)
+    if hit is not None:
+        return _response(request, hit[0], hit[1], "HIT")
+    generation = cache.generation(tags)
+    body = json.dumps(jsonable_encoder(await build()), separators=(",", ":")).encode()
+    etag = _etag(body)
+    cache.put(key, body, etag, tags, generation)
+    return _response(request, body, etag, "MISS")
+
+
+async def invalidate(*dataset_ids: Optional[str]) -> None:
+    """
+    Drop cached responses about these datasets here and, with the postgres
+    backend, in every other worker. Call after the write has committed.
+    """
+    dataset_ids = tuple(dict.fromkeys(d for d in dataset_ids if d))
+    if not dataset_ids:
+        return
+    get_cache().invalidate(dataset_ids)
+    if get_settings().CACHE_BACKEND != "postgres":
+        return
+    from app.supabase_client import execute
+
+    batches, batch = [], []
+    for dataset_id in dataset_ids:
+        if batch and len(",".join(batch)) + len(dataset_id) + 1 > _NOTIFY_PAYLOAD_LIMIT:
+            batches.append(batch)
+            batch = []
+        batch.append(dataset_id)
+    batches.append(batch)
+    try:
+        for batch in batches:
+            await execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, ",".join(batch))
+    except Exception as e:  # the local cache is already correct; others expire by TTL
+        logger.warning("Cache invalidation broadcast failed: %s", e)
+
+
+def _on_notify(connection, pid, channel, payload: str) -> None:
+    get_cache().invalidate(payload.split(","))
+
+
+def _on_listener_lost(connection) -> None:
+    global _listener, _listener_task
+    # invalidations may be missed until we listen again
+    logger.warning("Cache invalidation listener lost; clearing the response cache")
+    get_cache().clear()
+    _listener = None
+    _listener_task = asyncio.get_running_loop().create_task(_listen())
+
+
+async def _listen() -> None:
+    """Connect the LISTEN connection, retrying with backoff."""
+    global _listener
+    import asyncpg
+
+    delay = 1.0
+    while True:
+        try:
+            conn = await asyncpg.connect(get_settings().DATABASE_URL)
+            await conn.add_listener(NOTIFY_CHANNEL, _on_notify)
+            conn.add_termination_listener(_on_listener_lost)
+            _listener = conn
+            get_cache().clear()  # anything cached while not listening may be stale
+            logger.info("Listening for cache invalidations on %s", NOTIFY_CHANNEL)
+            return
+        except (OSError, asyncpg.PostgresError) as e:
+            logger.warning("Cache invalidation listener failed to connect (%s); retrying in %.0fs", e, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+
+async def start_cache() -> None:
+    """Start listening for other workers' invalidations (postgres backend)."""
+    if get_settings().CACHE_ENABLED and get_settings().CACHE_BACKEND == "postgres":
+        await _listen()
+
+
+async def stop_cache() -> None:
+    global _listener, _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        _listener_task = None
+    if _listener is not None:
+        conn, _listener = _listener, None
+        conn.remove_termination_listener(_on_listener_lost)
+        await conn.close()
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {
+        **get_cache().info(),
+        "enabled": get_settings().CACHE_ENABLED,
+        "backend": get_settings().CACHE_BACKEND,
+        "listening": _listener is not None,
+    }
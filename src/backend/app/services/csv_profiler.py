@@ -0,0 +1,142 @@
+"""
+Out-of-core CSV profiling – reads a CSV in fixed-size row chunks whose size
+is derived from a memory budget, and folds each chunk into a ProfileSketch.
+
+Dtypes are inferred from a leading sample and locked for the rest of the
+file: text columns keep their sampled dtype and float columns are read as
+float64, so every chunk parses the same way and no chunk pays for
+re-inference. Integer and boolean columns stay inferred per chunk (a later
+null turns them into float64/object), and the sketch promotes dtypes
+exactly as a whole-file `pd.read_csv` would.
+
+A file that fits in one chunk gets exactly `DatasetProfiler.profile`. For a
+larger file, compared with `DatasetProfiler.profile` on the whole frame:
+  - row/column counts, dtypes, null counts, min and max are exact
+  - mean and std agree to floating-point rounding (merged moments)
+  - cardinality is a HyperLogLog estimate (~0.8% standard error)
+  - median is a KLL estimate, within `KLLSketch.rank_error()` in rank
+    (1.65 / k, ~0.8% for the default k = 200)
+"""
+import time
+import logging
+from typing import Any, Dict, IO, Optional, Union
+
+import pandas as pd
+
+from app.config import get_profiling_settings
+from app.services.columnar_profiler import ColumnarProfiler
+from app.services.sketches import ProfileSketch
+from app.utils.metrics import stage, record_stage
+
+logger = logging.getLogger(__name__)
+
+# Peak memory of parsing and profiling a chunk, as a multiple of the sample's
+# DataFrame size per row: the parser's token buffers, the sorted numeric
+# block and the hash tables of value_counts all exist alongside the frame,
+# and a column that turns mixed-type later is held as Python objects.
+MEMORY_OVERHEAD = 8.0
+MIN_CHUNK_ROWS = 1_000
+
+Source = Union[str, IO[bytes]]
+
+
+def _rewind(source: Source) -> None:
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+class ChunkedCSVProfiler:
+    """Bounded-memory profiling of a CSV file or binary buffer."""
+
+    @staticmethod
+    def sample(source: Source, rows: int) -> Dict[str, Any]:
+        """
+        Infer dtypes from the first `rows` rows.
+
+        Returns:
+            {"dtypes": {column: dtype to lock}, "bytes_per_row": float}
+        """
+        _rewind(source)
+        df = pd.read_csv(source, nrows=rows)
+        bytes_per_row = float(df.memory_usage(deep=True, index=False).sum()) / max(len(df), 1)
+        return {"dtypes": ChunkedCSVProfiler.lock_dtypes(df), "bytes_per_row": bytes_per_row}
+
+    @staticmethod
+    def lock_dtypes(df: pd.DataFrame) -> Dict[str, Any]:
+        """Dtypes to read the rest of a CSV with, given a leading sample parsed with inference."""
+        locked = {}
+        for col, dtype in df.dtypes.items():
+            if df[col].isna().all():
+                continue  # an empty sample says nothing about the type
+            if pd.api.types.is_string_dtype(dtype):
+                locked[col] = dtype  # text (or mixed) columns stay as sampled
+            elif dtype.kind == "f":
+                locked[col] = "float64"
+        return locked
+
+    @staticmethod
+    def unlock_floats(dtypes: Dict[str, Any]) -> Dict[str, Any]:
+        """`dtypes` without the float locks, for when a sampled float column turns out to hold text."""
+        return {col: dtype for col, dtype in dtypes.items() if dtype != "float64"}
+
+    @staticmethod
+    def chunk_rows(bytes_per_row: float, memory_budget: int) -> int:
+        """Rows per chunk so that parsing and profiling one chunk stays within `memory_budget`."""
+        return max(MIN_CHUNK_ROWS, int(memory_budget / (max(bytes_per_row, 1.0) * MEMORY_OVERHEAD)))
+
+    @staticmethod
+    def profile(source: Source, memory_budget: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Profile a CSV within `memory_budget` bytes (default: CSV_MEMORY_BUDGET).
+
+        Returns:
+            {"profile": {...}, "row_count": int, "column_count": int}
+        """
+        settings = get_profiling_settings()
+        budget = memory_budget or settings.CSV_MEMORY_BUDGET
+        with stage("csv.sample"):
+            sample = ChunkedCSVProfiler.sample(source, settings.CSV_SAMPLE_ROWS)
+        rows = ChunkedCSVProfiler.chunk_rows(sample["bytes_per_row"], budget)
+        try:
+            return ChunkedCSVProfiler._profile_chunks(source, rows, sample["dtypes"])
+        except ValueError as e:
+            # a float column of the sample holds text further down
+            floats = [col for col, dtype in sample["dtypes"].items() if dtype == "float64"]
+            if not floats:
+                raise
+            logger.info("Locked CSV dtypes did not hold (%s); re-reading with %s inferred", e, floats)
+            return ChunkedCSVProfiler._profile_chunks(source, rows, ChunkedCSVProfiler.unlock_floats(sample["dtypes"]))
+
+    @staticmethod
+    def _profile_chunks(source: Source, rows: int, dtypes: Dict[str, Any]) -> Dict[str, Any]:
+        _rewind(source)
+        sketch = ProfileSketch()
+        chunks = 0
+        exact = None
+        parse_seconds = profile_seconds = 0.0
+        # a chunk is bounded already, so parse it whole (no mixed-type columns)
+        with pd.read_csv(source, chunksize=rows, dtype=dtypes, low_memory=False) as reader:
+            previous = time.perf_counter()
+            for chunk in reader:
+                parsed = time.perf_counter()
+                exact = ColumnarProfiler.profile(chunk, sketch=sketch)
+                chunks += 1
+                done = time.perf_counter()
+                parse_seconds += parsed - previous
+                profile_seconds += done - parsed
+                previous = done
+            columns = list(chunk.columns)
+        record_stage("csv.parse", parse_seconds)
+        record_stage("csv.profile", profile_seconds)
+        sketch.columns = {name: sketch.columns[name] for name in columns}  # file order
+        logger.info(
+            "Profiled CSV: %d rows in %d chunk(s) of up to %d rows", sketch.row_count, chunks, rows
+        )
+        with stage("profile.sketch"):
+            if chunks == 1:
+                # the whole file was one frame: keep the exact profile
+                profile = exact
+                profile["sketches"] = sketch.to_dict()
+            else:
+                profile = sketch.to_profile()
+        return {"profile": profile, "row_count": sketch.row_count, "column_count": sketch.column_count}
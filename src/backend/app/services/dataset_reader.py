@@ -0,0 +1,186 @@
+"""
+Stored dataset reader – resolves a dataset's `storage_path` (MinIO or the
+local fallback) and pages through its rows without loading the file whole.
+
+Parquet and Arrow IPC files are opened lazily: only the footer is read up
+front (from MinIO as ranged GETs, locally through a memory map), and a page
+decodes just the row groups / record batches it covers, for the requested
+columns. CSV has no row index, so the parser skips earlier lines without
+materializing them and parses only the page.
+"""
+import math
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from app.utils.storage import open_stored
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+BATCH_ROWS = 10_000  # rows decoded at a time
+
+
+def _records(batch) -> List[Dict[str, Any]]:
+    """Arrow rows as JSON-able dicts (NaN becomes null, as for CSV)."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = pa.Table.from_batches([batch])
+    for i, field in enumerate(table.schema):
+        if pa.types.is_floating(field.type):
+            column = table.column(i)
+            table = table.set_column(i, field, pc.if_else(pc.is_nan(column), None, column))
+    return table.to_pylist()
+
+
+class DatasetReader:
+    """Lazy, column-projected row access to one stored upload. Use as a context manager."""
+
+    def __init__(self, storage_path: str):
+        self.storage_path = storage_path
+        self.format = FORMATS.get(Path(storage_path).suffix.lower())
+        if self.format is None:
+            raise ValueError(f"Unsupported stored file type: {Path(storage_path).suffix or storage_path}")
+        self._source = None
+        self._file = None  # pq.ParquetFile / ipc.RecordBatchFileReader
+
+    def __enter__(self) -> "DatasetReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._source is not None:
+            self._source.close()
+            self._source = self._file = None
+
+    @property
+    def source(self):
+        if self._source is None:
+            self._source = open_stored(self.storage_path)
+        return self._source
+
+    @property
+    def file(self):
+        """The opened Parquet / Arrow file (footer only)."""
+        if self._file is None:
+            if self.format == "parquet":
+                import pyarrow.parquet as pq
+
+                self._file = pq.ParquetFile(self.source)
+            else:
+                import pyarrow.ipc as ipc
+
+                self._file = ipc.open_file(self.source)
+        return self._file
+
+    def columns(self) -> List[str]:
+        if self.format == "csv":
+            self.source.seek(0)
+            return list(pd.read_csv(self.source, nrows=0).columns)
+        schema = self.file.schema_arrow if self.format == "parquet" else self.file.schema
+        index_columns = {c for c in (schema.pandas_metadata or {}).get("index_columns", []) if isinstance(c, str)}
+        return [name for name in schema.names if name not in index_columns]
+
+    def row_count(self) -> Optional[int]:
+        """
+        Total rows, where the file says so without a scan: None for CSV, and
+        for Arrow in MinIO (the IPC footer has no row counts, so counting
+        would fetch every record batch; a local memory map reads them zero-copy).
+        """
+        if self.format == "parquet":
+            return self.file.metadata.num_rows
+        if self.format == "arrow" and not self.storage_path.startswith("minio://"):
+            return sum(self.file.get_batch(i).num_rows for i in range(self.file.num_record_batches))
+        return None
+
+    def _project(self, columns: Optional[List[str]]) -> List[str]:
+        available = self.columns()
+        if not columns:
+            return available
+        unknown = [c for c in columns if c not in available]
+        if unknown:
+            raise KeyError(f"Unknown column(s): {', '.join(unknown)}")
+        return columns
+
+    def batches(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        columns: Optional[List[str]] = None,
+        batch_rows: int = BATCH_ROWS,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Rows [offset, offset + limit) (to the end without a limit) of the
+        given columns, as lists of at most `batch_rows` dicts.
+        """
+        columns = self._project(columns)
+        remaining = math.inf if limit is None else limit
+        if remaining <= 0:
+            return
+        if self.format == "csv":
+            batches = self._csv_batches(offset, limit, columns, batch_rows)
+        elif self.format == "parquet":
+            batches = self._parquet_batches(offset, columns, batch_rows)
+        else:
+            batches = self._arrow_batches(offset, columns)
+        for batch in batches:
+            if len(batch) > remaining:
+                batch = batch[:int(remaining)]
+            if batch:
+                yield batch
+            remaining -= len(batch)
+            if remaining <= 0:
+                return
+
+    def read(self, offset: int = 0, limit: Optional[int] = None, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return [row for batch in self.batches(offset, limit, columns) for row in batch]
+
+    def _csv_batches(self, offset, limit, columns, batch_rows):
+        names = self.columns()
+        self.source.seek(0)
+        # an int skiprows is skipped by the C tokenizer (quote-aware) without building rows
+        reader = pd.read_csv(
+            self.source, skiprows=offset + 1, header=None, names=names, usecols=columns,
+            nrows=limit, chunksize=batch_rows,
+        )
+        with reader:
+            for chunk in reader:
+                chunk = chunk[columns]
+                yield chunk.astype(object).where(chunk.notna(), None).to_dict(orient="records")
+
+    def _parquet_batches(self, offset, columns, batch_rows):
+        meta = self.file.metadata
+        start, first = 0, meta.num_row_groups
+        for g in range(meta.num_row_groups):
+            rows = meta.row_group(g).num_rows
+            if start + rows > offset:
+                first = g
+                break
+            start += rows
+        if first == meta.num_row_groups:
+            return
+        skip = offset - start
+        for batch in self.file.iter_batches(
+            batch_size=batch_rows, row_groups=range(first, meta.num_row_groups), columns=columns,
+            use_pandas_metadata=False,
+        ):
+            if skip >= batch.num_rows:
+                skip -= batch.num_rows
+                continue
+            yield _records(batch.slice(skip))
+            skip = 0
+
+    def _arrow_batches(self, offset, columns):
+        skip = offset
+        for i in range(self.file.num_record_batches):
+            batch = self.file.get_batch(i)  # zero-copy from a memory map
+            if skip >= batch.num_rows:
+                skip -= batch.num_rows
+                continue
+            yield _records(batch.select(columns).slice(skip))
+            skip = 0
@@ -0,0 +1,105 @@
+"""
+Upload deduplication – uploads are hashed (BLAKE2b-256) as they arrive.
+
+A dataset whose file has the same hash as an earlier upload is a new
+version of identical content: it points at the stored content-addressed
+object and gets a copy of the earlier profile instead of being stored and
+profiled again. Counters for `dedup_stats()` are per process.
+"""
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+HASH_NAME = "blake2b-256"
+_READ_SIZE = 1024 * 1024
+
+_stats = {"uploads": 0, "hits": 0, "bytes_uploaded": 0, "bytes_saved": 0, "profiles_reused": 0}
+
+
+def new_hasher():
+    return hashlib.blake2b(digest_size=32)
+
+
+def hash_bytes(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=32).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    hasher = new_hasher()
+    with open(path, "rb") as fh:
+        while True:
+            block = fh.read(_READ_SIZE)
+            if not block:
+                break
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+async def find_by_hash(content_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    The newest dataset with this content and a profile, if any.
+
+    Returns:
+        {"dataset_id", "storage_path", "row_count", "column_count",
+         "profile": {"columns_metadata", "statistics", "sample_rows", "sketches"}} or None
+    """
+    if not get_settings().DEDUP_ENABLED:
+        return None
+    from app.supabase_client import fetch
+
+    rows = await fetch(
+        """
+        SELECT d.id, d.storage_path, d.row_count, d.column_count,
+               p.columns_metadata, p.statistics, p.sample_rows, p.sketches
+        FROM datasets d
+        CROSS JOIN LATERAL (
+            SELECT columns_metadata, statistics, sample_rows, sketches
+            FROM dataset_profiles
+            WHERE dataset_id = d.id
+            ORDER BY created_at DESC, id DESC
+            LIMIT 1
+        ) p
+        WHERE d.content_hash = $1 AND d.storage_path IS NOT NULL
+        ORDER BY d.created_at DESC, d.id DESC
+        LIMIT 1
+        """,
+        content_hash,
+    )
+    if not rows:
+        return None
+    row = rows[0]
+    return {
+        "dataset_id": row["id"],
+        "storage_path": row["storage_path"],
+        "row_count": row["row_count"],
+        "column_count": row["column_count"],
+        "profile": {key: row[key] for key in ("columns_metadata", "statistics", "sample_rows", "sketches")},
+    }
+
+
+def record_upload(size: int, hit: bool, profile_reused: bool = False, transferred: bool = False) -> None:
+    """
+    Count one upload of `size` bytes. A hit's bytes were not stored again,
+    unless `transferred`: they had already been sent before the hash was known.
+    """
+    _stats["uploads"] += 1
+    if hit:
+        _stats["hits"] += 1
+        _stats["profiles_reused"] += profile_reused
+    if hit and not transferred:
+        _stats["bytes_saved"] += size
+    else:
+        _stats["bytes_uploaded"] += size
+
+
+def dedup_stats() -> Dict[str, Any]:
+    return {
+        **_stats,
+        "hit_ratio": _stats["hits"] / _stats["uploads"] if _stats["uploads"] else 0.0,
+        "enabled": get_settings().DEDUP_ENABLED,
+        "hash": HASH_NAME,
+    }
@@ -1,11 +1,12 @@
 """
 Drift and anomaly detectors.
 """
-from scipy.stats import ks_2samp, chi2_contingency
 import numpy as np
 from typing import Dict, Any, List, Tuple
 import logging
 
+from app.services.drift import DriftEngine
+
 logger = logging.getLogger(__name__)
 
 
@@ -61,26 +62,50 @@ class DriftDetector:
     """Detects statistical drift in numeric columns."""
     
     @staticmethod
-    def ks_test(before_stats: Dict[str, Any], after_stats: Dict[str, Any], column: str, threshold: float = 0.05) -> Tuple[bool, float]:
+    def ks_test(before: Dict[str, Any], after: Dict[str, Any], column: str, threshold: float = 0.05) -> Tuple[bool, float]:
         """
-        Kolmogorov-Smirnov test for distribution shift.
+        Two-sample Kolmogorov-Smirnov test for distribution shift, computed
+        from the quantile summaries stored in each profile's `sketches`.
         Returns: (is_drift, p_value)
         """
-        # This is simplified; in production you'd generate distributions from samples
-        # For now, compare means as proxy
-        before_mean = before_stats.get(column, {}).get("mean")
-        after_mean = after_stats.get(column, {}).get("mean")
-        
-        if before_mean is None or after_mean is None:
+        result = DriftEngine.compare(before, after, columns=[column], alpha=threshold).get(column)
+        if result is None:
             return False, 1.0
-        
-        # Simple heuristic: if mean shifted >10%, flag drift
-        pct_change = abs(after_mean - before_mean) / abs(before_mean + 1e-10)
-        is_drift = pct_change > 0.1
-        p_value = 0.01 if is_drift else 0.99
-        
-        return is_drift, p_value
-    
+        return result["ks_p_value"] < threshold, result["ks_p_value"]
+
+    @staticmethod
+    def score(before: Dict[str, Any], after: Dict[str, Any], threshold: float = 0.05) -> Dict[str, Dict[str, Any]]:
+        """
+        KS / PSI / Wasserstein scores for every numeric column of two profiles,
+        computed in one batch (see DriftEngine.compare).
+        """
+        return DriftEngine.compare(before, after, alpha=threshold)
+
+    @staticmethod
+    def chi_square_test(before: Dict[str, Any], after: Dict[str, Any], column: str, threshold: float = 0.05) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Chi-square / Jensen-Shannon test for a categorical column, computed
+        from the heavy-hitter summaries stored in each profile's `sketches`.
+        Returns: (is_drift, evidence_dict)
+        """
+        result = DriftEngine.compare_categorical(before, after, columns=[column], alpha=threshold).get(column)
+        if result is None:
+            return False, {}
+        return result["is_drift"], result
+
+    @staticmethod
+    def score_categorical(before: Dict[str, Any], after: Dict[str, Any], threshold: float = 0.05) -> Dict[str, Dict[str, Any]]:
+        """Chi-square / Jensen-Shannon scores for every categorical column of two profiles."""
+        return DriftEngine.compare_categorical(before, after, alpha=threshold)
+
+    @staticmethod
+    def score_semantic(before: Dict[str, Any], after: Dict[str, Any], threshold: float = 0.05) -> Dict[str, Dict[str, Any]]:
+        """
+        Embedding-centroid scores for every text column of two profiles,
+        computed from the embedding summaries stored in their `sketches`.
+        """
+        return DriftEngine.compare_semantic(before, after, alpha=threshold)
+
     @staticmethod
     def null_spike(before: Dict[str, Any], after: Dict[str, Any], column: str, threshold: float = 5.0) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -0,0 +1,389 @@
+"""
+Distribution drift engine – scores drift between two profiles from their
+stored sketches, without reloading raw data.
+
+Numeric columns: each is summarized by N equal-mass quantiles (see
+`sketches.QUANTILE_POINTS`), i.e. a representative sample of N points, and
+scored with KS, PSI and Wasserstein distance.
+
+Categorical columns: each keeps a Space-Saving heavy-hitter summary; the two
+summaries give a 2 x (K + 1) contingency table (top K values + "other"),
+scored with chi-square and Jensen-Shannon divergence.
+
+Text columns: each keeps the mean and per-dimension variance of its value
+embeddings (see services/semantic.py); the two summaries are compared by
+the cosine distance of their centroids and a diagonal Hotelling T^2 test,
+so no value is embedded again.
+
+The columns of a profile pair are stacked into matrices and scored in one
+NumPy batch per column kind.
+"""
+import numpy as np
+from scipy.stats import kstwobign, chi2
+from typing import Dict, Any, List, Optional
+import logging
+
+from app.services.sketches import SpaceSaving, EmbeddingMoments, quantile_summary
+
+logger = logging.getLogger(__name__)
+
+# PSI uses PSI_BINS bins of equal baseline mass; >= PSI_THRESHOLD is
+# conventionally a significant shift.
+PSI_BINS = 10
+PSI_THRESHOLD = 0.2
+PSI_EPSILON = 1e-4  # floor for empty bins
+
+# Categorical contingency tables keep the CATEGORY_BINS most frequent values
+# of either side plus an "other" bucket. Chi-square flags any real change on
+# large datasets, so drift also needs a Jensen-Shannon divergence (bits) of
+# at least JS_THRESHOLD.
+CATEGORY_BINS = 20
+JS_THRESHOLD = 0.001
+
+# Semantic drift also needs the centroids of the two sides' value embeddings
+# to be at least SEMANTIC_THRESHOLD apart in cosine distance (a few percent
+# of the values replaced by values of another kind; resampling the same
+# kind of values stays well below it).
+SEMANTIC_THRESHOLD = 0.05
+
+
+def _batch_ecdf(samples: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """
+    Row-wise empirical CDF: fraction of samples[i] <= points[i, j].
+
+    `samples` rows must be sorted. Every row is rescaled into [2i, 2i + 1]
+    so all rows can share one `searchsorted` over the flattened matrix.
+    """
+    n_rows, n = samples.shape
+    lo = np.minimum(samples[:, :1], points.min(axis=1, keepdims=True))
+    hi = np.maximum(samples[:, -1:], points.max(axis=1, keepdims=True))
+    scale = np.where(hi > lo, hi - lo, 1.0)
+    offset = 2.0 * np.arange(n_rows)[:, None]
+    flat = ((samples - lo) / scale + offset).ravel()
+    idx = np.searchsorted(flat, ((points - lo) / scale + offset).ravel(), side="right")
+    return (idx.reshape(points.shape) - n * np.arange(n_rows)[:, None]) / n
+
+
+def _contingency(before: SpaceSaving, after: SpaceSaving, bins: int) -> np.ndarray:
+    """
+    2 x (bins + 1) table of guaranteed counts (estimate less its error) for
+    the values most frequent on either side; the last column is the rest.
+    """
+    share = {}
+    for top in (before, after):
+        for key, count in top.counts.items():
+            share[key] = share.get(key, 0.0) + count / max(top.n, 1)
+    keys = sorted(share, key=share.get, reverse=True)[:bins]
+
+    table = np.zeros((2, bins + 1))
+    for row, top in enumerate((before, after)):
+        for j, key in enumerate(keys):
+            if key in top.counts:
+                table[row, j] = top.counts[key] - top.errors[key]
+        table[row, bins] = top.n - table[row, :bins].sum()
+    return table
+
+
+def _top_shares(top: Optional[Dict[str, Any]], k: int = 5) -> List[list]:
+    """[[value, share of rows]] of the `k` most frequent values of a serialized SpaceSaving."""
+    if not top or not top["n"]:
+        return []
+    summary = SpaceSaving.from_dict(top)
+    return [[key, count / summary.n] for key, count, _ in summary.top(k)]
+
+
+class DriftEngine:
+    """Vectorized drift scoring of profile pairs."""
+
+    @staticmethod
+    def score_batch(
+        before: np.ndarray,
+        after: np.ndarray,
+        n_before: np.ndarray,
+        n_after: np.ndarray,
+        tolerance: Optional[np.ndarray] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Score every row of two (columns x N) sorted quantile matrices.
+
+        `tolerance` is the CDF error of the summaries themselves; the KS
+        p-value is computed on the statistic less that tolerance, so sketch
+        error alone cannot look significant however large the datasets are.
+        """
+        n_cols, n = before.shape
+        if tolerance is None:
+            tolerance = np.zeros(n_cols)
+
+        # KS: largest CDF gap, checked at every point of both samples
+        points = np.concatenate([before, after], axis=1)
+        ks = np.abs(_batch_ecdf(before, points) - _batch_ecdf(after, points)).max(axis=1)
+        en = n_before * n_after / (n_before + n_after)
+        sqrt_en = np.sqrt(en)
+        effective = np.maximum(ks - tolerance, 0.0)
+        p_value = kstwobign.sf((sqrt_en + 0.12 + 0.11 / sqrt_en) * effective)
+
+        # PSI over bins of equal baseline mass
+        edges = before[:, n // PSI_BINS::n // PSI_BINS][:, :PSI_BINS - 1]
+        zeros, ones = np.zeros((n_cols, 1)), np.ones((n_cols, 1))
+        expected = np.diff(np.concatenate([zeros, _batch_ecdf(before, edges), ones], axis=1), axis=1)
+        actual = np.diff(np.concatenate([zeros, _batch_ecdf(after, edges), ones], axis=1), axis=1)
+        expected = np.maximum(expected, PSI_EPSILON)
+        actual = np.maximum(actual, PSI_EPSILON)
+        psi = ((actual - expected) * np.log(actual / expected)).sum(axis=1)
+
+        # Wasserstein-1 is the mean gap between matching quantiles
+        wasserstein = np.abs(after - before).mean(axis=1)
+        spread = before.std(axis=1)
+        normalized = np.divide(wasserstein, spread, out=np.full(n_cols, np.nan), where=spread > 0)
+
+        return {
+            "ks_statistic": ks,
+            "ks_p_value": p_value,
+            "psi": psi,
+            "wasserstein": wasserstein,
+            "wasserstein_normalized": normalized,
+        }
+
+    @staticmethod
+    def compare(
+        before: Dict[str, Any],
+        after: Dict[str, Any],
+        columns: Optional[List[str]] = None,
+        alpha: float = 0.05,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Score drift for the numeric columns present in both profiles.
+
+        Profiles must carry `sketches` (see DatasetProfiler.profile); columns
+        without a quantile summary on either side are skipped.
+
+        Returns:
+            {column: {"ks_statistic", "ks_p_value", "psi", "wasserstein",
+                      "wasserstein_normalized", "is_drift"}}
+        """
+        before_cols = (before.get("sketches") or {}).get("columns", {})
+        after_cols = (after.get("sketches") or {}).get("columns", {})
+        if columns is None:
+            columns = [col for col in before_cols if col in after_cols]
+
+        names, grids_before, grids_after, n_before, n_after, tolerance = [], [], [], [], [], []
+        for col in columns:
+            if col not in before_cols or col not in after_cols:
+                continue
+            a = quantile_summary(before_cols[col])
+            b = quantile_summary(after_cols[col])
+            if a is None or b is None or len(a[0]) != len(b[0]):
+                continue
+            if not (np.isfinite(a[0]).all() and np.isfinite(b[0]).all()):
+                continue
+            names.append(col)
+            grids_before.append(a[0])
+            grids_after.append(b[0])
+            n_before.append(a[1])
+            n_after.append(b[1])
+            tolerance.append(1.0 / len(a[0]) + a[2] + b[2])
+
+        if not names:
+            return {}
+
+        scores = DriftEngine.score_batch(
+            np.vstack(grids_before),
+            np.vstack(grids_after),
+            np.asarray(n_before, dtype=np.float64),
+            np.asarray(n_after, dtype=np.float64),
+            np.asarray(tolerance),
+        )
+        is_drift = (scores["ks_p_value"] < alpha) | (scores["psi"] >= PSI_THRESHOLD)
+
+        results = {}
+        for i, col in enumerate(names):
+            result = {key: float(values[i]) for key, values in scores.items()}
+            result["wasserstein_normalized"] = (
+                None if np.isnan(result["wasserstein_normalized"]) else result["wasserstein_normalized"]
+            )
+            result["is_drift"] = bool(is_drift[i])
+            results[col] = result
+        return results
+
+    @staticmethod
+    def score_categorical_batch(observed: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Chi-square test of homogeneity and Jensen-Shannon divergence for a
+        stack of 2 x K contingency tables (columns x 2 x K).
+        """
+        rows = observed.sum(axis=2, keepdims=True)
+        cols = observed.sum(axis=1, keepdims=True)
+        total = rows.sum(axis=1, keepdims=True)
+        expected = rows * cols / np.where(total > 0, total, 1.0)
+        cells = np.divide((observed - expected) ** 2, expected, out=np.zeros_like(observed), where=expected > 0)
+        statistic = cells.sum(axis=(1, 2))
+        dof = np.count_nonzero(cols[:, 0, :] > 0, axis=1) - 1
+        dof = np.where((rows[:, :, 0] > 0).all(axis=1), dof, 0)
+        p_value = np.where(dof > 0, chi2.sf(statistic, np.maximum(dof, 1)), 1.0)
+
+        # Jensen-Shannon divergence of the two row distributions, in bits
+        dist = np.divide(observed, rows, out=np.zeros_like(observed), where=rows > 0)
+        mid = dist.mean(axis=1, keepdims=True)
+        terms = np.divide(dist, mid, out=np.ones_like(dist), where=(dist > 0) & (mid > 0))
+        js = 0.5 * (dist * np.log2(terms)).sum(axis=(1, 2))
+
+        return {
+            "chi2_statistic": statistic,
+            "chi2_p_value": p_value,
+            "dof": dof,
+            "js_divergence": js,
+        }
+
+    @staticmethod
+    def compare_categorical(
+        before: Dict[str, Any],
+        after: Dict[str, Any],
+        columns: Optional[List[str]] = None,
+        alpha: float = 0.05,
+        bins: int = CATEGORY_BINS,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Score drift for the non-numeric columns present in both profiles.
+
+        Returns:
+            {column: {"chi2_statistic", "chi2_p_value", "dof", "js_divergence",
+                      "top_values", "is_drift"}}
+        """
+        before_cols = (before.get("sketches") or {}).get("columns", {})
+        after_cols = (after.get("sketches") or {}).get("columns", {})
+        if columns is None:
+            columns = [col for col in before_cols if col in after_cols]
+
+        names, tables, tops = [], [], []
+        for col in columns:
+            a = before_cols.get(col, {}).get("top")
+            b = after_cols.get(col, {}).get("top")
+            if a is None or b is None:
+                continue
+            a, b = SpaceSaving.from_dict(a), SpaceSaving.from_dict(b)
+            if a.n == 0 or b.n == 0:
+                continue
+            names.append(col)
+            tables.append(_contingency(a, b, bins))
+            tops.append((a, b))
+
+        if not names:
+            return {}
+
+        scores = DriftEngine.score_categorical_batch(np.stack(tables))
+        is_drift = (scores["chi2_p_value"] < alpha) & (scores["js_divergence"] >= JS_THRESHOLD)
+
+        results = {}
+        for i, col in enumerate(names):
+            a, b = tops[i]
+            results[col] = {
+                "chi2_statistic": float(scores["chi2_statistic"][i]),
+                "chi2_p_value": float(scores["chi2_p_value"][i]),
+                "dof": int(scores["dof"][i]),
+                "js_divergence": float(scores["js_divergence"][i]),
+                "top_values": {
+                    "before": [[key, count / a.n] for key, count, _ in a.top(5)],
+                    "after": [[key, count / b.n] for key, count, _ in b.top(5)],
+                },
+                "is_drift": bool(is_drift[i]),
+            }
+        return results
+
+    @staticmethod
+    def score_semantic_batch(
+        mean_before: np.ndarray,
+        var_before: np.ndarray,
+        n_before: np.ndarray,
+        mean_after: np.ndarray,
+        var_after: np.ndarray,
+        n_after: np.ndarray,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Score every row of two (columns x dims) stacks of embedding means
+        and variances, `n_*` being the number of values each summarizes.
+
+        The T^2 statistic treats the dimensions as independent (diagonal
+        covariance) and is referred to chi-square with one degree of
+        freedom per dimension that varies on either side.
+        """
+        norms = np.linalg.norm(mean_before, axis=1) * np.linalg.norm(mean_after, axis=1)
+        cosine = np.divide((mean_before * mean_after).sum(axis=1), norms, out=np.zeros(len(norms)), where=norms > 0)
+        delta = mean_after - mean_before
+        spread = (var_before.sum(axis=1) + var_after.sum(axis=1)) / 2
+        shift = np.divide((delta * delta).sum(axis=1), spread, out=np.zeros(len(spread)), where=spread > 0)
+
+        standard_error = var_before / n_before[:, None] + var_after / n_after[:, None]
+        varies = standard_error > 0
+        t2 = np.divide(delta * delta, standard_error, out=np.zeros_like(delta), where=varies).sum(axis=1)
+        dof = varies.sum(axis=1)
+        p_value = np.where(dof > 0, chi2.sf(t2, np.maximum(dof, 1)), 1.0)
+
+        return {
+            "cosine_distance": 1.0 - cosine,
+            "centroid_shift": shift,
+            "t2_statistic": t2,
+            "p_value": p_value,
+            "dof": dof,
+        }
+
+    @staticmethod
+    def compare_semantic(
+        before: Dict[str, Any],
+        after: Dict[str, Any],
+        columns: Optional[List[str]] = None,
+        alpha: float = 0.05,
+        threshold: float = SEMANTIC_THRESHOLD,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Score semantic drift for the text columns of both profiles whose
+        embedding summaries come from the same embedder.
+
+        Returns:
+            {column: {"cosine_distance", "centroid_shift", "t2_statistic",
+                      "p_value", "dof", "embedder", "values", "top_values",
+                      "is_drift"}}
+        """
+        before_cols = (before.get("sketches") or {}).get("columns", {})
+        after_cols = (after.get("sketches") or {}).get("columns", {})
+        if columns is None:
+            columns = [col for col in before_cols if col in after_cols]
+
+        # columns of one embedder share a dimension, so each group is one batch
+        groups: Dict[str, List[tuple]] = {}
+        for col in columns:
+            a = before_cols.get(col, {}).get("semantic")
+            b = after_cols.get(col, {}).get("semantic")
+            if a is None or b is None or a["embedder"] != b["embedder"]:
+                continue
+            a, b = EmbeddingMoments.from_dict(a), EmbeddingMoments.from_dict(b)
+            if a.values == 0 or b.values == 0:
+                continue
+            groups.setdefault(a.embedder, []).append((col, a, b))
+
+        results = {}
+        for embedder, group in groups.items():
+            scores = DriftEngine.score_semantic_batch(
+                np.vstack([a.mean for _, a, _ in group]),
+                np.vstack([a.variance for _, a, _ in group]),
+                np.array([a.values for _, a, _ in group], dtype=np.float64),
+                np.vstack([b.mean for _, _, b in group]),
+                np.vstack([b.variance for _, _, b in group]),
+                np.array([b.values for _, _, b in group], dtype=np.float64),
+            )
+            is_drift = (scores["p_value"] < alpha) & (scores["cosine_distance"] >= threshold)
+            for i, (col, a, b) in enumerate(group):
+                results[col] = {
+                    "cosine_distance": float(scores["cosine_distance"][i]),
+                    "centroid_shift": float(scores["centroid_shift"][i]),
+                    "t2_statistic": float(scores["t2_statistic"][i]),
+                    "p_value": float(scores["p_value"][i]),
+                    "dof": int(scores["dof"][i]),
+                    "embedder": embedder,
+                    "values": {"before": a.values, "after": b.values},
+                    "top_values": {
+                        "before": _top_shares(before_cols[col].get("top")),
+                        "after": _top_shares(after_cols[col].get("top")),
+                    },
+                    "is_drift": bool(is_drift[i]),
+                }
+        return results
@@ -0,0 +1,133 @@
+"""
+Streaming upload ingestion – copies an upload to storage and profiles it
+chunk by chunk, so memory use is bounded by UPLOAD_BUFFER_SIZE rather than
+by the size of the file.
+"""
+import time
+import asyncio
+import tempfile
+from typing import Dict, Any
+import logging
+
+from fastapi import UploadFile
+
+from app.config import get_settings
+from app.services.profiler import IncrementalProfiler
+from app.services.parquet_profiler import profile_parquet
+from app.services.jobs import get_profile_executor
+from app.services.dedup import new_hasher, find_by_hash, record_upload
+from app.utils.metrics import stage, record_stage
+
+logger = logging.getLogger(__name__)
+
+
+async def ingest_upload(file: UploadFile, dataset_id: str) -> Dict[str, Any]:
+    """
+    Stream `file` to storage (MinIO multipart or the local fallback) while
+    feeding the same chunks to an incremental profiler.
+
+    CSV chunks are parsed as they arrive. Parquet needs its footer before any
+    row can be decoded, so Parquet chunks are spooled to a temporary file and
+    profiled from its footer and row groups once the upload is complete
+    (see services/parquet_profiler.py).
+
+    The upload is hashed as it streams and stored under its content hash.
+    CSV is profiled as it arrives, before the hash is known; a Parquet
+    upload whose content was seen before reuses that profile. The bytes have
+    already been sent to storage by then, so a streaming dedup hit saves no
+    transfer and is counted as uploaded bytes.
+
+    Returns:
+        {"storage_path": str | None, "content_hash": str, "profile": {...},
+         "row_count": int, "column_count": int}
+    """
+    from app.utils.storage import open_upload_sink
+
+    settings = get_settings()
+    chunk_size = settings.UPLOAD_CHUNK_SIZE
+    buffer_size = settings.UPLOAD_BUFFER_SIZE
+    is_csv = file.filename.endswith(".csv")
+
+    profiler = IncrementalProfiler(buffer_size=buffer_size)
+    hasher = new_hasher()
+    size = 0
+    existing = None
+    spool = None if is_csv else tempfile.NamedTemporaryFile(suffix=".parquet")
+
+    # per-chunk work is summed and recorded once per stage (see utils/metrics.py)
+    spent = {"read": 0.0, "store": 0.0, "profile": 0.0}
+    try:
+        sink = await asyncio.to_thread(open_upload_sink, dataset_id, file.filename, buffer_size)
+    except Exception as e:
+        # If even the fallback failed unexpectedly, log and continue profiling
+        logger.error("Storage error (both MinIO and fallback): %s", e)
+        sink = None
+
+    try:
+        while True:
+            started = time.perf_counter()
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            size += len(chunk)
+            stored = time.perf_counter()
+            spent["read"] += stored - started
+            if sink is not None:
+                try:
+                    await asyncio.to_thread(sink.write, chunk)
+                except Exception as e:
+                    logger.error("Streaming storage write failed: %s", e)
+                    await asyncio.to_thread(sink.abort)
+                    sink = None
+            profiled = time.perf_counter()
+            spent["store"] += profiled - stored
+            if is_csv:
+                await asyncio.to_thread(profiler.feed_csv, chunk)
+            else:
+                spool.write(chunk)
+            spent["profile"] += time.perf_counter() - profiled
+        for name, seconds in spent.items():
+            record_stage(name, seconds)
+
+        content_hash = hasher.hexdigest()
+        with stage("dedup_lookup"):
+            existing = await find_by_hash(content_hash)
+        if is_csv:
+            with stage("profile"):
+                await asyncio.to_thread(profiler.finish_csv)
+        elif existing is not None:
+            parquet = {key: existing[key] for key in ("profile", "row_count", "column_count")}
+        else:
+            spool.flush()
+            with stage("profile"):
+                parquet = await profile_parquet(spool.name, get_profile_executor())
+    except BaseException:
+        if sink is not None:
+            await asyncio.to_thread(sink.abort)
+        raise
+    finally:
+        if spool is not None:
+            spool.close()
+
+    storage_path = None
+    if sink is not None:
+        try:
+            with stage("store"):
+                storage_path = await asyncio.to_thread(sink.close, content_hash)
+            logger.info("Streamed upload to %s", storage_path)
+        except Exception as e:
+            logger.error("Storage error while finishing upload: %s", e)
+    record_upload(
+        size, hit=existing is not None, profile_reused=existing is not None and not is_csv, transferred=True
+    )
+
+    if not is_csv:
+        return {"storage_path": storage_path, "content_hash": content_hash, **parquet}
+    return {
+        "storage_path": storage_path,
+        "content_hash": content_hash,
+        "profile": profiler.result(),
+        "row_count": profiler.row_count,
+        "column_count": profiler.column_count,
+    }
@@ -0,0 +1,382 @@
+"""
+Background upload jobs – uploads are spooled to disk and return a job id at
+once; parsing and profiling run in a process pool, storage in a thread, so
+the event loop only ever waits on I/O.
+
+Job state lives in the `jobs` table; the spooled file outlives the process,
+so jobs interrupted by a restart are re-queued by `recover_jobs()`. Each job
+row names its owning process, which renews the row's heartbeat every
+JOB_HEARTBEAT_SECONDS; another process claims a queued/running job only once
+that heartbeat is older than JOB_LEASE_SECONDS (with FOR UPDATE SKIP LOCKED,
+so concurrent claimers never take the same job).
+"""
+import os
+import socket
+import time
+import uuid
+import asyncio
+import logging
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Any, Optional, Set
+
+from fastapi import UploadFile
+
+from app.config import get_settings
+from app.models.enums import JobStatus
+from app.supabase_client import table_insert, table_select, table_update, fetch, execute
+from app.services.dedup import new_hasher, hash_file, find_by_hash, record_upload
+
+logger = logging.getLogger(__name__)
+
+TABLE_JOBS = "jobs"
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"  # owner of this process's jobs
+_ACTIVE = (JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+_tasks: Set[asyncio.Task] = set()
+_heartbeat_task: Optional[asyncio.Task] = None
+_pending = 0  # queued + running jobs in this process
+_spooled_bytes = 0  # bytes of spool files not yet released
+
+
+class JobQueueFull(Exception):
+    """Raised when accepting another job would exceed the configured limits."""
+
+
+def profile_file(path: str, filename: str) -> Dict[str, Any]:
+    """
+    Parse and profile a spooled upload. Runs in a worker process.
+
+    Returns:
+        {"profile": {...}, "row_count": int, "column_count": int}
+    """
+    if not filename.endswith(".csv"):
+        from app.services.parquet_profiler import ParquetProfiler
+
+        return ParquetProfiler.profile(path)
+    from app.services.csv_profiler import ChunkedCSVProfiler
+
+    return ChunkedCSVProfiler.profile(path)
+
+
+def get_profile_executor() -> ProcessPoolExecutor:
+    """The process pool profiling runs in (shared with background jobs)."""
+    return _get_executor()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: workers must not inherit the event loop, pool sockets or threads
+        _executor = ProcessPoolExecutor(
+            max_workers=get_settings().JOB_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(get_settings().JOB_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _spool_dir() -> Path:
+    path = Path(get_settings().JOB_SPOOL_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def job_stats() -> Dict[str, Any]:
+    """Queue depth and spool usage of this process."""
+    settings = get_settings()
+    return {
+        "pending": _pending,
+        "max_pending": settings.JOB_MAX_PENDING,
+        "running_limit": settings.JOB_MAX_CONCURRENCY,
+        "spooled_bytes": _spooled_bytes,
+        "max_spooled_bytes": settings.JOB_MAX_SPOOL_BYTES,
+    }
+
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    rows = await table_select(TABLE_JOBS, filters=f"id=eq.{job_id}", params={"limit": 1})
+    return rows[0] if rows else None
+
+
+async def submit_upload(file: UploadFile, name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Spool `file` to disk, record a queued job and schedule it.
+
+    Raises JobQueueFull if JOB_MAX_PENDING jobs are already pending or the
+    spool would grow past JOB_MAX_SPOOL_BYTES (checked while spooling, so
+    an oversized upload is cut off rather than written out whole).
+    """
+    global _pending, _spooled_bytes
+    settings = get_settings()
+    if _pending >= settings.JOB_MAX_PENDING:
+        raise JobQueueFull(f"{_pending} jobs pending")
+
+    _pending += 1
+    job_id = str(uuid.uuid4())
+    spool_path = _spool_dir() / f"{job_id}-{Path(file.filename).name}"
+    spooled = 0
+    hasher = new_hasher()
+    try:
+        with open(spool_path, "wb") as fh:
+            while True:
+                chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if _spooled_bytes + len(chunk) > settings.JOB_MAX_SPOOL_BYTES:
+                    raise JobQueueFull(f"spool limit of {settings.JOB_MAX_SPOOL_BYTES} bytes reached")
+                _spooled_bytes += len(chunk)
+                spooled += len(chunk)
+                hasher.update(chunk)
+                await asyncio.to_thread(fh.write, chunk)
+
+        job = await table_insert(TABLE_JOBS, {
+            "id": job_id,
+            "job_type": "upload",
+            "status": JobStatus.QUEUED.value,
+            "stage": "queued",
+            "filename": file.filename,
+            "name": name or file.filename,
+            "spool_path": str(spool_path),
+            "content_hash": hasher.hexdigest(),
+            "timings": {},
+            "owner": WORKER_ID,
+            "heartbeat_at": datetime.utcnow(),
+        })
+    except BaseException:
+        _pending -= 1
+        _spooled_bytes -= spooled
+        spool_path.unlink(missing_ok=True)
+        raise
+
+    _schedule(job, spooled)
+    return job
+
+
+def _schedule(job: Dict[str, Any], spooled: int) -> None:
+    task = asyncio.create_task(_run_upload(job, spooled))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _run_upload(job: Dict[str, Any], spooled: int) -> None:
+    """
+    Run one upload job: profile + store concurrently, then persist. Content
+    seen before reuses the stored object and profile instead.
+    """
+    global _pending, _spooled_bytes, _executor
+    from app.routers.datasets import save_dataset
+    from app.utils.storage import store_file
+
+    job_id = job["id"]
+    filename = job["filename"]
+    spool_path = job["spool_path"]
+    timings: Dict[str, float] = {}
+    filters = f"id=eq.{job_id}"
+    queued_at = time.perf_counter()
+
+    async def timed(stage: str, awaitable):
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[stage] = round(time.perf_counter() - started, 4)
+
+    try:
+        async with _get_semaphore():
+            timings["queued"] = round(time.perf_counter() - queued_at, 4)
+            dataset_id = str(uuid.uuid4())
+            await table_update(TABLE_JOBS, {
+                "status": JobStatus.RUNNING.value,
+                "stage": "profile",
+                "started_at": datetime.utcnow(),
+                "timings": timings,
+            }, filters)
+
+            # jobs recovered from before hashing was added have no hash yet
+            content_hash = job.get("content_hash") or await asyncio.to_thread(hash_file, spool_path)
+            existing = await find_by_hash(content_hash)
+            record_upload(spooled, hit=existing is not None, profile_reused=existing is not None)
+            if existing is not None:
+                logger.info("Job %s matches dataset %s; reusing its object and profile", job_id, existing["dataset_id"])
+                profiled = existing
+                storage_path = existing["storage_path"]
+            else:
+                loop = asyncio.get_running_loop()
+                if filename.endswith(".parquet"):
+                    from app.services.parquet_profiler import profile_parquet
+
+                    # footer first, then row groups spread over the pool
+                    profiling = profile_parquet(spool_path, _get_executor())
+                else:
+                    profiling = loop.run_in_executor(_get_executor(), profile_file, spool_path, filename)
+                profiled, storage_path = await asyncio.gather(
+                    timed("profile", profiling),
+                    timed("storage", asyncio.to_thread(store_file, dataset_id, filename, spool_path, content_hash)),
+                    return_exceptions=True,
+                )
+                if isinstance(profiled, BaseException):
+                    raise profiled
+                if isinstance(storage_path, BaseException):
+                    # same policy as the synchronous upload: keep the dataset, without a path
+                    logger.error("Storage error (both MinIO and fallback): %s", storage_path)
+                    storage_path = None
+
+            await table_update(TABLE_JOBS, {"stage": "persist", "timings": timings}, filters)
+            dataset, profile = await timed("persist", save_dataset(
+                dataset_id,
+                job["name"],
+                storage_path,
+                profiled["row_count"],
+                profiled["column_count"],
+                profiled["profile"],
+                content_hash,
+            ))
+
+            await table_update(TABLE_JOBS, {
+                "status": JobStatus.SUCCEEDED.value,
+                "stage": "done",
+                "dataset_id": dataset["id"],
+                "profile_id": profile["id"] if profile else None,
+                "timings": timings,
+                "finished_at": datetime.utcnow(),
+            }, filters)
+            logger.info("Job %s finished: dataset %s (%s)", job_id, dataset_id, timings)
+    except asyncio.CancelledError:
+        # shutdown: leave the row queued/running; shutdown_jobs() releases it for recovery
+        spool_path = None
+        raise
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            # a worker died (e.g. out of memory); start a fresh pool for later jobs
+            _executor = None
+        logger.error("Job %s failed: %s", job_id, e, exc_info=True)
+        try:
+            await table_update(TABLE_JOBS, {
+                "status": JobStatus.FAILED.value,
+                "error": str(e) or type(e).__name__,
+                "timings": timings,
+                "finished_at": datetime.utcnow(),
+            }, filters)
+        except Exception as e_update:
+            logger.error("Could not record failure of job %s: %s", job_id, e_update)
+    finally:
+        _pending -= 1
+        _spooled_bytes -= spooled
+        if spool_path:
+            Path(spool_path).unlink(missing_ok=True)
+
+
+async def claim_jobs() -> int:
+    """
+    Take over queued/running jobs whose owner stopped renewing their
+    heartbeat, up to this process's free JOB_MAX_PENDING slots, and schedule
+    those whose spool file still exists; fail the rest. Returns the number
+    of jobs claimed.
+    """
+    global _pending, _spooled_bytes
+    settings = get_settings()
+    capacity = settings.JOB_MAX_PENDING - _pending
+    if capacity <= 0:
+        return 0
+    # the row lock makes the claim atomic: a job another process is claiming is skipped
+    claimed = await fetch(
+        f"""
+        UPDATE {TABLE_JOBS}
+        SET owner = $1, heartbeat_at = now() AT TIME ZONE 'utc', status = $2, stage = 'queued', started_at = NULL
+        WHERE id IN (
+            SELECT id FROM {TABLE_JOBS}
+            WHERE status = ANY($3::text[])
+              AND (heartbeat_at IS NULL OR heartbeat_at < now() AT TIME ZONE 'utc' - make_interval(secs => $4))
+            ORDER BY created_at
+            LIMIT $5
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *
+        """,
+        WORKER_ID, JobStatus.QUEUED.value, list(_ACTIVE), settings.JOB_LEASE_SECONDS, capacity,
+    )
+    for job in claimed:
+        spool_path = job.get("spool_path")
+        if spool_path and os.path.exists(spool_path):
+            spooled = os.path.getsize(spool_path)
+            _pending += 1
+            _spooled_bytes += spooled
+            _schedule(job, spooled)
+            logger.info("Re-queued interrupted job %s", job["id"])
+        else:
+            await table_update(TABLE_JOBS, {
+                "status": JobStatus.FAILED.value,
+                "error": "interrupted by restart",
+                "finished_at": datetime.utcnow(),
+            }, f"id=eq.{job['id']}")
+            logger.warning("Job %s was interrupted and its upload is gone", job["id"])
+    return len(claimed)
+
+
+async def _heartbeat_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await execute(
+                f"UPDATE {TABLE_JOBS} SET heartbeat_at = now() AT TIME ZONE 'utc' "
+                f"WHERE owner = $1 AND status = ANY($2::text[])",
+                WORKER_ID, list(_ACTIVE),
+            )
+            await claim_jobs()
+        except Exception as e:
+            logger.error("Job heartbeat failed: %s", e)
+
+
+async def recover_jobs() -> None:
+    """
+    Claim jobs orphaned by stopped processes (see `claim_jobs`), then keep
+    renewing this process's jobs and claiming newly orphaned ones every
+    JOB_HEARTBEAT_SECONDS. Call once at startup.
+    """
+    global _heartbeat_task
+    await claim_jobs()
+    if _heartbeat_task is None:
+        _heartbeat_task = asyncio.get_running_loop().create_task(
+            _heartbeat_loop(get_settings().JOB_HEARTBEAT_SECONDS)
+        )
+
+
+async def shutdown_jobs() -> None:
+    """
+    Cancel in-flight jobs and stop the workers. The jobs' heartbeats are
+    cleared, so the next process to start (or a live one) claims them at once.
+    """
+    global _executor, _heartbeat_task
+    if _heartbeat_task is not None:
+        _heartbeat_task.cancel()
+        try:
+            await _heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        _heartbeat_task = None
+    for task in list(_tasks):
+        task.cancel()
+    if _tasks:
+        await asyncio.gather(*_tasks, return_exceptions=True)
+        try:
+            await execute(
+                f"UPDATE {TABLE_JOBS} SET heartbeat_at = NULL WHERE owner = $1 AND status = ANY($2::text[])",
+                WORKER_ID, list(_ACTIVE),
+            )
+        except Exception as e:
+            logger.error("Could not release jobs: %s", e)
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
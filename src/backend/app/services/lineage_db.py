@@ -0,0 +1,233 @@
+"""
+Database-side lineage traversal – recursive CTE queries over `lineage` and
+an optional transitive closure table (`lineage_closure`), for workers that
+should not hold the whole graph in memory.
+
+The recursive CTE walks simple paths, carrying the path array: a step onto a
+node already on its path is flagged as a cycle and not extended, so cycles
+are reported exactly and recursion stops at LINEAGE_MAX_DEPTH. Its work grows
+with the number of simple paths within the depth limit; graphs with many
+converging paths are better served by the closure table.
+
+`lineage_closure` stores, per (ancestor, descendant, path length), the
+number of such paths. Inserting edge u->v adds paths(a->u) x paths(v->d) for
+every ancestor a of u and descendant d of v; deleting it subtracts the same,
+which is exact as long as the graph is acyclic (cycle-forming edges are
+rejected while the closure is enabled).
+"""
+import time
+import logging
+from typing import Dict, Any, List, Optional
+
+from app.config import get_settings
+from app.supabase_client import fetch, execute, transaction
+from app.services.lineage_graph import LineageGraph, get_lineage_graph, EDGE_COLUMNS, TABLE_LINEAGE, DOWNSTREAM
+
+logger = logging.getLogger(__name__)
+
+TABLE_CLOSURE = "lineage_closure"
+_CLOSURE_LOCK_KEY = 7_244_105  # pg advisory lock serializing closure maintenance
+
+
+class LineageCycleError(ValueError):
+    """Raised when an edge would close a cycle while the closure table is maintained."""
+
+
+def _columns(direction: str):
+    """(column we walk from, column we walk to) for a direction."""
+    if direction == DOWNSTREAM:
+        return "source_dataset_id", "target_dataset_id"
+    return "target_dataset_id", "source_dataset_id"
+
+
+async def traverse_cte(
+    dataset_id: str,
+    direction: str = DOWNSTREAM,
+    max_depth: Optional[int] = None,
+    job_types: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Reachable datasets via one recursive CTE.
+
+    Returns {"depths": {dataset_id: shortest depth}, "cycle_detected": bool}.
+    Each row carries its path; stepping onto a node already on the path marks
+    a cycle (within the depth limit) and ends that branch.
+    """
+    cap = min(max_depth or get_settings().LINEAGE_MAX_DEPTH, get_settings().LINEAGE_MAX_DEPTH)
+    walk_from, walk_to = _columns(direction)
+    type_filter = "AND l.job_type = ANY($3::text[])" if job_types is not None else ""
+    sql = f"""
+        WITH RECURSIVE walk(node, depth, path, is_cycle) AS (
+            SELECT $1::text, 0, ARRAY[$1::text], false
+          UNION ALL
+            SELECT l.{walk_to}, w.depth + 1, w.path || l.{walk_to}, l.{walk_to} = ANY(w.path)
+            FROM walk w JOIN {TABLE_LINEAGE} l ON l.{walk_from} = w.node
+            WHERE w.depth < $2 AND NOT w.is_cycle {type_filter}
+        )
+        SELECT node, MIN(depth) AS depth, BOOL_OR(is_cycle) AS is_cycle FROM walk GROUP BY node
+    """
+    args = [dataset_id, cap] + ([job_types] if job_types is not None else [])
+    rows = await fetch(sql, *args)
+    return {
+        "depths": {r["node"]: r["depth"] for r in rows if r["node"] != dataset_id},
+        "cycle_detected": any(r["is_cycle"] for r in rows),
+    }
+
+
+async def closure_lookup(
+    dataset_id: str,
+    direction: str = DOWNSTREAM,
+    max_depth: Optional[int] = None,
+) -> Dict[str, int]:
+    """All descendants (or ancestors) of a dataset with their shortest depth: one indexed lookup."""
+    key, other = ("ancestor_id", "descendant_id") if direction == DOWNSTREAM else ("descendant_id", "ancestor_id")
+    depth_filter = "AND depth <= $2" if max_depth is not None else ""
+    rows = await fetch(
+        f"SELECT {other} AS node, MIN(depth) AS depth FROM {TABLE_CLOSURE} "
+        f"WHERE {key} = $1 {depth_filter} GROUP BY {other}",
+        *([dataset_id, max_depth] if max_depth is not None else [dataset_id]),
+    )
+    return {r["node"]: r["depth"] for r in rows}
+
+
+async def query_db(
+    dataset_id: str,
+    direction: str = DOWNSTREAM,
+    max_depth: Optional[int] = None,
+    job_types: Optional[List[str]] = None,
+    paths: bool = False,
+) -> Dict[str, Any]:
+    """
+    Same result shape as `LineageGraph.query`, computed in the database:
+    the reachable set comes from the closure table (when enabled and no job
+    type filter applies) or the recursive CTE, then the edges among those
+    datasets are fetched in one query to attach each node's edge and path.
+    """
+    cycle_detected = False
+    if get_settings().LINEAGE_CLOSURE_ENABLED and job_types is None:
+        depths = await closure_lookup(dataset_id, direction, max_depth)
+    else:
+        walked = await traverse_cte(dataset_id, direction, max_depth, job_types)
+        depths, cycle_detected = walked["depths"], walked["cycle_detected"]
+
+    nodes = [dataset_id, *depths]
+    type_filter = "AND job_type = ANY($2::text[])" if job_types is not None else ""
+    edges = await fetch(
+        f"SELECT {EDGE_COLUMNS} FROM {TABLE_LINEAGE} "
+        f"WHERE source_dataset_id = ANY($1::text[]) AND target_dataset_id = ANY($1::text[]) {type_filter}",
+        *([nodes, job_types] if job_types is not None else [nodes]),
+    )
+    # shortest paths to reached nodes only pass through reached nodes, so a
+    # search of this subgraph reproduces the database depths
+    result = LineageGraph.from_rows(edges).query(dataset_id, direction, max_depth, job_types, paths)
+    result["cycle_detected"] = cycle_detected
+    return result
+
+
+async def query_lineage(
+    dataset_id: str,
+    direction: str = DOWNSTREAM,
+    max_depth: Optional[int] = None,
+    job_types: Optional[List[str]] = None,
+    paths: bool = False,
+    mode: Optional[str] = None,
+) -> Dict[str, Any]:
+    """`LineageGraph.query` or `query_db`, by `mode` (default LINEAGE_TRAVERSAL_MODE)."""
+    if (mode or get_settings().LINEAGE_TRAVERSAL_MODE) == "memory":
+        graph = await get_lineage_graph()
+        return graph.query(dataset_id, direction, max_depth=max_depth, job_types=job_types, paths=paths)
+    return await query_db(dataset_id, direction, max_depth=max_depth, job_types=job_types, paths=paths)
+
+
+async def _apply_closure(source_id: str, target_id: str, sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) the paths through edge source->target."""
+    rows = await fetch(
+        f"""
+        INSERT INTO {TABLE_CLOSURE} (ancestor_id, descendant_id, depth, path_count)
+        SELECT a.id, d.id, a.depth + 1 + d.depth, SUM(a.n * d.n) * $3
+        FROM (SELECT ancestor_id AS id, depth, path_count AS n FROM {TABLE_CLOSURE} WHERE descendant_id = $1
+              UNION ALL SELECT $1::text, 0, 1::numeric) a
+        CROSS JOIN (SELECT descendant_id AS id, depth, path_count AS n FROM {TABLE_CLOSURE} WHERE ancestor_id = $2
+              UNION ALL SELECT $2::text, 0, 1::numeric) d
+        GROUP BY 1, 2, 3
+        ON CONFLICT (ancestor_id, descendant_id, depth)
+        DO UPDATE SET path_count = {TABLE_CLOSURE}.path_count + EXCLUDED.path_count
+        RETURNING ancestor_id, descendant_id, depth, path_count
+        """,
+        source_id, target_id, sign,
+    )
+    gone = [r for r in rows if r["path_count"] <= 0]
+    if gone:
+        await execute(
+            f"DELETE FROM {TABLE_CLOSURE} WHERE (ancestor_id, descendant_id, depth) IN "
+            f"(SELECT * FROM unnest($1::text[], $2::text[], $3::int[]))",
+            [r["ancestor_id"] for r in gone],
+            [r["descendant_id"] for r in gone],
+            [r["depth"] for r in gone],
+        )
+
+
+async def closure_add_edge(source_id: str, target_id: str) -> None:
+    """
+    Record a new edge in the closure table. Call inside the `transaction()`
+    that inserts the lineage row; raises LineageCycleError for a cycle.
+    """
+    await execute("SELECT pg_advisory_xact_lock($1)", _CLOSURE_LOCK_KEY)
+    if source_id == target_id or await fetch(
+        f"SELECT 1 FROM {TABLE_CLOSURE} WHERE ancestor_id = $1 AND descendant_id = $2 LIMIT 1",
+        target_id, source_id,
+    ):
+        raise LineageCycleError(f"Edge {source_id} -> {target_id} would create a lineage cycle")
+    await _apply_closure(source_id, target_id, 1)
+
+
+async def closure_remove_edge(source_id: str, target_id: str) -> None:
+    """Remove a deleted edge's paths. Call inside the deleting `transaction()`."""
+    await execute("SELECT pg_advisory_xact_lock($1)", _CLOSURE_LOCK_KEY)
+    await _apply_closure(source_id, target_id, -1)
+
+
+async def rebuild_closure() -> int:
+    """
+    Recompute `lineage_closure` from `lineage`, one path length per
+    statement. Returns the number of closure rows.
+    """
+    started = time.perf_counter()
+    max_depth = get_settings().LINEAGE_MAX_DEPTH
+    async with transaction():
+        await execute("SELECT pg_advisory_xact_lock($1)", _CLOSURE_LOCK_KEY)
+        await execute(f"TRUNCATE {TABLE_CLOSURE}")
+        status = await execute(
+            f"INSERT INTO {TABLE_CLOSURE} (ancestor_id, descendant_id, depth, path_count) "
+            f"SELECT source_dataset_id, target_dataset_id, 1, COUNT(*) FROM {TABLE_LINEAGE} GROUP BY 1, 2"
+        )
+        total = inserted = int(status.split()[-1])
+        depth = 1
+        while inserted:
+            if depth >= max_depth:
+                raise LineageCycleError(f"Lineage has a cycle or a path longer than {max_depth}")
+            status = await execute(
+                f"""
+                INSERT INTO {TABLE_CLOSURE} (ancestor_id, descendant_id, depth, path_count)
+                SELECT c.ancestor_id, l.target_dataset_id, c.depth + 1, SUM(c.path_count)
+                FROM {TABLE_CLOSURE} c JOIN {TABLE_LINEAGE} l ON l.source_dataset_id = c.descendant_id
+                WHERE c.depth = $1
+                GROUP BY 1, 2, 3
+                """,
+                depth,
+            )
+            inserted = int(status.split()[-1])
+            total += inserted
+            depth += 1
+    logger.info("Lineage closure rebuilt: %d rows, depth %d, %.2fs", total, depth, time.perf_counter() - started)
+    return total
+
+
+async def ensure_closure() -> None:
+    """Rebuild the closure table if it does not match `lineage` (e.g. just enabled)."""
+    rows = await fetch(
+        f"SELECT (SELECT COALESCE(SUM(path_count), 0) FROM {TABLE_CLOSURE} WHERE depth = 1) AS closure_edges, "
+        f"(SELECT COUNT(*) FROM {TABLE_LINEAGE}) AS edges"
+    )
+    if rows[0]["closure_edges"] != rows[0]["edges"]:
+        await rebuild_closure()
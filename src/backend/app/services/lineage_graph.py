@@ -0,0 +1,320 @@
+"""
+In-memory lineage graph index – the `lineage` table as CSR adjacency arrays
+over integer node ids, so transitive upstream/downstream queries are a few
+vectorized frontier expansions instead of one SELECT per hop.
+
+Edges written through this process are added incrementally (to a small
+delta list that is folded into the CSR arrays once it grows); edges written
+by other workers are picked up every LINEAGE_GRAPH_REFRESH_SECONDS, and the
+whole index is reloaded every LINEAGE_GRAPH_RELOAD_SECONDS.
+"""
+import time
+import asyncio
+import logging
+import numpy as np
+from typing import Dict, Any, List, Optional, Iterable
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+TABLE_LINEAGE = "lineage"
+UPSTREAM = "upstream"
+DOWNSTREAM = "downstream"
+EDGE_COLUMNS = "id,source_dataset_id,target_dataset_id,job_name,job_type,confidence,created_at"
+
+
+class LineageGraph:
+    """
+    Lineage edges in CSR form, one index per direction.
+
+    Edge i goes from `_src[i]` to `_dst[i]`; for each direction, the CSR
+    arrays list every node's neighbours (and edge indices) contiguously.
+    Edges added since the last compaction live in `_delta` and are
+    traversed alongside the CSR arrays.
+    """
+
+    def __init__(self):
+        self._node_ids: Dict[str, int] = {}
+        self._nodes: List[str] = []
+        self._job_type_ids: Dict[Optional[str], int] = {}
+        self._edge_ids: Dict[str, int] = {}  # lineage row id -> edge index
+        self._edge_meta: List[tuple] = []  # (row id, job_name, job_type, confidence)
+        self._src = np.empty(0, dtype=np.int64)
+        self._dst = np.empty(0, dtype=np.int64)
+        self._type = np.empty(0, dtype=np.int32)
+        self._alive = np.empty(0, dtype=bool)
+        self._n_edges = 0
+        self._n_dead = 0
+        self._csr: Dict[str, tuple] = {}
+        self._delta: Dict[str, Dict[int, List[int]]] = {UPSTREAM: {}, DOWNSTREAM: {}}
+        self._n_delta = 0
+        self.compact()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "LineageGraph":
+        graph = cls()
+        for row in rows:
+            graph.add_edge(row, compact=False)
+        graph.compact()
+        return graph
+
+    @property
+    def node_count(self) -> int:
+        return len(self._nodes)
+
+    @property
+    def edge_count(self) -> int:
+        return self._n_edges - self._n_dead
+
+    def __contains__(self, row_id: str) -> bool:
+        return row_id in self._edge_ids
+
+    def _node(self, dataset_id: str) -> int:
+        node = self._node_ids.get(dataset_id)
+        if node is None:
+            node = self._node_ids[dataset_id] = len(self._nodes)
+            self._nodes.append(dataset_id)
+        return node
+
+    def _append(self, src: int, dst: int, job_type: int) -> int:
+        idx = self._n_edges
+        if idx == len(self._src):
+            capacity = max(64, 2 * idx)
+            self._src = np.resize(self._src, capacity)
+            self._dst = np.resize(self._dst, capacity)
+            self._type = np.resize(self._type, capacity)
+            self._alive = np.resize(self._alive, capacity)
+        self._src[idx], self._dst[idx], self._type[idx], self._alive[idx] = src, dst, job_type, True
+        self._n_edges += 1
+        return idx
+
+    def add_edge(self, row: Dict[str, Any], compact: bool = True) -> None:
+        """Add a lineage row (ignored if already indexed)."""
+        if row["id"] in self._edge_ids:
+            return
+        src = self._node(row["source_dataset_id"])
+        dst = self._node(row["target_dataset_id"])
+        job_type = self._job_type_ids.setdefault(row.get("job_type"), len(self._job_type_ids))
+        idx = self._append(src, dst, job_type)
+        self._edge_ids[row["id"]] = idx
+        self._edge_meta.append((row["id"], row.get("job_name"), row.get("job_type"), row.get("confidence")))
+        self._delta[DOWNSTREAM].setdefault(src, []).append(idx)
+        self._delta[UPSTREAM].setdefault(dst, []).append(idx)
+        self._n_delta += 1
+        if compact and self._n_delta > max(1024, self._n_edges // 8):
+            self.compact()
+
+    def remove_edge(self, row_id: str) -> bool:
+        """Drop a lineage row; returns False if it was not indexed."""
+        idx = self._edge_ids.pop(row_id, None)
+        if idx is None:
+            return False
+        self._alive[idx] = False
+        self._n_dead += 1
+        if self._n_dead > max(1024, self._n_edges // 4):
+            self.compact()
+        return True
+
+    def compact(self) -> None:
+        """Rebuild the CSR arrays from all live edges, dropping removed ones."""
+        live = np.flatnonzero(self._alive[:self._n_edges])
+        if len(live) < self._n_edges:
+            self._src, self._dst = self._src[live], self._dst[live]
+            self._type, self._alive = self._type[live], self._alive[live]
+            self._edge_meta = [self._edge_meta[i] for i in live]
+            self._edge_ids = {meta[0]: i for i, meta in enumerate(self._edge_meta)}
+            self._n_edges, self._n_dead = len(live), 0
+
+        n_nodes = len(self._nodes)
+        src, dst = self._src[:self._n_edges], self._dst[:self._n_edges]
+        for direction, (a, b) in ((DOWNSTREAM, (src, dst)), (UPSTREAM, (dst, src))):
+            order = np.argsort(a, kind="stable")
+            indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(a, minlength=n_nodes), out=indptr[1:])
+            self._csr[direction] = (indptr, b[order], order)
+        self._delta = {UPSTREAM: {}, DOWNSTREAM: {}}
+        self._n_delta = 0
+
+    def _expand(self, direction: str, frontier: np.ndarray) -> np.ndarray:
+        """Indices of every edge leaving `frontier` in `direction`."""
+        indptr, _, edge_idx = self._csr[direction]
+        in_csr = frontier[frontier < len(indptr) - 1]
+        starts = indptr[in_csr]
+        counts = indptr[in_csr + 1] - starts
+        offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        edges = edge_idx[np.arange(counts.sum()) + offsets]
+
+        delta = self._delta[direction]
+        if delta:
+            keys = np.fromiter(delta.keys(), dtype=np.int64, count=len(delta))
+            hits = keys[np.isin(keys, frontier)]
+            if len(hits):
+                extra = np.fromiter((e for node in hits.tolist() for e in delta[node]), dtype=np.int64)
+                edges = np.concatenate([edges, extra])
+        return edges
+
+    def traverse(
+        self,
+        dataset_id: str,
+        direction: str = DOWNSTREAM,
+        max_depth: Optional[int] = None,
+        job_types: Optional[List[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Breadth-first traversal from `dataset_id`.
+
+        Returns {"depth": per-node depth (-1 = not reached), "parent_edge":
+        edge each reached node was first reached through (-1 for the root
+        and unreached nodes), "edge_mask": edges allowed by `job_types`}.
+        """
+        n_nodes = len(self._nodes)
+        depth = np.full(n_nodes, -1, dtype=np.int64)
+        parent_edge = np.full(n_nodes, -1, dtype=np.int64)
+        edge_mask = self._alive[:self._n_edges].copy()
+        if job_types is not None:
+            wanted = [self._job_type_ids[t] for t in job_types if t in self._job_type_ids]
+            edge_mask &= np.isin(self._type[:self._n_edges], wanted)
+
+        root = self._node_ids.get(dataset_id)
+        if root is None:
+            return {"depth": depth, "parent_edge": parent_edge, "edge_mask": edge_mask}
+
+        neighbour = self._dst if direction == DOWNSTREAM else self._src
+        depth[root] = 0
+        frontier = np.array([root], dtype=np.int64)
+        level = 0
+        while len(frontier) and (max_depth is None or level < max_depth):
+            edges = self._expand(direction, frontier)
+            edges = edges[edge_mask[edges]]
+            nodes = neighbour[edges]
+            new = depth[nodes] == -1
+            nodes, first = np.unique(nodes[new], return_index=True)
+            level += 1
+            depth[nodes] = level
+            parent_edge[nodes] = edges[new][first]
+            frontier = nodes
+        return {"depth": depth, "parent_edge": parent_edge, "edge_mask": edge_mask}
+
+    def query(
+        self,
+        dataset_id: str,
+        direction: str = DOWNSTREAM,
+        max_depth: Optional[int] = None,
+        job_types: Optional[List[str]] = None,
+        paths: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Transitive upstream or downstream lineage of `dataset_id`.
+
+        Returns:
+            {"nodes": [{"dataset_id", "depth", "via": {...}, "path": [...]}],
+             "edges": [edges of the traversed subgraph]}
+        """
+        result = self.traverse(dataset_id, direction, max_depth, job_types)
+        depth, parent_edge = result["depth"], result["parent_edge"]
+        neighbour = self._src if direction == DOWNSTREAM else self._dst  # the side we came from
+
+        reached = np.flatnonzero(depth > 0)
+        reached = reached[np.lexsort((reached, depth[reached]))]
+        nodes = []
+        for node in reached.tolist():
+            edge = int(parent_edge[node])
+            entry = {
+                "dataset_id": self._nodes[node],
+                "depth": int(depth[node]),
+                "via": self._edge_dict(edge),
+            }
+            if paths:
+                path = [node]
+                while parent_edge[path[-1]] >= 0:
+                    path.append(int(neighbour[parent_edge[path[-1]]]))
+                entry["path"] = [self._nodes[p] for p in reversed(path)]
+            nodes.append(entry)
+
+        # every allowed edge between traversed nodes, not just the BFS tree
+        visited = depth >= 0
+        n = self._n_edges
+        if len(visited):
+            inside = result["edge_mask"] & visited[self._src[:n]] & visited[self._dst[:n]]
+        else:
+            inside = np.zeros(n, dtype=bool)
+        edges = [self._edge_dict(int(e)) for e in np.flatnonzero(inside)]
+        return {"nodes": nodes, "edges": edges}
+
+    def _edge_dict(self, edge: int) -> Dict[str, Any]:
+        row_id, job_name, job_type, confidence = self._edge_meta[edge]
+        return {
+            "id": row_id,
+            "source_id": self._nodes[self._src[edge]],
+            "target_id": self._nodes[self._dst[edge]],
+            "job_name": job_name,
+            "job_type": job_type,
+            "confidence": confidence,
+        }
+
+
+_graph: Optional[LineageGraph] = None
+_loaded_at = 0.0
+_refreshed_at = 0.0
+_watermark = None  # newest created_at seen
+_graph_lock = asyncio.Lock()
+
+
+def _advance_watermark(rows: List[Dict[str, Any]]) -> None:
+    global _watermark
+    for row in rows:
+        created_at = row.get("created_at")
+        if created_at is not None and (_watermark is None or created_at > _watermark):
+            _watermark = created_at
+
+
+async def get_lineage_graph() -> LineageGraph:
+    """
+    The process-wide graph index, loaded on first use and kept fresh.
+
+    Rows from other workers are found by `created_at`; a row whose
+    transaction commits after a newer one was seen can be missed until the
+    next full reload.
+    """
+    global _graph, _loaded_at, _refreshed_at, _watermark
+    from app.supabase_client import table_select, fetch
+
+    settings = get_settings()
+    async with _graph_lock:
+        now = time.monotonic()
+        if _graph is None or now - _loaded_at > settings.LINEAGE_GRAPH_RELOAD_SECONDS:
+            started = time.perf_counter()
+            rows = await table_select(TABLE_LINEAGE, columns=EDGE_COLUMNS)
+            _graph = LineageGraph.from_rows(rows)
+            _watermark = None
+            _advance_watermark(rows)
+            _loaded_at = _refreshed_at = now
+            logger.info(
+                "Lineage graph loaded: %d nodes, %d edges in %.3fs",
+                _graph.node_count, _graph.edge_count, time.perf_counter() - started,
+            )
+        elif now - _refreshed_at > settings.LINEAGE_GRAPH_REFRESH_SECONDS:
+            if _watermark is None:
+                rows = await table_select(TABLE_LINEAGE, columns=EDGE_COLUMNS)
+            else:
+                rows = await fetch(
+                    f"SELECT {EDGE_COLUMNS} FROM {TABLE_LINEAGE} WHERE created_at >= $1", _watermark
+                )
+            for row in rows:
+                _graph.add_edge(row)
+            _advance_watermark(rows)
+            _refreshed_at = now
+    return _graph
+
+
+def record_edge(row: Dict[str, Any]) -> None:
+    """Add a just-written lineage row to the index, if it is loaded."""
+    if _graph is not None:
+        _graph.add_edge(row)
+
+
+def forget_edge(row_id: str) -> None:
+    """Drop a just-deleted lineage row from the index, if it is loaded."""
+    if _graph is not None:
+        _graph.remove_edge(row_id)
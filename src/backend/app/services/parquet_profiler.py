@@ -0,0 +1,228 @@
+"""
+Parquet-native profiling – reads the footer first and profiles row groups
+in parallel.
+
+The footer already holds the row count, the schema and per-row-group
+min/max/null counts, so `row_count`/`column_count` need no decoding, and a
+column chunk that the statistics fully describe (all null, or an integer
+column with min == max) is added to the profile straight from the footer.
+Every other column chunk is decoded and profiled; contiguous ranges of row
+groups run as separate tasks (in a process pool when one is given) whose
+mergeable sketches are combined into one profile.
+"""
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+from concurrent.futures import Executor
+
+import numpy as np
+import pandas as pd
+
+from app.config import get_settings, get_profiling_settings
+from app.services.columnar_profiler import ColumnarProfiler
+from app.services.sketches import ProfileSketch, ColumnSketch
+
+logger = logging.getLogger(__name__)
+
+ALL_NULL = "null"
+CONSTANT = "constant"
+
+
+def _to_pandas(table, index_columns=()) -> pd.DataFrame:
+    """`table.to_pandas()`, dropping the index that a pandas-written file's index columns become."""
+    df = table.to_pandas()
+    if index_columns:
+        df = df.reset_index(drop=True)
+    return df
+
+
+class ParquetProfiler:
+    """Footer-first, row-group-parallel profiling of a Parquet file."""
+
+    @staticmethod
+    def footer(path: str) -> Dict[str, Any]:
+        """
+        What the footer tells us without decoding any data.
+
+        Returns:
+            {"row_count", "column_count", "columns": [names], "dtypes": {name: pandas dtype},
+             "row_groups": [{"rows": int, "footer_only": {name: (kind, value, nulls)}}]}
+
+        `footer_only` lists the column chunks of a row group that need no
+        scan, as (kind, value, null count): (ALL_NULL, None, rows), or
+        (CONSTANT, value, nulls) for an integer column with min == max.
+        """
+        import pyarrow.parquet as pq
+        import pyarrow.types as pat
+
+        meta = pq.read_metadata(path)
+        schema = meta.schema.to_arrow_schema()
+        index_columns = {c for c in (schema.pandas_metadata or {}).get("index_columns", []) if isinstance(c, str)}
+        names = [name for name in schema.names if name not in index_columns]
+        dtypes = {name: str(dtype) for name, dtype in schema.empty_table().to_pandas().dtypes.items()}
+        integer = {name for name in names if pat.is_integer(schema.field(name).type)}
+
+        # statistics only map one-to-one onto flat (non-nested) columns
+        leaves = {meta.schema.column(i).path: i for i in range(meta.num_columns)}
+        row_groups = []
+        for g in range(meta.num_row_groups):
+            group = meta.row_group(g)
+            footer_only = {}
+            for name in names:
+                leaf = leaves.get(name)
+                stats = group.column(leaf).statistics if leaf is not None else None
+                if stats is None or not stats.has_null_count:
+                    continue
+                if stats.null_count == group.num_rows:
+                    footer_only[name] = (ALL_NULL, None, stats.null_count)
+                elif name in integer and stats.has_min_max and stats.min == stats.max:
+                    footer_only[name] = (CONSTANT, int(stats.min), stats.null_count)
+            row_groups.append({"rows": group.num_rows, "footer_only": footer_only})
+        return {
+            "row_count": meta.num_rows,
+            "column_count": len(names),
+            "columns": names,
+            "index_columns": sorted(index_columns),
+            "dtypes": dtypes,
+            "row_groups": row_groups,
+        }
+
+    @staticmethod
+    def _footer_column(dtype: str, rows: int, nulls: int, kind: str, value) -> ColumnSketch:
+        """Sketch of a column chunk described entirely by its statistics."""
+        if nulls and dtype.startswith(("int", "uint")):
+            dtype = "float64"  # pandas turns a NumPy integer column with nulls into float64
+        column = ColumnSketch(dtype)
+        if kind == ALL_NULL:
+            if column.numeric:
+                column.add_sorted(dtype, rows, np.empty(0))
+            else:
+                column.add_values(dtype, rows, rows, np.empty(0, dtype=object), np.empty(0, dtype=np.int64))
+        else:
+            column.add_sorted(dtype, rows, np.full(rows - nulls, float(value)))
+        return column
+
+    @staticmethod
+    def profile_row_groups(path: str, row_groups: List[int], footer: Dict[str, Any]) -> ProfileSketch:
+        """
+        Mergeable sketch of some row groups, decoding only the column chunks
+        the footer does not describe. Runs in a worker process.
+
+        Consecutive row groups with the same footer-only columns are decoded
+        together (up to PARQUET_BATCH_ROWS rows), so distinct values shared
+        across row groups are hashed and counted once per batch.
+        """
+        import pyarrow.parquet as pq
+
+        max_rows = get_profiling_settings().PARQUET_BATCH_ROWS
+        batches = []  # [footer-only column names, row groups, rows]
+        for g in row_groups:
+            info = footer["row_groups"][g]
+            if info["rows"] == 0:
+                continue
+            skip = frozenset(info["footer_only"])
+            if batches and batches[-1][0] == skip and batches[-1][2] + info["rows"] <= max_rows:
+                batches[-1][1].append(g)
+                batches[-1][2] += info["rows"]
+            else:
+                batches.append([skip, [g], info["rows"]])
+
+        parquet = pq.ParquetFile(path)
+        sketch = ProfileSketch()
+        for skip, groups, rows in batches:
+            decode = [name for name in footer["columns"] if name not in skip]
+            if decode:
+                table = parquet.read_row_groups(groups, columns=decode, use_pandas_metadata=True)
+                df = _to_pandas(table, footer["index_columns"])
+            else:
+                df = pd.DataFrame(index=pd.RangeIndex(rows))
+            part = ProfileSketch()
+            ColumnarProfiler.profile(df, sketch=part)
+            for name in skip:
+                column = None
+                for g in groups:
+                    kind, value, nulls = footer["row_groups"][g]["footer_only"][name]
+                    chunk = ParquetProfiler._footer_column(
+                        footer["dtypes"][name], footer["row_groups"][g]["rows"], nulls, kind, value
+                    )
+                    column = chunk if column is None else column.merge(chunk)
+                part.columns[name] = column
+            sketch.merge(part)
+        return sketch
+
+    @staticmethod
+    def split(footer: Dict[str, Any], parts: int) -> List[List[int]]:
+        """Contiguous ranges of row groups with roughly equal row counts."""
+        groups = footer["row_groups"]
+        parts = max(1, min(parts, len(groups)))
+        target = footer["row_count"] / parts
+        ranges, current, rows = [], [], 0
+        for g, info in enumerate(groups):
+            current.append(g)
+            rows += info["rows"]
+            if rows >= target * (len(ranges) + 1) and len(ranges) < parts - 1:
+                ranges.append(current)
+                current = []
+        if current:
+            ranges.append(current)
+        return ranges
+
+    @staticmethod
+    def assemble(path: str, footer: Dict[str, Any], sketches: List[ProfileSketch]) -> Dict[str, Any]:
+        """Merge per-range sketches (in file order) into the upload result."""
+        import pyarrow.parquet as pq
+
+        merged = ProfileSketch.merge_all(sketches)
+        merged.columns = {name: merged.columns[name] for name in footer["columns"] if name in merged.columns}
+        parquet = pq.ParquetFile(path)
+        sample = next(parquet.iter_batches(batch_size=10, columns=footer["columns"], use_pandas_metadata=True), None)
+        if sample is not None:
+            merged.sample_rows = _to_pandas(sample, footer["index_columns"]).to_dict(orient="records")
+        skipped = sum(len(info["footer_only"]) for info in footer["row_groups"])
+        logger.info(
+            "Profiled Parquet %s: %d rows, %d row groups in %d parts, %d column chunks from the footer",
+            path, footer["row_count"], len(footer["row_groups"]), len(sketches), skipped,
+        )
+        return {
+            "profile": merged.to_profile(),
+            "row_count": footer["row_count"],
+            "column_count": footer["column_count"],
+        }
+
+    @staticmethod
+    def profile(path: str) -> Dict[str, Any]:
+        """
+        Profile a Parquet file in this process.
+
+        Returns:
+            {"profile": {...}, "row_count": int, "column_count": int}
+        """
+        footer = ParquetProfiler.footer(path)
+        sketch = ParquetProfiler.profile_row_groups(path, list(range(len(footer["row_groups"]))), footer)
+        return ParquetProfiler.assemble(path, footer, [sketch])
+
+
+async def profile_parquet(path: str, executor: Optional[Executor] = None, parts: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Profile a Parquet file with its row groups split into `parts` tasks
+    (default: JOB_WORKERS) on `executor`; without one, in a single thread.
+
+    Returns:
+        {"profile": {...}, "row_count": int, "column_count": int}
+    """
+    footer = await asyncio.to_thread(ParquetProfiler.footer, path)
+    if parts is None:
+        parts = get_settings().JOB_WORKERS if executor is not None else 1
+    ranges = ParquetProfiler.split(footer, parts)
+    loop = asyncio.get_running_loop()
+    if executor is None or len(ranges) <= 1:
+        sketches = [
+            await asyncio.to_thread(ParquetProfiler.profile_row_groups, path, groups, footer)
+            for groups in ranges
+        ]
+    else:
+        sketches = await asyncio.gather(*(
+            loop.run_in_executor(executor, ParquetProfiler.profile_row_groups, path, groups, footer)
+            for groups in ranges
+        ))
+    return await asyncio.to_thread(ParquetProfiler.assemble, path, footer, list(sketches))
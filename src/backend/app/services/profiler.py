@@ -1,11 +1,16 @@
 """
 Dataset profiler – extracts statistics from datasets.
 """
+import io
 import pandas as pd
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Iterable
 import logging
 
+from app.services.columnar_profiler import ColumnarProfiler
+from app.services.sketches import ProfileSketch
+from app.utils.metrics import stage
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,9 +26,46 @@ class DatasetProfiler:
             {
                 "columns_metadata": { "col": { "dtype": "int64", "null_count": 5, ... } },
                 "statistics": { "col": { "mean": 5.2, "std": 1.1, "min": 0, "max": 10 } },
-                "sample_rows": [first 5 rows as dicts]
+                "sample_rows": [first 5 rows as dicts],
+                "sketches": ProfileSketch.to_dict() (mergeable, see `merge`)
             }
         """
+        try:
+            sketch = ProfileSketch()
+            with stage("profile.columnar"):
+                profile = ColumnarProfiler.profile(df, sketch=sketch)
+            with stage("profile.sketch"):
+                profile["sketches"] = sketch.to_dict()
+            return profile
+        except Exception as e:
+            logger.error(f"Profiling error: {e}")
+            raise
+
+    @staticmethod
+    def sketch(df: pd.DataFrame) -> ProfileSketch:
+        """Mergeable sketch of a DataFrame (one chunk, file or partition)."""
+        return ProfileSketch.from_dataframe(df)
+
+    @staticmethod
+    def merge(profiles: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merge profiles of disjoint parts of a dataset (chunks, files, daily
+        partitions) into the profile of the whole. Each profile must carry
+        its "sketches"; the merge is associative and order-independent, so
+        parallel, incremental and single-pass profiling agree.
+        """
+        merged = ProfileSketch()
+        for profile in profiles:
+            part = ProfileSketch.from_dict(profile["sketches"], profile.get("sample_rows"))
+            merged.merge(part)
+        return merged.to_profile()
+
+    @staticmethod
+    def profile_per_column(df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Reference implementation of `profile`: one set of pandas reductions
+        per column. Kept for equivalence checks and benchmarks.
+        """
         try:
             columns_metadata = {}
             statistics = {}
@@ -55,3 +97,123 @@ class DatasetProfiler:
         except Exception as e:
             logger.error(f"Profiling error: {e}")
             raise
+
+
+class IncrementalProfiler:
+    """
+    Builds a profile from a stream of CSV byte chunks or DataFrame batches,
+    holding at most `buffer_size` bytes of unparsed input at a time.
+
+    Each batch is folded into a ProfileSketch: counts, null counts, mean, std,
+    min and max match `DatasetProfiler.profile`; `cardinality` is a
+    HyperLogLog estimate and `median` a KLL estimate.
+
+    CSV dtypes are inferred from the first buffer and locked for the rest of
+    the stream as `ChunkedCSVProfiler` does, so a text column reads as text
+    in every buffer rather than as numbers wherever a buffer happens to hold
+    only digits. A header-only CSV gives its columns with no rows.
+    """
+
+    def __init__(self, buffer_size: int = 16 * 1024 * 1024):
+        self.buffer_size = buffer_size
+        self.sketch = ProfileSketch()
+        self._header: bytes | None = None
+        self._dtypes: Dict[str, Any] | None = None  # locked from the first buffer
+        self._pending = bytearray()
+        self._quote_parity = 0  # unbalanced '"' count (mod 2) in _pending
+
+    @property
+    def row_count(self) -> int:
+        return self.sketch.row_count
+
+    @property
+    def column_count(self) -> int:
+        return self.sketch.column_count
+
+    def feed_dataframe(self, df: pd.DataFrame) -> None:
+        """Fold one batch of rows into the running profile."""
+        self.sketch.update(df)
+
+    def feed_csv(self, chunk: bytes) -> None:
+        """Buffer raw CSV bytes, parsing complete records once the buffer is full."""
+        self._quote_parity = (self._quote_parity + chunk.count(b'"')) % 2
+        self._pending += chunk
+        if len(self._pending) >= self.buffer_size:
+            self._flush_csv(final=False)
+
+    def finish_csv(self) -> None:
+        """Parse whatever is left after the last chunk."""
+        self._flush_csv(final=True)
+
+    def _flush_csv(self, final: bool) -> None:
+        if self._header is None:
+            end = self._pending.find(b"\n")
+            if end < 0:
+                if not final:
+                    return
+                end = len(self._pending)
+            self._header = bytes(self._pending[:end + 1])
+            self._quote_parity = (self._quote_parity - self._header.count(b'"')) % 2
+            del self._pending[:end + 1]
+
+        if final:
+            cut = len(self._pending)
+        else:
+            cut = self._last_record_end()
+            if cut <= 0:
+                return
+        body = bytes(self._pending[:cut])
+        del self._pending[:cut]
+        self._quote_parity = self._pending.count(b'"') % 2
+        if body.strip():
+            self.feed_dataframe(self._parse_csv(body))
+        elif final and not self.sketch.columns and self._header.strip():
+            # header only: the columns, with no rows
+            self.feed_dataframe(pd.read_csv(io.BytesIO(self._header)))
+
+    def _parse_csv(self, body: bytes) -> pd.DataFrame:
+        """Parse complete records, locking dtypes from the first buffer."""
+        from app.services.csv_profiler import ChunkedCSVProfiler
+
+        data = io.BytesIO(self._header + body)
+        # a buffer is bounded already, so parse it whole (no mixed-type columns)
+        if self._dtypes is None:
+            df = pd.read_csv(data, low_memory=False)
+            self._dtypes = ChunkedCSVProfiler.lock_dtypes(df)
+            return df
+        try:
+            return pd.read_csv(data, dtype=self._dtypes, low_memory=False)
+        except ValueError as e:
+            # a float column of the first buffer holds text here; earlier
+            # buffers are gone, so infer floats from this one on
+            unlocked = ChunkedCSVProfiler.unlock_floats(self._dtypes)
+            if unlocked == self._dtypes:
+                raise
+            logger.info("Locked CSV dtypes did not hold (%s); inferring float columns from here on", e)
+            self._dtypes = unlocked
+            data.seek(0)
+            return pd.read_csv(data, dtype=self._dtypes, low_memory=False)
+
+    def _last_record_end(self) -> int:
+        """Offset just past the last newline that is not inside a quoted field."""
+        parity = self._quote_parity
+        pos = len(self._pending)
+        while True:
+            nl = self._pending.rfind(b"\n", 0, pos)
+            if nl < 0:
+                return 0
+            parity = (parity - self._pending.count(b'"', nl, pos)) % 2
+            if parity == 0:
+                return nl + 1
+            pos = nl
+
+    def feed_parquet(self, path: str, batch_rows: int = 65_536) -> None:
+        """Profile a Parquet file batch by batch without loading it whole."""
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows):
+            self.feed_dataframe(batch.to_pandas())
+
+    def result(self) -> Dict[str, Any]:
+        """Profile in the same shape as `DatasetProfiler.profile`."""
+        return self.sketch.to_profile()
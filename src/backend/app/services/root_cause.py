@@ -0,0 +1,324 @@
+"""
+Root-cause ranking – given a dataset with open issues, score its upstream
+datasets as likely culprits.
+
+Every (upstream issue, downstream issue) pair scores
+
+    severity x type affinity x timing x column match
+
+and an ancestor's pair scores combine as a noisy-OR, weighted by its most
+confident lineage path to the dataset (the product of `Lineage.confidence`
+along the path), a per-hop decay and how many of the dataset's columns it
+shares. Scores are also normalized into likelihoods that sum to 1.
+
+Rankings are memoized per dataset under a version made of this process's
+write counter (see `invalidate_root_causes`) and a fingerprint of the
+`issues` and `lineage` tables that is re-read at most every
+ROOT_CAUSE_VERSION_CHECK_SECONDS, so repeated dashboard loads skip the
+traversal and queries until new issues or edges arrive.
+"""
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.config import get_settings
+from app.models.enums import IssueType, IssueSeverity
+from app.supabase_client import fetch
+from app.services.lineage_graph import get_lineage_graph, UPSTREAM
+from app.services.lineage_db import query_lineage
+
+logger = logging.getLogger(__name__)
+
+TABLE_ISSUES = "issues"
+ISSUE_COLUMNS = "id,dataset_id,issue_type,severity,column_name,description,detected_at"
+
+SEVERITY_WEIGHT = {
+    IssueSeverity.LOW: 0.25,
+    IssueSeverity.MEDIUM: 0.5,
+    IssueSeverity.HIGH: 0.75,
+    IssueSeverity.CRITICAL: 1.0,
+}
+
+# how well an upstream issue type explains a downstream one; the same type
+# always scores 1.0 and unlisted pairs DEFAULT_AFFINITY
+TYPE_AFFINITY = {
+    (IssueType.SCHEMA_CHANGE, IssueType.NULL_SPIKE): 0.9,  # dropped/renamed column
+    (IssueType.SCHEMA_CHANGE, IssueType.SEMANTIC_DRIFT): 0.8,
+    (IssueType.SCHEMA_CHANGE, IssueType.DISTRIBUTION_DRIFT): 0.7,
+    (IssueType.SCHEMA_CHANGE, IssueType.CARDINALITY_ANOMALY): 0.7,
+    (IssueType.NULL_SPIKE, IssueType.DISTRIBUTION_DRIFT): 0.7,
+    (IssueType.NULL_SPIKE, IssueType.CARDINALITY_ANOMALY): 0.6,
+    (IssueType.CARDINALITY_ANOMALY, IssueType.DISTRIBUTION_DRIFT): 0.6,
+    (IssueType.DISTRIBUTION_DRIFT, IssueType.LABEL_FLIP): 0.6,
+    (IssueType.SEMANTIC_DRIFT, IssueType.DISTRIBUTION_DRIFT): 0.6,
+    (IssueType.SEMANTIC_DRIFT, IssueType.LABEL_FLIP): 0.6,
+}
+DEFAULT_AFFINITY = 0.3
+
+SAME_COLUMN = 1.0
+DATASET_LEVEL = 0.6  # either issue is not about a particular column
+SHARED_COLUMN = 0.5  # different columns, but the upstream one also exists downstream
+OTHER_COLUMN = 0.3
+LATE_PENALTY = 0.25  # upstream issue detected after the downstream one
+UNKNOWN_OVERLAP = 0.5  # column overlap when either dataset has no profile
+
+
+def _member(enum_cls, value):
+    """Enum member from its value or name (SQLAlchemy stores enum names)."""
+    if isinstance(value, enum_cls) or value is None:
+        return value
+    try:
+        return enum_cls(value)
+    except ValueError:
+        return enum_cls.__members__.get(value)
+
+
+class RootCauseAnalyzer:
+    """Scores upstream datasets as the cause of a dataset's issues."""
+
+    @staticmethod
+    def best_paths(dataset_id: str, edges: List[Dict[str, Any]]) -> Dict[str, Tuple[float, List[str]]]:
+        """
+        Most confident upstream path of every ancestor in `edges`.
+
+        Returns {ancestor: (product of edge confidences, [ancestor, ..., dataset_id])}.
+        Relaxes edges until nothing improves: a cycle can never raise a
+        product of confidences <= 1, so this terminates on any graph.
+        """
+        best = {dataset_id: (1.0, None)}  # node -> (confidence, next node towards dataset_id)
+        changed = True
+        while changed:
+            changed = False
+            for edge in edges:
+                downstream = best.get(edge["target_id"])
+                if downstream is None:
+                    continue
+                confidence = edge.get("confidence")
+                score = downstream[0] * (1.0 if confidence is None else min(max(float(confidence), 0.0), 1.0))
+                if score > best.get(edge["source_id"], (-1.0, None))[0]:
+                    best[edge["source_id"]] = (score, edge["target_id"])
+                    changed = True
+
+        paths = {}
+        for node, (score, _) in best.items():
+            if node == dataset_id:
+                continue
+            path, seen = [node], {node}
+            while path[-1] != dataset_id:
+                nxt = best[path[-1]][1]
+                if nxt in seen:  # only reachable with zero-confidence edges
+                    break
+                path.append(nxt)
+                seen.add(nxt)
+            paths[node] = (score, path)
+        return paths
+
+    @staticmethod
+    def pair_score(
+        upstream: Dict[str, Any],
+        downstream: Dict[str, Any],
+        downstream_columns: Optional[set] = None,
+    ) -> float:
+        """How well one upstream issue explains one downstream issue, in [0, 1]."""
+        up_type = _member(IssueType, upstream.get("issue_type"))
+        down_type = _member(IssueType, downstream.get("issue_type"))
+        affinity = 1.0 if up_type == down_type else TYPE_AFFINITY.get((up_type, down_type), DEFAULT_AFFINITY)
+
+        severity = SEVERITY_WEIGHT.get(_member(IssueSeverity, upstream.get("severity")), 0.5)
+
+        timing = 1.0
+        up_time, down_time = upstream.get("detected_at"), downstream.get("detected_at")
+        if isinstance(up_time, datetime) and isinstance(down_time, datetime):
+            if up_time.tzinfo is None or down_time.tzinfo is None:
+                up_time, down_time = up_time.replace(tzinfo=None), down_time.replace(tzinfo=None)
+            tau = get_settings().ROOT_CAUSE_TIME_DECAY_HOURS * 3600.0
+            lag = (down_time - up_time).total_seconds()
+            timing = math.exp(-lag / tau) if lag >= 0 else LATE_PENALTY * math.exp(lag / tau)
+
+        up_col, down_col = upstream.get("column_name"), downstream.get("column_name")
+        if not up_col or not down_col:
+            column = DATASET_LEVEL
+        elif up_col == down_col:
+            column = SAME_COLUMN
+        elif downstream_columns and up_col in downstream_columns:
+            column = SHARED_COLUMN
+        else:
+            column = OTHER_COLUMN
+
+        return severity * affinity * timing * column
+
+    @staticmethod
+    def rank(
+        dataset_id: str,
+        edges: List[Dict[str, Any]],
+        issues: List[Dict[str, Any]],
+        columns: Optional[Dict[str, set]] = None,
+        depths: Optional[Dict[str, int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank the ancestors of `dataset_id` that have open issues.
+
+        - edges: the upstream subgraph (`LineageGraph.query` edges)
+        - issues: open issues of `dataset_id` and its ancestors
+        - columns: {dataset_id: column names of its latest profile}
+        - depths: {ancestor: hops to dataset_id} (default: length of the best path)
+        """
+        columns = columns or {}
+        decay = get_settings().ROOT_CAUSE_DEPTH_DECAY
+        by_dataset: Dict[str, List[Dict[str, Any]]] = {}
+        for issue in issues:
+            by_dataset.setdefault(issue["dataset_id"], []).append(issue)
+        targets = by_dataset.get(dataset_id, [])
+        if not targets:
+            return []
+
+        own_columns = columns.get(dataset_id)
+        culprits = []
+        for ancestor, (confidence, path) in RootCauseAnalyzer.best_paths(dataset_id, edges).items():
+            upstream_issues = by_dataset.get(ancestor)
+            if not upstream_issues or confidence <= 0:
+                continue
+            depth = (depths or {}).get(ancestor, len(path) - 1)
+
+            pairs = []
+            for up in upstream_issues:
+                for down in targets:
+                    score = RootCauseAnalyzer.pair_score(up, down, own_columns)
+                    if score > 0:
+                        pairs.append((score, up, down))
+            if not pairs:
+                continue
+            evidence = 1.0 - math.prod(1.0 - score for score, _, _ in pairs)
+
+            their_columns = columns.get(ancestor)
+            shared = sorted(own_columns & their_columns) if own_columns and their_columns else []
+            overlap = len(shared) / len(own_columns) if own_columns and their_columns is not None else UNKNOWN_OVERLAP
+
+            score = evidence * confidence * decay ** (depth - 1) * (0.5 + 0.5 * overlap)
+            pairs.sort(key=lambda p: p[0], reverse=True)
+            culprits.append({
+                "dataset_id": ancestor,
+                "score": score,
+                "depth": depth,
+                "path": path,
+                "path_confidence": confidence,
+                "shared_columns": shared,
+                "evidence": [
+                    {
+                        "issue_id": up["id"],
+                        "issue_type": getattr(_member(IssueType, up["issue_type"]), "value", up["issue_type"]),
+                        "column_name": up.get("column_name"),
+                        "detected_at": up.get("detected_at"),
+                        "explains": down["id"],
+                        "score": round(s, 6),
+                    }
+                    for s, up, down in pairs[:5]
+                ],
+            })
+
+        total = sum(c["score"] for c in culprits)
+        for c in culprits:
+            c["likelihood"] = round(c["score"] / total, 6) if total else 0.0
+            c["score"] = round(c["score"], 6)
+            c["path_confidence"] = round(c["path_confidence"], 6)
+        culprits.sort(key=lambda c: (-c["score"], c["depth"], c["dataset_id"]))
+        return culprits
+
+
+_cache: "OrderedDict[tuple, tuple]" = OrderedDict()  # (dataset_id, max_depth) -> (version, result)
+_local_version = 0
+_fingerprint = None
+_fingerprint_at = 0.0
+_fingerprint_lock = asyncio.Lock()
+
+
+def invalidate_root_causes() -> None:
+    """Mark memoized rankings stale; call after writing issues or lineage edges."""
+    global _local_version
+    _local_version += 1
+
+
+async def _version() -> tuple:
+    """The issue-set / lineage version rankings are memoized under."""
+    global _fingerprint, _fingerprint_at
+    settings = get_settings()
+    async with _fingerprint_lock:
+        now = time.monotonic()
+        if _fingerprint is None or now - _fingerprint_at > settings.ROOT_CAUSE_VERSION_CHECK_SECONDS:
+            rows = await fetch(
+                f"SELECT (SELECT COUNT(*) FROM {TABLE_ISSUES}) AS issues, "
+                f"(SELECT COUNT(*) FROM {TABLE_ISSUES} WHERE resolved IS NOT TRUE) AS open_issues, "
+                f"(SELECT MAX(detected_at) FROM {TABLE_ISSUES}) AS last_issue, "
+                f"(SELECT COUNT(*) FROM lineage) AS edges, "
+                f"(SELECT MAX(created_at) FROM lineage) AS last_edge"
+            )
+            _fingerprint, _fingerprint_at = tuple(rows[0].values()), now
+        version = (_local_version, _fingerprint)
+    if settings.LINEAGE_TRAVERSAL_MODE == "memory":
+        # the index catches up on other workers' edges on its own schedule
+        graph = await get_lineage_graph()
+        version += (id(graph), graph.edge_count, graph.node_count)
+    return version
+
+
+async def _dataset_columns(dataset_ids: List[str]) -> Dict[str, set]:
+    """Column names of each dataset's latest profile."""
+    rows = await fetch(
+        """
+        SELECT d.id, p.columns
+        FROM datasets d
+        LEFT JOIN LATERAL (
+            SELECT (SELECT array_agg(k) FROM json_object_keys(columns_metadata) AS k) AS columns
+            FROM dataset_profiles WHERE dataset_id = d.id AND columns_metadata IS NOT NULL
+            ORDER BY created_at DESC LIMIT 1
+        ) p ON true
+        WHERE d.id = ANY($1::text[])
+        """,
+        dataset_ids,
+    )
+    return {r["id"]: set(r["columns"] or []) for r in rows if r["columns"] is not None}
+
+
+async def diagnose(dataset_id: str, max_depth: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Ranked likely culprits for `dataset_id`'s open issues, memoized until
+    issues or lineage change.
+
+    Returns {"dataset_id", "open_issues", "culprits": [...], "cached"}.
+    """
+    key = (dataset_id, max_depth)
+    version = await _version()
+    hit = _cache.get(key)
+    if hit is not None and hit[0] == version:
+        _cache.move_to_end(key)
+        return {**hit[1], "cached": True}
+
+    started = time.perf_counter()
+    lineage = await query_lineage(dataset_id, UPSTREAM, max_depth=max_depth)
+    depths = {n["dataset_id"]: n["depth"] for n in lineage["nodes"]}
+    datasets = [dataset_id, *depths]
+    issues = await fetch(
+        f"SELECT {ISSUE_COLUMNS} FROM {TABLE_ISSUES} "
+        f"WHERE dataset_id = ANY($1::text[]) AND resolved IS NOT TRUE",
+        datasets,
+    )
+    open_issues = sum(1 for issue in issues if issue["dataset_id"] == dataset_id)
+    culprits = []
+    if open_issues and len(issues) > open_issues:
+        columns = await _dataset_columns(datasets)
+        culprits = RootCauseAnalyzer.rank(dataset_id, lineage["edges"], issues, columns, depths)
+
+    result = {"dataset_id": dataset_id, "open_issues": open_issues, "culprits": culprits}
+    _cache[key] = (version, result)
+    _cache.move_to_end(key)
+    while len(_cache) > get_settings().ROOT_CAUSE_CACHE_SIZE:
+        _cache.popitem(last=False)
+    logger.debug(
+        "Root causes for %s: %d ancestors, %d issues in %.3fs",
+        dataset_id, len(depths), len(issues), time.perf_counter() - started,
+    )
+    return {**result, "cached": False}
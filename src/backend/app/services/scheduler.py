@@ -0,0 +1,301 @@
+"""
+Scheduled detection – sweeps the datasets, runs every detector on each
+dataset's baseline and newest profiles, and writes the findings as issues.
+
+A sweep starts with one query for the (baseline, current) profile ids of
+every dataset whose pair differs from the one recorded in
+`detection_state`, so unchanged datasets cost nothing. Changed datasets are
+checked DETECTION_CONCURRENCY at a time. Each check writes in a transaction
+that holds a per-dataset advisory lock (a dataset another worker is
+already writing is skipped) and re-reads the state under it, then inserts
+the issues in bulk and records the pair.
+"""
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from app.config import get_settings
+from app.models.enums import IssueType, IssueSeverity
+from app.supabase_client import fetch, table_upsert, transaction
+
+logger = logging.getLogger(__name__)
+
+TABLE_STATE = "detection_state"
+_LOCK_CLASS = 7_244_106  # advisory lock class for per-dataset locks (lineage_db uses 7_244_105)
+
+# baseline profile per DETECTION_BASELINE, as a condition on the ranked profiles
+_BASELINES = {
+    "previous": "b.newest = 2",
+    "first": "b.oldest = 1 AND b.newest > 1",
+}
+
+_PAIRS_SQL = """
+WITH ranked AS (
+    SELECT dataset_id, id,
+           row_number() OVER (PARTITION BY dataset_id ORDER BY created_at DESC, id DESC) AS newest,
+           row_number() OVER (PARTITION BY dataset_id ORDER BY created_at, id) AS oldest
+    FROM dataset_profiles
+)
+SELECT c.dataset_id, b.id AS baseline_profile_id, c.id AS current_profile_id
+FROM ranked c
+JOIN ranked b ON b.dataset_id = c.dataset_id AND {baseline}
+LEFT JOIN detection_state s ON s.dataset_id = c.dataset_id
+WHERE c.newest = 1{changed}
+"""
+_CHANGED_SQL = """
+  AND (s.dataset_id IS NULL OR s.baseline_profile_id <> b.id OR s.current_profile_id <> c.id)"""
+
+SCHEMA_SEVERITY = {
+    "column_removed": IssueSeverity.HIGH,
+    "dtype_changed": IssueSeverity.MEDIUM,
+    "column_added": IssueSeverity.LOW,
+}
+
+_sweep_lock: Optional[asyncio.Lock] = None
+_task: Optional[asyncio.Task] = None
+_last_sweep: Optional[Dict[str, Any]] = None
+_totals = {"sweeps": 0, "datasets_checked": 0, "issues_created": 0}
+
+
+def _drift_severity(psi: float) -> IssueSeverity:
+    return IssueSeverity.HIGH if psi >= 0.25 else IssueSeverity.MEDIUM
+
+
+def _semantic_severity(cosine_distance: float) -> IssueSeverity:
+    return IssueSeverity.HIGH if cosine_distance >= 0.25 else IssueSeverity.MEDIUM
+
+
+def _null_severity(delta: float) -> IssueSeverity:
+    if delta >= 50:
+        return IssueSeverity.CRITICAL
+    return IssueSeverity.HIGH if delta >= 20 else IssueSeverity.MEDIUM
+
+
+class DetectionPipeline:
+    """Runs all detectors on a profile pair and shapes the findings as issues."""
+
+    @staticmethod
+    def detect(
+        dataset_id: str,
+        baseline: Dict[str, Any],
+        current: Dict[str, Any],
+        alpha: float = 0.05,
+        null_spike_pct: float = 5.0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Issues (dicts shaped like IssueCreate) for the changes from
+        `baseline` to `current` (profiles with "id", "columns_metadata" and
+        "sketches"): schema changes, numeric, categorical and semantic drift,
+        null spikes.
+        """
+        from app.services.detectors import SchemaDetector, DriftDetector  # scipy, on the first sweep
+
+        pair = {"baseline_profile_id": baseline["id"], "current_profile_id": current["id"]}
+        issues = []
+
+        for change in SchemaDetector.detect(baseline, current):
+            issues.append({
+                "dataset_id": dataset_id,
+                "issue_type": IssueType.SCHEMA_CHANGE,
+                "severity": SCHEMA_SEVERITY.get(change["type"], IssueSeverity.MEDIUM),
+                "column_name": change["column"],
+                "description": f"{change['type'].replace('_', ' ').capitalize()}: {change['column']}",
+                "evidence": {**change, **pair},
+            })
+
+        if baseline.get("sketches") and current.get("sketches"):
+            for column, scores in DriftDetector.score(baseline, current, threshold=alpha).items():
+                if scores["is_drift"]:
+                    issues.append({
+                        "dataset_id": dataset_id,
+                        "issue_type": IssueType.DISTRIBUTION_DRIFT,
+                        "severity": _drift_severity(scores["psi"]),
+                        "column_name": column,
+                        "description": (
+                            f"Distribution of {column} shifted "
+                            f"(KS p={scores['ks_p_value']:.3g}, PSI={scores['psi']:.3f})"
+                        ),
+                        "evidence": {**scores, **pair},
+                    })
+            for column, scores in DriftDetector.score_categorical(baseline, current, threshold=alpha).items():
+                if scores["is_drift"]:
+                    issues.append({
+                        "dataset_id": dataset_id,
+                        "issue_type": IssueType.DISTRIBUTION_DRIFT,
+                        "severity": IssueSeverity.HIGH if scores["js_divergence"] >= 0.2 else IssueSeverity.MEDIUM,
+                        "column_name": column,
+                        "description": (
+                            f"Category mix of {column} shifted "
+                            f"(chi2 p={scores['chi2_p_value']:.3g}, JS={scores['js_divergence']:.3f})"
+                        ),
+                        "evidence": {**scores, **pair},
+                    })
+            for column, scores in DriftDetector.score_semantic(baseline, current, threshold=alpha).items():
+                if scores["is_drift"]:
+                    issues.append({
+                        "dataset_id": dataset_id,
+                        "issue_type": IssueType.SEMANTIC_DRIFT,
+                        "severity": _semantic_severity(scores["cosine_distance"]),
+                        "column_name": column,
+                        "description": (
+                            f"Meaning of {column} values shifted "
+                            f"(embedding centroid distance {scores['cosine_distance']:.3f}, p={scores['p_value']:.3g})"
+                        ),
+                        "evidence": {**scores, **pair},
+                    })
+
+        before_columns = baseline.get("columns_metadata") or {}
+        for column in current.get("columns_metadata") or {}:
+            if column not in before_columns:
+                continue
+            is_spike, evidence = DriftDetector.null_spike(baseline, current, column, threshold=null_spike_pct)
+            if is_spike:
+                issues.append({
+                    "dataset_id": dataset_id,
+                    "issue_type": IssueType.NULL_SPIKE,
+                    "severity": _null_severity(evidence["delta"]),
+                    "column_name": column,
+                    "description": (
+                        f"Nulls in {column} rose from {evidence['before_null_pct']:.1f}% "
+                        f"to {evidence['after_null_pct']:.1f}%"
+                    ),
+                    "evidence": {**evidence, **pair},
+                })
+        return issues
+
+
+async def changed_pairs(force: bool = False) -> List[Dict[str, Any]]:
+    """(dataset_id, baseline_profile_id, current_profile_id) of datasets to check."""
+    baseline = _BASELINES.get(get_settings().DETECTION_BASELINE)
+    if baseline is None:
+        raise ValueError(f"DETECTION_BASELINE must be one of {', '.join(_BASELINES)}")
+    return await fetch(_PAIRS_SQL.format(baseline=baseline, changed="" if force else _CHANGED_SQL))
+
+
+async def check_dataset(pair: Dict[str, Any], force: bool = False) -> Optional[int]:
+    """
+    Run the detectors on one dataset's profile pair and record the result.
+    Returns the number of issues created, or None if the dataset was skipped
+    (locked by another worker, or already checked on this pair).
+    """
+    from app.routers.issues import insert_issues
+
+    settings = get_settings()
+    dataset_id = pair["dataset_id"]
+    rows = await fetch(
+        "SELECT id, columns_metadata, sketches FROM dataset_profiles WHERE id = ANY($1::text[])",
+        [pair["baseline_profile_id"], pair["current_profile_id"]],
+    )
+    profiles = {row["id"]: row for row in rows}
+    if len(profiles) < 2:
+        return None  # a profile vanished since the sweep query
+    issues = await asyncio.to_thread(
+        DetectionPipeline.detect,
+        dataset_id,
+        profiles[pair["baseline_profile_id"]],
+        profiles[pair["current_profile_id"]],
+        settings.DETECTION_ALPHA,
+        settings.DETECTION_NULL_SPIKE_PCT,
+    )
+
+    async with transaction():
+        locked = await fetch("SELECT pg_try_advisory_xact_lock($1, hashtext($2)) AS locked", _LOCK_CLASS, dataset_id)
+        if not locked[0]["locked"]:
+            return None
+        if not force:
+            state = await fetch(
+                f"SELECT baseline_profile_id, current_profile_id FROM {TABLE_STATE} WHERE dataset_id = $1", dataset_id
+            )
+            if state and state[0]["baseline_profile_id"] == pair["baseline_profile_id"] \
+                    and state[0]["current_profile_id"] == pair["current_profile_id"]:
+                return None
+        await insert_issues(issues)
+        await table_upsert(TABLE_STATE, {
+            "dataset_id": dataset_id,
+            "baseline_profile_id": pair["baseline_profile_id"],
+            "current_profile_id": pair["current_profile_id"],
+            "issues_created": len(issues),
+            "checked_at": datetime.utcnow(),
+        }, on_conflict="dataset_id", returning="minimal")
+    return len(issues)
+
+
+async def run_sweep(force: bool = False) -> Dict[str, Any]:
+    """
+    Check every dataset whose profile pair changed since its last check
+    (every dataset with `force`). One sweep runs at a time per process.
+    """
+    global _sweep_lock, _last_sweep
+    if _sweep_lock is None:
+        _sweep_lock = asyncio.Lock()
+    async with _sweep_lock:
+        started = time.perf_counter()
+        pairs = await changed_pairs(force)
+        semaphore = asyncio.Semaphore(max(get_settings().DETECTION_CONCURRENCY, 1))
+
+        async def one(pair):
+            async with semaphore:
+                try:
+                    return await check_dataset(pair, force)
+                except Exception as e:
+                    logger.error("Detection failed for dataset %s: %s", pair["dataset_id"], e, exc_info=True)
+                    return e
+
+        results = await asyncio.gather(*(one(pair) for pair in pairs))
+        created = [r for r in results if isinstance(r, int)]
+        summary = {
+            "changed": len(pairs),
+            "checked": len(created),
+            "skipped": sum(r is None for r in results),
+            "failed": sum(isinstance(r, Exception) for r in results),
+            "issues_created": sum(created),
+            "seconds": round(time.perf_counter() - started, 3),
+            "finished_at": datetime.utcnow().isoformat(),
+        }
+        _last_sweep = summary
+        _totals["sweeps"] += 1
+        _totals["datasets_checked"] += summary["checked"]
+        _totals["issues_created"] += summary["issues_created"]
+        if pairs:
+            logger.info("Detection sweep: %s", summary)
+        return summary
+
+
+async def _loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_sweep()
+        except Exception as e:
+            logger.error("Detection sweep failed: %s", e, exc_info=True)
+
+
+def start_scheduler() -> None:
+    """Start periodic sweeps every DETECTION_INTERVAL_SECONDS (if > 0)."""
+    global _task
+    interval = get_settings().DETECTION_INTERVAL_SECONDS
+    if interval > 0 and _task is None:
+        _task = asyncio.get_running_loop().create_task(_loop(interval))
+
+
+async def stop_scheduler() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+def scheduler_stats() -> Dict[str, Any]:
+    return {
+        **_totals,
+        "running": _task is not None,
+        "sweeping": _sweep_lock is not None and _sweep_lock.locked(),
+        "interval_seconds": get_settings().DETECTION_INTERVAL_SECONDS,
+        "last_sweep": _last_sweep,
+    }
@@ -0,0 +1,233 @@
+"""
+Value embeddings for semantic drift – turns the distinct values of a text
+column into vectors, offline and on CPU, and folds them into the column's
+EmbeddingMoments summary (see services/sketches.py) while it is profiled.
+
+Two embedders:
+  * "hash": character n-grams of each value, feature-hashed with random
+    signs into SEMANTIC_DIMENSIONS buckets and L2-normalized. Needs no
+    model and embeds a whole batch in a few NumPy operations.
+  * a sentence-transformers model, if SEMANTIC_MODEL names one that is
+    available locally and the optional `ml` dependencies are installed.
+    It is never downloaded; if it cannot be loaded the hashing embedder
+    is used instead.
+
+Each batch embeds at most SEMANTIC_SAMPLE_VALUES of the batch's most
+frequent distinct values, SEMANTIC_BATCH_SIZE at a time, weighted by their
+counts. Vectors are kept in an LRU cache keyed by the 64-bit hash of the
+value, so values repeated across chunks, files and uploads are embedded
+once per process. Drift scoring only reads the stored summaries.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+import logging
+
+import numpy as np
+
+from app.config import get_profiling_settings
+
+logger = logging.getLogger(__name__)
+
+# multipliers of the characters of an n-gram, and the final 64-bit mix
+_NGRAM_PRIMES = np.array([0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F, 0x165667B1, 0xD3A2646C], dtype=np.uint64)
+_MIX = np.uint64(0xFF51AFD7ED558CCD)
+
+
+def is_text_dtype(dtype: str) -> bool:
+    """Whether values of a column of `dtype` are embedded (strings, not datetimes or numbers)."""
+    return dtype in ("object", "str", "category") or dtype.startswith("string")
+
+
+class HashingEmbedder:
+    """Signed feature hashing of character n-grams (lowercased, padded with a space on both sides)."""
+
+    def __init__(self, dims: int = 256, ngrams: tuple = (3, 4), max_chars: int = 64):
+        self.dims = dims
+        self.ngrams = ngrams
+        self.max_chars = max_chars
+        self.name = f"hash-char{ngrams[0]}-{ngrams[1]}-{dims}"
+
+    def embed(self, values: List[str]) -> np.ndarray:
+        n = len(values)
+        if not n:
+            return np.zeros((0, self.dims), dtype=np.float32)
+        text = np.array([f" {v[:self.max_chars].lower()} " for v in values])
+        # one row of code points per value, zero-padded to the longest
+        codes = text.view(np.uint32).reshape(n, -1).astype(np.uint64)
+        lengths = np.char.str_len(text)
+        sums = np.zeros(n * self.dims)
+        rows = np.arange(n)[:, None]
+        for size in range(self.ngrams[0], self.ngrams[1] + 1):
+            width = codes.shape[1] - size + 1
+            if width <= 0:
+                continue
+            h = np.full((n, width), size, dtype=np.uint64)
+            for k in range(size):
+                h += codes[:, k:k + width] * _NGRAM_PRIMES[k]
+            h ^= h >> np.uint64(33)
+            h *= _MIX
+            h ^= h >> np.uint64(29)
+            valid = np.arange(width)[None, :] <= (lengths - size)[:, None]
+            bucket = (h >> np.uint64(32)).astype(np.int64) % self.dims
+            sign = 1.0 - 2.0 * (h & np.uint64(1)).astype(np.float64)
+            sums += np.bincount(
+                (rows * self.dims + bucket)[valid], weights=sign[valid], minlength=n * self.dims
+            )
+        vectors = sums.reshape(n, self.dims)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0).astype(np.float32)
+
+
+class ModelEmbedder:
+    """A local sentence-transformers model, run on CPU."""
+
+    def __init__(self, model: str, batch_size: int = 256):
+        from sentence_transformers import SentenceTransformer  # optional `ml` dependencies
+
+        self.model = SentenceTransformer(model, device="cpu", local_files_only=True)
+        self.batch_size = batch_size
+        self.dims = self.model.get_sentence_embedding_dimension()
+        self.name = f"model:{model.rstrip('/').rsplit('/', 1)[-1]}-{self.dims}"
+
+    def embed(self, values: List[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            values, batch_size=self.batch_size, convert_to_numpy=True, normalize_embeddings=True,
+        )
+        return vectors.astype(np.float32, copy=False)
+
+
+class EmbeddingCache:
+    """LRU map from value hash to embedding, for one embedder."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._vectors: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, keys: np.ndarray) -> List[Optional[np.ndarray]]:
+        found = []
+        with self._lock:
+            for key in keys.tolist():
+                vector = self._vectors.get(key)
+                if vector is not None:
+                    self._vectors.move_to_end(key)
+                found.append(vector)
+        hits = sum(vector is not None for vector in found)
+        self.hits += hits
+        self.misses += len(found) - hits
+        return found
+
+    def put_many(self, keys: np.ndarray, vectors: np.ndarray) -> None:
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            for key, vector in zip(keys.tolist(), vectors):
+                self._vectors[key] = vector.copy()  # not a view pinning the whole batch
+                self._vectors.move_to_end(key)
+            while len(self._vectors) > self.capacity:
+                self._vectors.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+
+_embedder = None
+_cache: Optional[EmbeddingCache] = None
+_init_lock = threading.Lock()
+_stats = {"batches": 0, "values_embedded": 0}
+
+
+def get_embedder():
+    """The process's embedder (created on first use, see the module docstring)."""
+    global _embedder, _cache
+    if _embedder is None:
+        with _init_lock:
+            if _embedder is None:
+                settings = get_profiling_settings()
+                embedder = None
+                if settings.SEMANTIC_MODEL:
+                    try:
+                        embedder = ModelEmbedder(settings.SEMANTIC_MODEL, settings.SEMANTIC_BATCH_SIZE)
+                    except Exception as e:
+                        logger.warning("Semantic model %s unavailable, using hashed n-grams: %s", settings.SEMANTIC_MODEL, e)
+                if embedder is None:
+                    embedder = HashingEmbedder(settings.SEMANTIC_DIMENSIONS, max_chars=settings.SEMANTIC_MAX_CHARS)
+                _cache = EmbeddingCache(settings.SEMANTIC_CACHE_SIZE)
+                _embedder = embedder
+                logger.info("Semantic embedder: %s", embedder.name)
+    return _embedder
+
+
+def embed(values: List[str], keys: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Embeddings (len(values) x dims, float32) of `values`, from the cache
+    where possible. `keys` are the values' 64-bit hashes, if already known.
+    """
+    from app.services.sketches import hash_values  # pandas; imported by any profiling caller anyway
+
+    embedder = get_embedder()
+    if keys is None:
+        keys = hash_values(np.asarray(values, dtype=object))
+    found = _cache.get_many(keys)
+    missing = [i for i, vector in enumerate(found) if vector is None]
+    vectors = np.empty((len(values), embedder.dims), dtype=np.float32)
+    for i, vector in enumerate(found):
+        if vector is not None:
+            vectors[i] = vector
+    batch_size = get_profiling_settings().SEMANTIC_BATCH_SIZE
+    for start in range(0, len(missing), batch_size):
+        rows = missing[start:start + batch_size]
+        embedded = embedder.embed([values[i] for i in rows])
+        vectors[rows] = embedded
+        _cache.put_many(keys[rows], embedded)
+        _stats["batches"] += 1
+        _stats["values_embedded"] += len(rows)
+    return vectors
+
+
+def embed_counts(dtype: str, distinct: np.ndarray, counts: np.ndarray):
+    """
+    EmbeddingMoments of one batch of a column given as distinct values and
+    their counts, or None when semantic profiling is off or the column is
+    not text.
+    """
+    from app.services.sketches import EmbeddingMoments, hash_values
+
+    settings = get_profiling_settings()
+    if not settings.SEMANTIC_ENABLED or not is_text_dtype(dtype) or not len(distinct):
+        return None
+    distinct = np.asarray(distinct, dtype=object)
+    counts = np.asarray(counts, dtype=np.int64)
+    keys = hash_values(distinct)
+    limit = settings.SEMANTIC_SAMPLE_VALUES
+    if len(counts) > limit:
+        # the most frequent values; ties (e.g. all unique) broken by hash, so
+        # profiles of overlapping data sample the same values
+        rank = counts + (keys >> np.uint64(12)).astype(np.float64) / 2.0 ** 53
+        keep = np.argpartition(-rank, limit)[:limit]
+        distinct, counts, keys = distinct[keep], counts[keep], keys[keep]
+    embedder = get_embedder()
+    summary = EmbeddingMoments(embedder.name, embedder.dims)
+    summary.update(embed([str(v) for v in distinct], keys), counts, keys)
+    return summary
+
+
+def semantic_stats() -> Dict[str, Any]:
+    settings = get_profiling_settings()
+    lookups = _cache.hits + _cache.misses if _cache is not None else 0
+    return {
+        **_stats,
+        "enabled": settings.SEMANTIC_ENABLED,
+        "embedder": _embedder.name if _embedder is not None else None,
+        "cache_size": len(_cache) if _cache is not None else 0,
+        "cache_capacity": settings.SEMANTIC_CACHE_SIZE,
+        "cache_hits": _cache.hits if _cache is not None else 0,
+        "cache_misses": _cache.misses if _cache is not None else 0,
+        "cache_evictions": _cache.evictions if _cache is not None else 0,
+        "cache_hit_ratio": _cache.hits / lookups if lookups else 0.0,
+    }
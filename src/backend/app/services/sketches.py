@@ -0,0 +1,787 @@
+"""
+Mergeable column sketches – HyperLogLog distinct counts, KLL quantiles,
+Chan/Welford moments, Space-Saving heavy hitters and embedding moments of
+text values. Sketches of chunks, files or partitions can be merged
+in any order to get the sketch of their union.
+"""
+import base64
+import zlib
+import pandas as pd
+import numpy as np
+from typing import Dict, Any, Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+SKETCH_VERSION = 1
+
+# Numeric columns also store this many equal-mass quantiles (at (i + 0.5) / N)
+# as a compact distribution summary for drift scoring (see services.drift).
+QUANTILE_POINTS = 100
+QUANTILE_GRID = (np.arange(QUANTILE_POINTS) + 0.5) / QUANTILE_POINTS
+
+# Non-numeric columns keep the counts of (at most) this many frequent values.
+TOP_K_CAPACITY = 100
+
+
+# Integer arrays smaller than this, and float arrays (which fast zlib does not
+# shrink), are stored uncompressed unless the caller asks otherwise.
+COMPRESS_MIN_BYTES = 512
+_RAW_PREFIX = "raw:"  # not in the base64 alphabet, so it cannot start a compressed array
+
+
+def _encode_array(arr: np.ndarray, compress: Optional[bool] = None) -> str:
+    data = np.ascontiguousarray(arr).tobytes()
+    if compress is None:
+        compress = arr.dtype.kind != "f" and len(data) >= COMPRESS_MIN_BYTES
+    if not compress:
+        return _RAW_PREFIX + base64.b64encode(data).decode("ascii")
+    return base64.b64encode(zlib.compress(data, 1)).decode("ascii")
+
+
+def _decode_array(data: str, dtype) -> np.ndarray:
+    if data.startswith(_RAW_PREFIX):
+        return np.frombuffer(base64.b64decode(data[len(_RAW_PREFIX):]), dtype=dtype).copy()
+    return np.frombuffer(zlib.decompress(base64.b64decode(data)), dtype=dtype).copy()
+
+
+def hash_values(values) -> np.ndarray:
+    """
+    64-bit hashes of non-null values. Numbers hash by their float64 value so
+    1 and 1.0 (e.g. the same column read as int in one batch and float in
+    another) count as one distinct value; datetimes and timedeltas by their
+    nanosecond count rather than as Timestamp objects.
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind in "biuf":
+        arr = arr.astype(np.float64) + 0.0  # +0.0 folds -0.0 into 0.0
+    elif arr.dtype.kind in "mM":
+        arr = arr.astype(f"{arr.dtype.kind}8[ns]").view(np.int64)
+    return pd.util.hash_array(arr, categorize=False)
+
+
+def count_values(s: pd.Series):
+    """
+    (distinct non-null values, their counts, null count) of a column from a
+    single hashing pass. Datetimes stay datetime64 rather than becoming
+    Timestamp objects.
+    """
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    valid = codes[codes >= 0]
+    counts = np.bincount(valid, minlength=len(uniques))
+    return np.asarray(uniques), counts, len(codes) - len(valid)
+
+
+def _hll_sigma(x: float) -> float:
+    """x + sum over k >= 1 of x**(2**k) * 2**(k-1); infinite at x = 1."""
+    if x == 1.0:
+        return float("inf")
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous, z = z, z + x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _hll_tau(x: float) -> float:
+    """(1 - x - sum over k >= 1 of (1 - x**(2**-k))**2 * 2**-k) / 3."""
+    if x == 0.0 or x == 1.0:
+        return 0.0
+    y, z = 1.0, 1.0 - x
+    while True:
+        x = np.sqrt(x)
+        y *= 0.5
+        previous, z = z, z - (1.0 - x) ** 2 * y
+        if z == previous:
+            return z / 3.0
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2**p registers (std. error ~1.04/sqrt(2**p))."""
+
+    def __init__(self, p: int = 14, registers: Optional[np.ndarray] = None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = registers if registers is not None else np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        if not len(hashes):
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        if 64 - self.p <= 53:
+            # fits in a float64 mantissa, so frexp gives the exact bit length
+            bit_length = np.frexp(rest.astype(np.float64))[1]
+        else:
+            hi = (rest >> np.uint64(32)).astype(np.float64)
+            lo = (rest & np.uint64(0xFFFFFFFF)).astype(np.float64)
+            bit_length = np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1])
+        rank = ((64 - self.p) - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+
+    def update(self, values) -> None:
+        self.add_hashes(hash_values(values))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.p != self.p:
+            raise ValueError(f"Cannot merge HyperLogLog with p={self.p} and p={other.p}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> float:
+        """
+        Ertl's improved estimator ("New cardinality estimation algorithms for
+        HyperLogLog sketches", 2017): unbiased across the whole range, where
+        switching between linear counting and the raw estimate overshoots by
+        a few percent around 2.5 * m distinct values.
+        """
+        q = 64 - self.p
+        hist = np.bincount(self.registers, minlength=q + 2).astype(np.float64)
+        if hist[0] == self.m:
+            return 0.0
+        z = self.m * _hll_tau(1.0 - hist[q + 1] / self.m)
+        for k in range(q, 0, -1):
+            z = 0.5 * (z + hist[k])
+        z += self.m * _hll_sigma(hist[0] / self.m)
+        return float(self.m * self.m / (2.0 * np.log(2.0)) / z)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        The non-zero registers: their indices while few are set (as for
+        low-cardinality columns, up to m / 40), else a bitmap of which are
+        set. Either is followed by their values, and both are smaller than
+        the compressed registers in their range.
+        """
+        index = np.flatnonzero(self.registers)
+        rank = self.registers[index]
+        if len(index) <= self.m // 40:
+            return {"p": self.p, "index": _encode_array(index.astype(self._index_dtype)), "rank": _encode_array(rank)}
+        return {
+            "p": self.p,
+            "mask": _encode_array(np.packbits(self.registers > 0), compress=True),
+            "rank": _encode_array(rank, compress=True),
+        }
+
+    @property
+    def _index_dtype(self):
+        return np.uint16 if self.p <= 16 else np.uint32
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HyperLogLog":
+        if "registers" in data:  # stored before sparse encoding
+            return cls(p=data["p"], registers=_decode_array(data["registers"], np.uint8))
+        sketch = cls(p=data["p"])
+        if "index" in data:
+            index = _decode_array(data["index"], sketch._index_dtype).astype(np.int64)
+        else:
+            index = np.flatnonzero(np.unpackbits(_decode_array(data["mask"], np.uint8), count=sketch.m))
+        sketch.registers[index] = _decode_array(data["rank"], np.uint8)
+        return sketch
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang & Liberty). Level h holds items of
+    weight 2**h; a level over capacity is sorted and every other item is
+    promoted. Rank error is roughly 1.65/k.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._seed = seed
+        self._rng = None  # created on the first compaction; most small columns never need one
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _halve(self, items: np.ndarray, level: int) -> np.ndarray:
+        """Promote every other item of a sorted array, leaving an odd one behind."""
+        if len(items) % 2:
+            self.levels[level] = np.concatenate([self.levels[level], items[-1:]])
+            items = items[:-1]
+        if self._rng is None:
+            self._rng = np.random.default_rng(self._seed)
+        return items[int(self._rng.integers(2))::2]
+
+    def update(self, values) -> None:
+        x = np.asarray(values, dtype=np.float64)
+        self.update_sorted(np.sort(x[~np.isnan(x)]))
+
+    def update_sorted(self, x: np.ndarray) -> None:
+        """Add a sorted, NaN-free float64 array."""
+        if not len(x):
+            return
+        self.n += len(x)
+        # A large batch is halved straight down to the level where it fits,
+        # which is what repeated compaction of level 0 would do.
+        level = 0
+        while len(x) > self.k:
+            x = self._halve(x, level)
+            level += 1
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+        self.levels[level] = np.concatenate([self.levels[level], x])
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                self.levels[level] = np.empty(0)
+                promoted = self._halve(items, level)
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                level = 0  # capacities shift when a level is added
+                continue
+            level += 1
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if len(self.levels) == 1:
+            return np.quantile(self.levels[0], qs)  # nothing compacted yet: exact
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lvl), 2.0 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cum = items[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cum, qs * cum[-1], side="left")
+        return items[np.clip(idx, 0, len(items) - 1)]
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+    @property
+    def rank_error(self) -> float:
+        """Approximate rank error of `quantiles` (0 while nothing has been compacted)."""
+        return 0.0 if len(self.levels) == 1 else 1.65 / self.k
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "k": self.k,
+            "n": self.n,
+            "levels": [_encode_array(lvl.astype(np.float64)) for lvl in self.levels],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(k=data["k"], seed=data["n"])
+        sketch.n = data["n"]
+        sketch.levels = [_decode_array(lvl, np.float64) for lvl in data["levels"]]
+        return sketch
+
+
+class Moments:
+    """Count, mean, M2, min and max, merged with Chan et al.'s parallel update."""
+
+    def __init__(self, n: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 min: Optional[float] = None, max: Optional[float] = None):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    def update(self, values) -> None:
+        x = np.asarray(values, dtype=np.float64)
+        x = x[~np.isnan(x)]
+        if not len(x):
+            return
+        self._add(x, float(x.min()), float(x.max()))
+
+    def update_sorted(self, x: np.ndarray) -> None:
+        """Add a sorted, NaN-free float64 array."""
+        if len(x):
+            self._add(x, float(x[0]), float(x[-1]))
+
+    def _add(self, x: np.ndarray, lo: float, hi: float) -> None:
+        mean = float(x.mean())
+        centered = x - mean
+        self.merge(Moments(len(x), mean, float(np.dot(centered, centered)), lo, hi))
+
+    def merge(self, other: "Moments") -> "Moments":
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else float("nan")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"n": self.n, "mean": self.mean, "m2": self.m2, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Moments":
+        return cls(**data)
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary (Metwally et al.) of at most `capacity`
+    values, merged as in Agarwal et al.'s mergeable summaries.
+
+    `counts[v]` over-estimates the frequency of v by at most `errors[v]`;
+    any value not kept occurs at most `floor` times.
+    """
+
+    def __init__(self, capacity: int = TOP_K_CAPACITY):
+        self.capacity = capacity
+        self.n = 0
+        self.floor = 0
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    def update_counts(self, values, counts) -> None:
+        """Add a batch given as distinct values and their exact counts."""
+        counts = np.asarray(counts, dtype=np.int64)
+        if not len(counts):
+            return
+        batch = SpaceSaving(self.capacity)
+        batch.n = int(counts.sum())
+        if len(counts) > self.capacity:
+            order = np.argpartition(-counts, self.capacity)
+            keep, rest = order[:self.capacity], order[self.capacity:]
+            batch.floor = int(counts[rest].max())
+        else:
+            keep = np.arange(len(counts))
+        values = np.asarray(values)[keep]
+        if values.dtype.kind in "mM":
+            values = pd.Index(values)  # keys render like the Timestamp / Timedelta objects
+        batch.counts = {str(v): int(c) for v, c in zip(values, counts[keep])}
+        batch.errors = dict.fromkeys(batch.counts, 0)
+        self.merge(batch)
+
+    def update(self, values) -> None:
+        values, counts = np.unique(np.asarray(values, dtype=str), return_counts=True)
+        self.update_counts(values, counts)
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        counts, errors = {}, {}
+        for key in self.counts.keys() | other.counts.keys():
+            # a value missing from one side occurred there at most `floor` times
+            counts[key] = self.counts.get(key, self.floor) + other.counts.get(key, other.floor)
+            errors[key] = (self.errors[key] if key in self.counts else self.floor) + (
+                other.errors[key] if key in other.counts else other.floor
+            )
+        floor = self.floor + other.floor
+        if len(counts) > self.capacity:
+            ranked = sorted(counts, key=counts.get, reverse=True)
+            floor = max(floor, counts[ranked[self.capacity]])
+            counts = {key: counts[key] for key in ranked[:self.capacity]}
+            errors = {key: errors[key] for key in counts}
+        self.counts, self.errors, self.floor = counts, errors, floor
+        self.n += other.n
+        return self
+
+    def top(self, k: Optional[int] = None) -> List[tuple]:
+        """[(value, estimated count, max error)] by decreasing count."""
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(key, count, self.errors[key]) for key, count in ranked]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "n": self.n,
+            "floor": self.floor,
+            "items": [list(item) for item in self.top()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SpaceSaving":
+        sketch = cls(capacity=data["capacity"])
+        sketch.n = data["n"]
+        sketch.floor = data["floor"]
+        sketch.counts = {key: count for key, count, _ in data["items"]}
+        sketch.errors = {key: error for key, _, error in data["items"]}
+        return sketch
+
+
+class EmbeddingMoments:
+    """
+    Weighted mean and per-dimension variance of the embeddings of a text
+    column's values (see services/semantic.py): a diagonal-Gaussian summary
+    of what the column's values mean, merged like Moments. `weight` is the
+    number of rows summarized, `values` the number of distinct values
+    embedded (the sample size drift tests use), counted by a small
+    HyperLogLog of their hashes so that a value embedded in several chunks
+    counts once and merged profiles agree with a single pass.
+    """
+
+    def __init__(self, embedder: str, dims: int, hll_p: int = 12):
+        self.embedder = embedder
+        self.weight = 0.0
+        self.hll = HyperLogLog(p=hll_p)
+        self.counted = 0  # `values` of a summary stored before the HyperLogLog
+        self.mean = np.zeros(dims)
+        self.m2 = np.zeros(dims)
+
+    @property
+    def dims(self) -> int:
+        return len(self.mean)
+
+    @property
+    def values(self) -> int:
+        return max(int(round(self.hll.count())), self.counted)
+
+    def update(self, vectors: np.ndarray, weights: np.ndarray, keys: np.ndarray) -> None:
+        """
+        Add distinct values' embeddings (one per row) weighted by their
+        counts; `keys` are the values' 64-bit hashes (see `hash_values`).
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        total = float(weights.sum())
+        if total <= 0:
+            return
+        batch = EmbeddingMoments(self.embedder, self.dims, self.hll.p)
+        batch.weight = total
+        batch.hll.add_hashes(keys)
+        batch.mean = weights @ vectors / total
+        centered = vectors - batch.mean
+        batch.m2 = weights @ (centered * centered)
+        self.merge(batch)
+
+    def merge(self, other: "EmbeddingMoments") -> "EmbeddingMoments":
+        if other.embedder != self.embedder:
+            raise ValueError(f"Cannot merge embeddings of {self.embedder} and {other.embedder}")
+        if other.weight == 0:
+            return self
+        weight = self.weight + other.weight
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.weight / weight)
+        self.m2 = self.m2 + other.m2 + delta * delta * (self.weight * other.weight / weight)
+        self.weight = weight
+        self.hll.merge(other.hll)
+        self.counted = max(self.counted, other.counted)
+        return self
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self.m2 / self.weight if self.weight else np.zeros(self.dims)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "embedder": self.embedder,
+            "weight": self.weight,
+            "values": self.values,
+            "hll": self.hll.to_dict(),
+            "mean": _encode_array(self.mean.astype(np.float32)),
+            "m2": _encode_array(self.m2.astype(np.float32)),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "EmbeddingMoments":
+        mean = _decode_array(data["mean"], np.float32).astype(np.float64)
+        sketch = cls(data["embedder"], len(mean))
+        sketch.weight = data["weight"]
+        if "hll" in data:
+            sketch.hll = HyperLogLog.from_dict(data["hll"])
+        else:
+            sketch.counted = data["values"]
+        sketch.mean = mean
+        sketch.m2 = _decode_array(data["m2"], np.float32).astype(np.float64)
+        return sketch
+
+
+def _promote_dtype(current: str, new: str, numeric: bool) -> str:
+    """Dtype of a column seen as `current` so far and as `new` in the next batch."""
+    if current == new:
+        return current
+    if numeric and pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(new)):
+        try:
+            return str(np.result_type(pd.api.types.pandas_dtype(current), pd.api.types.pandas_dtype(new)))
+        except TypeError:
+            pass
+    return "object"
+
+
+class ColumnSketch:
+    """Mergeable summary of one column."""
+
+    def __init__(self, dtype: str, hll_p: int = 14, kll_k: int = 200):
+        self.dtype = dtype
+        self.numeric = pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(dtype))
+        self.rows = 0
+        self.null_count = 0
+        self.hll = HyperLogLog(p=hll_p)
+        self.moments = Moments()
+        self.kll = KLLSketch(k=kll_k)
+        self.top = SpaceSaving()
+        self.semantic: Optional[EmbeddingMoments] = None  # text columns, see services/semantic.py
+
+    @property
+    def value_count(self) -> int:
+        return self.rows - self.null_count
+
+    def _absorb_dtype(self, dtype: str, numeric: bool, has_values: bool) -> None:
+        # An all-null batch says nothing about the type; a batch with values
+        # either sets the type (nothing seen yet) or promotes it like pandas.
+        if dtype == self.dtype or not has_values:
+            return
+        if self.value_count == 0:
+            self.dtype, self.numeric = dtype, numeric
+        else:
+            self.dtype = _promote_dtype(self.dtype, dtype, self.numeric)
+            self.numeric = self.numeric and numeric
+
+    def update(self, s: pd.Series) -> None:
+        if pd.api.types.is_numeric_dtype(s.dtype):
+            self.add_sorted(str(s.dtype), len(s), np.sort(s.dropna().to_numpy(dtype=np.float64)))
+        else:
+            distinct, counts, null_count = count_values(s)
+            self.add_values(str(s.dtype), len(s), null_count, distinct, counts)
+
+    def add_sorted(self, dtype: str, rows: int, valid: np.ndarray) -> None:
+        """Add a batch of `rows` numeric rows whose non-null values are `valid` (sorted float64)."""
+        self._absorb_dtype(dtype, True, len(valid) > 0)
+        self.rows += rows
+        self.null_count += rows - len(valid)
+        if not len(valid):
+            return
+        self.moments.update_sorted(valid)
+        self.kll.update_sorted(valid)
+        # only distinct values matter to the HLL
+        self.hll.update(valid[np.concatenate(([True], valid[1:] != valid[:-1]))])
+
+    def add_values(self, dtype: str, rows: int, null_count: int, distinct: np.ndarray,
+                   counts: Optional[np.ndarray] = None) -> None:
+        """
+        Add a batch of `rows` non-numeric rows with the given nulls and
+        distinct values (and their counts, for the heavy-hitter summary).
+        """
+        self._absorb_dtype(dtype, False, len(distinct) > 0)
+        self.rows += rows
+        self.null_count += null_count
+        if len(distinct):
+            self.hll.update(distinct)
+            if counts is not None:
+                self.top.update_counts(distinct, counts)
+                self._add_embeddings(dtype, distinct, counts)
+
+    def _add_embeddings(self, dtype: str, distinct: np.ndarray, counts: np.ndarray) -> None:
+        from app.services.semantic import embed_counts  # settings and the embedder
+
+        batch = embed_counts(dtype, distinct, counts)
+        if batch is not None:
+            self._merge_semantic(batch)
+
+    def _merge_semantic(self, other: EmbeddingMoments) -> None:
+        if self.semantic is None:
+            self.semantic = EmbeddingMoments(other.embedder, other.dims).merge(other)
+        elif self.semantic.embedder == other.embedder:
+            self.semantic.merge(other)
+        else:
+            # summaries by different embedders cannot be combined; keep neither
+            logger.warning("Dropping semantic summary: embedded by %s and %s", self.semantic.embedder, other.embedder)
+            self.semantic = None
+
+    def merge(self, other: "ColumnSketch") -> "ColumnSketch":
+        self._absorb_dtype(other.dtype, other.numeric, other.value_count > 0)
+        self.rows += other.rows
+        self.null_count += other.null_count
+        self.hll.merge(other.hll)
+        self.moments.merge(other.moments)
+        self.kll.merge(other.kll)
+        self.top.merge(other.top)
+        if other.semantic is not None:
+            self._merge_semantic(other.semantic)
+        return self
+
+    def metadata(self) -> Dict[str, Any]:
+        dtype = self.dtype
+        if self.null_count and dtype.startswith(("int", "uint")):
+            # nulls anywhere (even in a batch that was all null, which says
+            # nothing about the type) make a NumPy integer column float64 in
+            # one frame
+            dtype = "float64"
+        return {
+            "dtype": dtype,
+            "null_count": int(self.null_count),
+            "null_percentage": float(self.null_count / self.rows * 100) if self.rows else 0.0,
+            "cardinality": int(round(self.hll.count())),
+        }
+
+    def statistics(self) -> Dict[str, Any]:
+        if self.moments.n == 0:
+            return dict.fromkeys(("mean", "std", "min", "max", "median"))
+        return {
+            "mean": float(self.moments.mean),
+            "std": self.moments.std,
+            "min": float(self.moments.min),
+            "max": float(self.moments.max),
+            "median": self.kll.quantile(0.5),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "dtype": self.dtype,
+            "rows": self.rows,
+            "null_count": self.null_count,
+            "hll": self.hll.to_dict(),
+        }
+        if self.numeric:
+            data["moments"] = self.moments.to_dict()
+            data["kll"] = self.kll.to_dict()
+            if self.kll.n:
+                data["quantiles"] = _encode_array(self.kll.quantiles(QUANTILE_GRID))
+                data["rank_error"] = self.kll.rank_error
+        else:
+            data["top"] = self.top.to_dict()
+            if self.semantic is not None:
+                data["semantic"] = self.semantic.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ColumnSketch":
+        sketch = cls(data["dtype"])
+        sketch.rows = data["rows"]
+        sketch.null_count = data["null_count"]
+        sketch.hll = HyperLogLog.from_dict(data["hll"])
+        if "moments" in data:
+            sketch.moments = Moments.from_dict(data["moments"])
+            sketch.kll = KLLSketch.from_dict(data["kll"])
+        if "top" in data:
+            sketch.top = SpaceSaving.from_dict(data["top"])
+        if "semantic" in data:
+            sketch.semantic = EmbeddingMoments.from_dict(data["semantic"])
+        return sketch
+
+
+def quantile_summary(column: Dict[str, Any]):
+    """
+    (quantiles, value count, rank error) of a serialized numeric ColumnSketch,
+    or None for non-numeric or all-null columns. Sketches stored before the
+    quantile summary existed are summarized from their KLL.
+    """
+    if "kll" not in column:
+        return None
+    n = int(column["moments"]["n"])
+    if n == 0:
+        return None
+    if "quantiles" in column:
+        return _decode_array(column["quantiles"], np.float64), n, float(column.get("rank_error", 0.0))
+    kll = KLLSketch.from_dict(column["kll"])
+    return kll.quantiles(QUANTILE_GRID), n, kll.rank_error
+
+
+class ProfileSketch:
+    """
+    Mergeable profile of a dataset: one ColumnSketch per column plus the
+    first sample rows. `to_profile()` renders the usual profile shape.
+    """
+
+    def __init__(self):
+        self.columns: Dict[str, ColumnSketch] = {}
+        self.row_count = 0
+        self.sample_rows: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "ProfileSketch":
+        sketch = cls()
+        sketch.update(df)
+        return sketch
+
+    def column(self, name: str, dtype: str) -> ColumnSketch:
+        """Sketch for column `name`, created (all-null so far) if new."""
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[name] = ColumnSketch(dtype)
+            column.rows = column.null_count = self.row_count
+        return column
+
+    def finish_batch(self, df: pd.DataFrame, sample_rows: Optional[List[Dict[str, Any]]] = None) -> "ProfileSketch":
+        """
+        Account for a batch whose columns have each been added via `column()`.
+        `sample_rows`, if the caller has them, are the batch's first rows.
+        """
+        present = set(df.columns)
+        for name, column in self.columns.items():
+            if name not in present:
+                column.rows += len(df)
+                column.null_count += len(df)
+        self.row_count += len(df)
+        if not self.sample_rows:
+            self.sample_rows = sample_rows if sample_rows is not None else df.head(10).to_dict(orient="records")
+        return self
+
+    def update(self, df: pd.DataFrame) -> "ProfileSketch":
+        for col in df.columns:
+            self.column(col, str(df[col].dtype)).update(df[col])
+        return self.finish_batch(df)
+
+    def merge(self, other: "ProfileSketch") -> "ProfileSketch":
+        for col, column in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(column)
+            else:
+                # column absent so far: every earlier row was null for it
+                merged = ColumnSketch(column.dtype)
+                merged.rows = merged.null_count = self.row_count
+                self.columns[col] = merged.merge(column)
+        for col, column in self.columns.items():
+            if col not in other.columns:
+                column.rows += other.row_count
+                column.null_count += other.row_count
+        self.row_count += other.row_count
+        if not self.sample_rows:
+            self.sample_rows = other.sample_rows
+        return self
+
+    @classmethod
+    def merge_all(cls, sketches: Iterable["ProfileSketch"]) -> "ProfileSketch":
+        merged = cls()
+        for sketch in sketches:
+            merged.merge(sketch)
+        return merged
+
+    @property
+    def column_count(self) -> int:
+        return len(self.columns)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": SKETCH_VERSION,
+            "row_count": self.row_count,
+            "columns": {col: column.to_dict() for col, column in self.columns.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], sample_rows: Optional[list] = None) -> "ProfileSketch":
+        sketch = cls()
+        sketch.row_count = data["row_count"]
+        sketch.columns = {col: ColumnSketch.from_dict(c) for col, c in data["columns"].items()}
+        sketch.sample_rows = sample_rows or []
+        return sketch
+
+    def to_profile(self) -> Dict[str, Any]:
+        """Profile in the shape of `DatasetProfiler.profile`, sketch included."""
+        return {
+            "columns_metadata": {col: c.metadata() for col, c in self.columns.items()},
+            "statistics": {col: c.statistics() for col, c in self.columns.items() if c.numeric},
+            "sample_rows": self.sample_rows,
+            "sketches": self.to_dict(),
+        }
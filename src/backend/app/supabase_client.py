@@ -1,17 +1,229 @@
 # src/backend/app/supabase_client.py
 # Reworked to use Render Postgres via DATABASE_URL (asyncpg)
-import os
+import re
+import json
+import math
+import time
+import asyncio
+import logging
+import contextvars
+from contextlib import asynccontextmanager
+from functools import lru_cache, wraps
 import asyncpg
-from typing import Any, Dict, Optional, List
+from typing import Any, AsyncIterator, Dict, Optional, List, Sequence, Tuple
 
-DATABASE_URL = os.environ.get("DATABASE_URL")
+from app.config import get_settings
+from app.utils.metrics import record_query
 
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL must be set in environment")
+logger = logging.getLogger(__name__)
+
+# A single application-lifetime pool is created in the FastAPI startup hook
+# (see app.main) and shared by every helper below. Helpers called inside
+# `transaction()` reuse the connection bound to the current task instead of
+# acquiring a new one.
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+_current_conn: contextvars.ContextVar[Optional[asyncpg.Connection]] = contextvars.ContextVar(
+    "current_conn", default=None
+)
+
+# Pool acquisition metrics (see pool_stats()).
+_acquire_stats = {
+    "acquired": 0,
+    "timeouts": 0,
+    "waiting": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+}
+
+# Set while a timed helper runs, so helpers built on other helpers
+# (table_upsert -> table_insert_many, get_row_by_pk -> table_select) are
+# timed once, as the outer call.
+_in_query: contextvars.ContextVar[bool] = contextvars.ContextVar("in_query", default=False)
+
+# INTO/UPDATE name a table; FROM/JOIN may name a function such as unnest(...)
+_SQL_TABLE = re.compile(r"\b(?:into|update)\s+([a-z_][\w.]*)|\b(?:from|join)\s+([a-z_][\w.]*)(?![\w.(])", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def _sql_shape(sql: str) -> Tuple[str, str]:
+    """(leading verb, first table named) of a raw statement, e.g. ("select", "datasets")."""
+    words = sql.split(None, 1)
+    op = words[0].lower() if words else "-"
+    match = _SQL_TABLE.search(sql)
+    return op, (match.group(1) or match.group(2)).lower() if match else "-"
+
+
+def _timed(op: Optional[str] = None):
+    """Record each call's latency with app.utils.metrics, labelled by `op` and table
+    (for raw SQL helpers, op=None, both come from the statement)."""
+    def decorate(fn):
+        @wraps(fn)
+        async def wrapper(first: str, *args: Any, **kwargs: Any):
+            if _in_query.get():
+                return await fn(first, *args, **kwargs)
+            token = _in_query.set(True)
+            started = time.perf_counter()
+            try:
+                return await fn(first, *args, **kwargs)
+            finally:
+                _in_query.reset(token)
+                labels = _sql_shape(first) if op is None else (op, first)
+                record_query(*labels, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def _json_safe(value: Any) -> Any:
+    """Replace NaN/inf (rejected by Postgres JSON) with None, recursively."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+def _json_dumps(value: Any) -> str:
+    return json.dumps(_json_safe(value), default=str)
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Encode/decode JSON columns as Python objects."""
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(
+            typename, encoder=_json_dumps, decoder=json.loads, schema="pg_catalog"
+        )
+
+
+async def init_pool() -> asyncpg.Pool:
+    """Create the shared connection pool (idempotent)."""
+    global _pool
+    if _pool is not None:
+        return _pool
+    async with _pool_lock:
+        if _pool is None:
+            settings = get_settings()
+            if not settings.DATABASE_URL:
+                raise RuntimeError("DATABASE_URL must be set in environment")
+            _pool = await asyncpg.create_pool(
+                settings.DATABASE_URL,
+                min_size=settings.DB_POOL_MIN_SIZE,
+                max_size=settings.DB_POOL_MAX_SIZE,
+                command_timeout=settings.DB_COMMAND_TIMEOUT,
+                statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+                max_inactive_connection_lifetime=settings.DB_MAX_INACTIVE_CONNECTION_LIFETIME,
+                init=_init_connection,
+            )
+            logger.info(
+                "Database pool created (min=%s, max=%s)",
+                settings.DB_POOL_MIN_SIZE,
+                settings.DB_POOL_MAX_SIZE,
+            )
+    return _pool
+
+
+async def close_pool() -> None:
+    """Close the shared connection pool."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+        logger.info("Database pool closed")
+
+
+@asynccontextmanager
+async def acquire():
+    """
+    Yield a connection: the one bound by an enclosing `transaction()`,
+    otherwise one acquired from the pool for the duration of the block.
+    """
+    conn = _current_conn.get()
+    if conn is not None:
+        yield conn
+        return
+
+    pool = await init_pool()
+    timeout = get_settings().DB_POOL_ACQUIRE_TIMEOUT
+    started = time.perf_counter()
+    _acquire_stats["waiting"] += 1
+    try:
+        conn = await pool.acquire(timeout=timeout)
+    except asyncio.TimeoutError:
+        _acquire_stats["timeouts"] += 1
+        logger.error("Timed out after %.1fs waiting for a database connection", timeout)
+        raise
+    finally:
+        _acquire_stats["waiting"] -= 1
+    waited = time.perf_counter() - started
+    _acquire_stats["acquired"] += 1
+    _acquire_stats["wait_seconds_total"] += waited
+    _acquire_stats["wait_seconds_max"] = max(_acquire_stats["wait_seconds_max"], waited)
+
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+@asynccontextmanager
+async def transaction():
+    """
+    Run a block of helper calls on one connection inside one transaction.
+
+        async with transaction():
+            await table_insert(...)
+            await table_update(...)
+
+    Nested blocks become savepoints.
+    """
+    async with acquire() as conn:
+        token = _current_conn.set(conn)
+        try:
+            async with conn.transaction():
+                yield conn
+        finally:
+            _current_conn.reset(token)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Pool saturation and acquire wait-time metrics."""
+    stats: Dict[str, Any] = dict(_acquire_stats)
+    acquired = stats["acquired"]
+    stats["wait_seconds_avg"] = stats["wait_seconds_total"] / acquired if acquired else 0.0
+    if _pool is None:
+        stats.update({"initialized": False, "size": 0, "idle": 0, "in_use": 0, "max_size": 0, "saturation": 0.0})
+        return stats
+    size = _pool.get_size()
+    idle = _pool.get_idle_size()
+    max_size = _pool.get_max_size()
+    stats.update({
+        "initialized": True,
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+        "min_size": _pool.get_min_size(),
+        "max_size": max_size,
+        "saturation": (size - idle) / max_size if max_size else 0.0,
+    })
+    return stats
+
+
+@_timed()
+async def fetch(sql: str, *args: Any) -> List[Dict[str, Any]]:
+    """Run a raw query on a pooled connection. Returns list[dict]."""
+    async with acquire() as conn:
+        rows = await conn.fetch(sql, *args)
+        return [dict(r) for r in rows]
+
+
+@_timed()
+async def execute(sql: str, *args: Any) -> str:
+    """Run a raw statement on a pooled connection. Returns the status string."""
+    async with acquire() as conn:
+        return await conn.execute(sql, *args)
 
-# NOTE: this implementation opens & closes a connection per call for simplicity.
-# It's fine for small apps; for production you should create a pool on startup.
-# Make sure `asyncpg` is in requirements.txt.
 
 def _parse_filters_sql(filters: Optional[str]) -> (str, List[Any]):
     """
@@ -41,6 +253,64 @@ def _parse_filters_sql(filters: Optional[str]) -> (str, List[Any]):
         return " WHERE " + " AND ".join(where_clauses), params
     return "", []
 
+
+# SQL text is built from (table, columns, keys) only; values are always bound
+# parameters, so each distinct shape maps to one prepared statement in the
+# per-connection statement cache.
+@lru_cache(maxsize=1024)
+def _insert_sql(table: str, cols: tuple, conflict_sql: str = "", returning: bool = True) -> str:
+    placeholders = ", ".join(f"${i}" for i in range(1, len(cols) + 1))
+    sql = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({placeholders}){conflict_sql}"
+    return sql + (" RETURNING *;" if returning else ";")
+
+
+@lru_cache(maxsize=1024)
+def _update_sql(table: str, cols: tuple, where_sql: str) -> str:
+    set_sql = ", ".join(f"{k} = ${i}" for i, k in enumerate(cols, start=1))
+    # shift the WHERE placeholders past the SET values
+    where_sql = re.sub(r"\$(\d+)", lambda m: f"${int(m.group(1)) + len(cols)}", where_sql)
+    return f"UPDATE {table} SET {set_sql}{where_sql} RETURNING *;"
+
+
+@lru_cache(maxsize=1024)
+def _upsert_clause(
+    cols: tuple, on_conflict: Optional[str], ignore_duplicates: bool, update_columns: Optional[Sequence[str]] = None
+) -> str:
+    if not on_conflict:
+        return ""
+    target = [c.strip() for c in on_conflict.split(",")]
+    updates = [c for c in (cols if update_columns is None else update_columns) if c not in target]
+    if ignore_duplicates or not updates:
+        return f" ON CONFLICT ({', '.join(target)}) DO NOTHING"
+    return f" ON CONFLICT ({', '.join(target)}) DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in updates)
+
+
+@lru_cache(maxsize=1024)
+def _insert_many_sql(table: str, cols: tuple, types: tuple, conflict_sql: str) -> str:
+    # one array parameter per column; unnest() zips them back into rows
+    arrays = ", ".join(f"${i}::{t}[]" for i, t in enumerate(types, start=1))
+    return f"INSERT INTO {table} ({', '.join(cols)}) SELECT * FROM unnest({arrays}){conflict_sql} RETURNING *;"
+
+
+_column_types: Dict[str, Dict[str, str]] = {}
+
+
+async def _table_column_types(conn: asyncpg.Connection, table: str) -> Dict[str, str]:
+    """{column: SQL type} of a table, cached per process."""
+    types = _column_types.get(table)
+    if types is None:
+        rows = await conn.fetch(
+            "SELECT attname, format_type(atttypid, atttypmod) AS type FROM pg_attribute "
+            "WHERE attrelid = to_regclass($1) AND attnum > 0 AND NOT attisdropped",
+            table,
+        )
+        if not rows:
+            raise ValueError(f"Unknown table: {table}")
+        types = _column_types[table] = {r["attname"]: r["type"] for r in rows}
+    return types
+
+
+@_timed("select")
 async def table_select(
     table: str,
     columns: str = "*",
@@ -76,74 +346,193 @@ async def table_select(
     where_sql, where_params = _parse_filters_sql(filters)
     sql = f"SELECT {cols} FROM {table}{where_sql}{order_clause}{limit_clause};"
 
-    conn = await asyncpg.connect(DATABASE_URL, timeout=timeout)
-    try:
-        rows = await conn.fetch(sql, *where_params)
+    async with acquire() as conn:
+        rows = await conn.fetch(sql, *where_params, timeout=timeout)
         return [dict(r) for r in rows]
+
+def _keyset_sql(
+    table: str,
+    columns: str,
+    filters: Optional[str],
+    order_by: Sequence[str],
+    descending: bool,
+    after: Optional[Sequence[Any]],
+) -> Tuple[str, List[Any]]:
+    """SELECT ... WHERE filters AND (keys) < / > (after) ORDER BY keys (no LIMIT)."""
+    where_sql, params = _parse_filters_sql(filters)
+    if after is not None:
+        first = len(params) + 1
+        placeholders = ", ".join(f"${i}" for i in range(first, first + len(order_by)))
+        # a row comparison walks a composite index on the keys directly
+        clause = f"({', '.join(order_by)}) {'<' if descending else '>'} ({placeholders})"
+        where_sql = f"{where_sql} AND {clause}" if where_sql else f" WHERE {clause}"
+        params += list(after)
+    direction = "DESC" if descending else "ASC"
+    order_sql = ", ".join(f"{key} {direction}" for key in order_by)
+    return f"SELECT {columns} FROM {table}{where_sql} ORDER BY {order_sql}", params
+
+
+@_timed("select_page")
+async def table_select_page(
+    table: str,
+    columns: str = "*",
+    filters: Optional[str] = None,
+    order_by: Sequence[str] = ("created_at", "id"),
+    descending: bool = True,
+    limit: int = 100,
+    after: Optional[Sequence[Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[tuple]]:
+    """
+    One page of rows ordered by the `order_by` keys, starting after the
+    key values `after` (keyset pagination: no OFFSET scan, stable while
+    rows are inserted). `columns` must include the keys.
+    Returns (rows, key values of the last row, or None on the last page).
+    """
+    sql, args = _keyset_sql(table, columns, filters, order_by, descending, after)
+    async with acquire() as conn:
+        rows = [dict(r) for r in await conn.fetch(f"{sql} LIMIT {int(limit) + 1};", *args)]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, tuple(rows[-1][key] for key in order_by)
+
+
+async def table_stream(
+    table: str,
+    columns: str = "*",
+    filters: Optional[str] = None,
+    order_by: Sequence[str] = ("created_at", "id"),
+    descending: bool = True,
+    after: Optional[Sequence[Any]] = None,
+    limit: Optional[int] = None,
+    prefetch: int = 500,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield rows like `table_select_page`, read through a server-side cursor
+    `prefetch` rows at a time, so memory stays flat however many rows match.
+    Holds one pooled connection until the iteration ends (recorded as one
+    "stream" query lasting the whole iteration).
+    """
+    sql, args = _keyset_sql(table, columns, filters, order_by, descending, after)
+    if limit is not None:
+        sql = f"{sql} LIMIT {int(limit)}"
+    started = time.perf_counter()
+    try:
+        async with acquire() as conn:
+            # cursors only live inside a transaction
+            async with conn.transaction():
+                async for record in conn.cursor(sql, *args, prefetch=prefetch):
+                    yield dict(record)
     finally:
-        await conn.close()
+        record_query("stream", table, time.perf_counter() - started)
+
 
+@_timed("insert")
 async def table_insert(table: str, payload: Any, returning: str = "representation"):
     """
     Insert a row or list of rows. payload: dict or list[dict]
-    returning is ignored (we always return inserted rows)
+    A dict returns the inserted row; a list goes through table_insert_many
+    (returning="minimal" skips RETURNING and returns []).
     """
-    if isinstance(payload, dict):
-        rows = [payload]
-    else:
-        rows = list(payload)
+    if not isinstance(payload, dict):
+        return await table_insert_many(table, payload, returning=returning)
 
-    conn = await asyncpg.connect(DATABASE_URL, timeout=30.0)
-    try:
-        inserted = []
+    async with acquire() as conn:
+        rec = await conn.fetchrow(_insert_sql(table, tuple(payload.keys())), *payload.values())
+        return dict(rec)
+
+
+@_timed("insert_many")
+async def table_insert_many(
+    table: str,
+    rows: Sequence[Dict[str, Any]],
+    on_conflict: Optional[str] = None,
+    ignore_duplicates: bool = False,
+    returning: str = "representation",
+    update_columns: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Insert many rows in a few round trips, all in one transaction.
+
+    - on_conflict: comma-separated conflict target, e.g. "id"; conflicting
+      rows are updated with the new values (an upsert), or skipped when
+      `ignore_duplicates` is set
+    - update_columns: the columns an upsert updates (default: all written
+      columns outside the conflict target)
+    - returning: "representation" returns the written rows (skipped
+      duplicates are not returned); "minimal" returns []
+
+    Rows are grouped by their key set. Each group is written with
+    one `INSERT ... SELECT * FROM unnest(...)` per DB_BULK_BATCH_SIZE rows
+    when rows are returned; otherwise with `executemany`, or with COPY for
+    plain inserts of DB_BULK_COPY_THRESHOLD rows or more.
+    """
+    settings = get_settings()
+    want_rows = returning != "minimal"
+    groups: Dict[tuple, List[tuple]] = {}
+    for row in rows:
+        groups.setdefault(tuple(row.keys()), []).append(tuple(row.values()))
+
+    written: List[Dict[str, Any]] = []
+    async with acquire() as conn:
         async with conn.transaction():
-            for row in rows:
-                cols = ", ".join(row.keys())
-                placeholders = ", ".join(f"${i}" for i in range(1, len(row) + 1))
-                values = list(row.values())
-                sql = f"INSERT INTO {table} ({cols}) VALUES ({placeholders}) RETURNING *;"
-                rec = await conn.fetchrow(sql, *values)
-                inserted.append(dict(rec))
-        return inserted[0] if isinstance(payload, dict) else inserted
-    finally:
-        await conn.close()
+            for cols, records in groups.items():
+                conflict_sql = _upsert_clause(cols, on_conflict, ignore_duplicates, update_columns)
+                if not want_rows and not conflict_sql and len(records) >= settings.DB_BULK_COPY_THRESHOLD:
+                    await conn.copy_records_to_table(table, records=records, columns=list(cols))
+                elif not want_rows:
+                    await conn.executemany(_insert_sql(table, cols, conflict_sql, False), records)
+                else:
+                    column_types = await _table_column_types(conn, table)
+                    sql = _insert_many_sql(table, cols, tuple(column_types[c] for c in cols), conflict_sql)
+                    for start in range(0, len(records), settings.DB_BULK_BATCH_SIZE):
+                        batch = records[start:start + settings.DB_BULK_BATCH_SIZE]
+                        written.extend(dict(r) for r in await conn.fetch(sql, *(list(col) for col in zip(*batch))))
+    return written
+
 
+@_timed("upsert")
+async def table_upsert(
+    table: str,
+    payload: Any,
+    on_conflict: str = "id",
+    ignore_duplicates: bool = False,
+    returning: str = "representation",
+):
+    """Insert or update a row or list of rows on `on_conflict` (see table_insert_many)."""
+    rows = await table_insert_many(
+        table, [payload] if isinstance(payload, dict) else payload,
+        on_conflict=on_conflict, ignore_duplicates=ignore_duplicates, returning=returning,
+    )
+    if isinstance(payload, dict):
+        return rows[0] if rows else None
+    return rows
+
+@_timed("update")
 async def table_update(table: str, payload: Dict[str, Any], filters: str, returning: str = "representation"):
     """
     Update rows matching filters. filters example: "id=eq.123"
     Returns updated rows (list).
     """
-    set_clauses = []
-    values = []
-    i = 1
-    for k, v in payload.items():
-        set_clauses.append(f"{k} = ${i}")
-        values.append(v)
-        i += 1
-    set_sql = ", ".join(set_clauses)
     where_sql, where_params = _parse_filters_sql(filters)
-    sql = f"UPDATE {table} SET {set_sql}{where_sql} RETURNING *;"
-    conn = await asyncpg.connect(DATABASE_URL, timeout=30.0)
-    try:
-        rows = await conn.fetch(sql, *(values + where_params))
+    sql = _update_sql(table, tuple(payload.keys()), where_sql)
+    async with acquire() as conn:
+        rows = await conn.fetch(sql, *(list(payload.values()) + where_params))
         return [dict(r) for r in rows]
-    finally:
-        await conn.close()
 
+@_timed("delete")
 async def table_delete(table: str, filters: str, returning: str = "representation"):
     """
     Delete rows matching filters.
     """
     where_sql, where_params = _parse_filters_sql(filters)
     sql = f"DELETE FROM {table}{where_sql} RETURNING *;"
-    conn = await asyncpg.connect(DATABASE_URL, timeout=30.0)
-    try:
+    async with acquire() as conn:
         rows = await conn.fetch(sql, *where_params)
         return [dict(r) for r in rows]
-    finally:
-        await conn.close()
 
+@_timed("select_pk")
 async def get_row_by_pk(table: str, pk_name: str, pk_value: Any, columns: str = "*"):
     filters = f"{pk_name}=eq.{pk_value}"
-    data = await table_select(table, columns=columns, filters=filters)
+    data = await table_select(table, columns=columns, filters=filters, params={"limit": 1})
     return data[0] if data else None
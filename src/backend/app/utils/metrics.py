@@ -0,0 +1,265 @@
+"""
+Instrumentation – request, query and pipeline-stage timings, rendered in the
+Prometheus text format for GET /metrics.
+
+  - `MetricsMiddleware` times every HTTP request by route template and
+    counts requests in flight.
+  - `record_query` is called by every supabase_client helper with the
+    statement's shape (select / insert / ...) and table.
+  - `stage("name")` times a block of pipeline work (parse, profile, store,
+    db_insert, ...).
+
+Query and stage timings also go to the current request's trace, so a
+request slower than METRICS_SLOW_REQUEST_SECONDS is logged with the time
+spent per stage and in the database. Work in worker threads (asyncio.to_thread)
+is traced too; work in the process pool is not. Metrics are per process.
+"""
+import math
+import time
+import random
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_metrics: List["_Metric"] = []
+_collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        _metrics.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        data = self._values.get(key)
+        if data is None:
+            data = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        counts = data[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        data[1] += value
+        data[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, inf)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being served.", ("method",))
+QUERY_SECONDS = Histogram(
+    "lineage_db_query_duration_seconds", "Database helper call latency by statement shape and table.", ("op", "table")
+)
+STAGE_SECONDS = Histogram("lineage_stage_duration_seconds", "Pipeline stage duration.", ("stage",))
+SLOW_REQUESTS = Counter("http_slow_requests_total", "Requests slower than METRICS_SLOW_REQUEST_SECONDS.", ("route",))
+
+
+def register_collector(prefix: str, collect: Callable[[], Dict[str, Any]]) -> None:
+    """Export the numeric values of a stats function (e.g. pool_stats) as gauges `lineage_<prefix>_<key>`."""
+    _collectors[prefix] = collect
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+    for prefix, collect in _collectors.items():
+        try:
+            stats = collect()
+        except Exception as e:
+            logger.warning("Metrics collector %s failed: %s", prefix, e)
+            continue
+        for key, value in stats.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                name = f"lineage_{prefix}_{key}"
+                lines += [f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+    return "\n".join(lines) + "\n"
+
+
+# --- traces ---
+
+class Trace:
+    """Stage and query time of one request."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}  # insertion order = first seen
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def summary(self) -> str:
+        parts = [f"{name} {seconds:.3f}s" for name, seconds in self.stages.items()]
+        parts.append(f"db {self.queries} quer{'y' if self.queries == 1 else 'ies'} {self.query_seconds:.3f}s")
+        return ", ".join(parts)
+
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("metrics_trace", default=None)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=name)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add_stage(name, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as pipeline stage `name` (works around awaits too)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def record_query(op: str, table: str, seconds: float) -> None:
+    QUERY_SECONDS.observe(seconds, op=op, table=table)
+    trace = _trace.get()
+    if trace is not None:
+        trace.queries += 1
+        trace.query_seconds += seconds
+
+
+# --- middleware ---
+
+def _route_template(scope) -> str:
+    """
+    The matched route as a template ("/api/datasets/{dataset_id}"), so ids do
+    not explode label cardinality. Rebuilt from the path parameters routing
+    left in `scope`; requests no route matched are "unmatched".
+    """
+    if scope.get("endpoint") is None:
+        return "unmatched"
+    names = {str(value): f"{{{name}}}" for name, value in (scope.get("path_params") or {}).items()}
+    return "/".join(names.get(segment, segment) for segment in scope["path"].split("/"))
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route latency histogram, in-flight gauge and slow-request log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not get_settings().METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        trace = Trace()
+        token = _trace.set(trace)
+        REQUESTS_IN_FLIGHT.inc(method=method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_FLIGHT.dec(method=method)
+            route = _route_template(scope)  # known once routing ran
+            REQUEST_SECONDS.observe(elapsed, method=method, route=route, status=status["code"])
+            _trace.reset(token)
+            self._log_if_slow(method, route, status["code"], elapsed, trace)
+
+    @staticmethod
+    def _log_if_slow(method: str, route: str, status: int, elapsed: float, trace: Trace) -> None:
+        settings = get_settings()
+        threshold = settings.METRICS_SLOW_REQUEST_SECONDS
+        if not threshold or elapsed < threshold:
+            return
+        SLOW_REQUESTS.inc(route=route)
+        if random.random() < settings.METRICS_SLOW_SAMPLE_RATE:
+            logger.warning("Slow request %s %s -> %s in %.3fs: %s", method, route, status, elapsed, trace.summary())
@@ -0,0 +1,141 @@
+# src/backend/app/utils/pagination.py
+"""
+Keyset pagination, field projection and NDJSON streaming for list endpoints.
+
+A page is a JSON array (as before); the cursor for the next page is sent in
+the X-Next-Cursor header and is absent on the last page. A request with
+neither `limit` nor `cursor` gets every row in one array, as before
+pagination, streamed from a server-side cursor. `format=ndjson` streams
+every remaining row, one JSON object per line, the same way.
+"""
+import json
+import base64
+import binascii
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+from app.config import get_settings
+from app.supabase_client import table_select_page, table_stream
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+_STREAM_CHUNK_ROWS = 100  # rows per chunk written to the socket
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=_default, separators=(",", ":"))
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    """Opaque cursor for a row's sort key (timestamp, id)."""
+    raw = _dumps([_default(v) if isinstance(v, datetime) else v for v in key])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Inverse of encode_cursor; 400 on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), str(row_id)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def select_fields(fields: Optional[str], columns: Dict[str, str], default: Sequence[str]) -> List[str]:
+    """Requested field names (comma-separated), validated against `columns`."""
+    if not fields:
+        return list(default)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in columns]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}; choose from {', '.join(columns)}",
+        )
+    return list(dict.fromkeys(names))
+
+
+async def list_response(
+    table: str,
+    columns: Dict[str, str],
+    default_fields: Sequence[str],
+    fields: Optional[str] = None,
+    filters: Optional[str] = None,
+    order_by: Sequence[str] = ("created_at", "id"),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    format: str = "json",
+) -> Response:
+    """
+    A page (or NDJSON stream) of `table` rows, newest first.
+
+    - columns: field name -> SQL expression it is selected with
+    - limit: page size (default LIST_PAGE_SIZE, capped at LIST_MAX_PAGE_SIZE);
+      for NDJSON, the total number of rows (default: all). With neither a
+      limit nor a cursor the JSON array holds every row, streamed.
+    """
+    settings = get_settings()
+    names = select_fields(fields, columns, default_fields)
+    extra = [key for key in order_by if key not in names]  # needed for the next cursor
+    select_sql = ", ".join(
+        columns[name] if columns[name] == name else f"{columns[name]} AS {name}" for name in names + extra
+    )
+    after = decode_cursor(cursor) if cursor else None
+
+    def project(row: Dict[str, Any]) -> Dict[str, Any]:
+        for key in extra:
+            del row[key]
+        return row
+
+    if format == "ndjson":
+        rows = table_stream(
+            table, select_sql, filters, order_by, after=after, limit=limit, prefetch=settings.LIST_STREAM_PREFETCH
+        )
+
+        async def lines():
+            chunk = []
+            async for row in rows:
+                chunk.append(_dumps(project(row)))
+                if len(chunk) >= _STREAM_CHUNK_ROWS:
+                    yield "\n".join(chunk) + "\n"
+                    chunk = []
+            if chunk:
+                yield "\n".join(chunk) + "\n"
+
+        return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+    if limit is None and cursor is None:
+        # unpaged request: every row, as before pagination (clients that never
+        # send a limit do not follow X-Next-Cursor), streamed as one JSON array
+        rows = table_stream(table, select_sql, filters, order_by, prefetch=settings.LIST_STREAM_PREFETCH)
+
+        async def array():
+            yield "["
+            chunk, separator = [], ""
+            async for row in rows:
+                chunk.append(_dumps(project(row)))
+                if len(chunk) >= _STREAM_CHUNK_ROWS:
+                    yield separator + ",".join(chunk)
+                    chunk, separator = [], ","
+            if chunk:
+                yield separator + ",".join(chunk)
+            yield "]"
+
+        return StreamingResponse(array(), media_type="application/json")
+
+    page_size = min(limit or settings.LIST_PAGE_SIZE, settings.LIST_MAX_PAGE_SIZE)
+    rows, last_key = await table_select_page(table, select_sql, filters, order_by, limit=page_size, after=after)
+    headers = {NEXT_CURSOR_HEADER: encode_cursor(last_key)} if last_key else {}
+    return Response(
+        _dumps([project(row) for row in rows]), media_type="application/json", headers=headers
+    )
@@ -1,56 +1,186 @@
 # src/backend/app/utils/storage.py
+"""
+Object storage for uploaded files: MinIO, with a local directory fallback.
+
+One MinIO client (and its urllib3 connection pool) is shared by the whole
+process, and a bucket is checked/created once per process rather than on
+every upload. The calls here block; async code runs them in a thread
+(see `store_content`). Objects larger than MINIO_PART_SIZE are uploaded as
+multipart uploads with MINIO_PARALLEL_UPLOADS parts in flight at once.
+
+Given a content hash, a file is stored once under `objects/{hash}{ext}`
+(content-addressed); storing the same bytes again is a no-op.
+"""
 from pathlib import Path
 import io
-from typing import Optional
+import os
+import shutil
+import queue
+import asyncio
+import threading
+from typing import Optional, TYPE_CHECKING
 import logging
 
-from minio import Minio
-from minio.error import S3Error
-
 from app.config import get_settings
+
+if TYPE_CHECKING:
+    # minio (and urllib3/certifi) are imported when the first client is made
+    from minio import Minio
+    from minio.error import S3Error
 settings = get_settings()
 
 logger = logging.getLogger(__name__)
 
-# Local fallback directory (keeps a copy if MinIO is not available)
+# Local fallback directory (keeps a copy if MinIO is not available);
+# created on first write, not at import
 ROOT = Path.cwd()
 LOCAL_UPLOAD_DIR = ROOT / "storage" / "uploads"
-LOCAL_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+LOCAL_OBJECT_DIR = ROOT / "storage" / "objects"
+
+_client: Optional["Minio"] = None
+_client_lock = threading.Lock()
+_buckets: set = set()  # buckets known to exist
+_local_dirs: set = set()  # local directories known to exist
+
+
+def _local_dir(directory: Path) -> Path:
+    if directory not in _local_dirs:
+        directory.mkdir(parents=True, exist_ok=True)
+        _local_dirs.add(directory)
+    return directory
 
 
 def _safe_name(filename: str) -> str:
     return filename.replace("/", "_").replace("..", "_")
 
 
-def upload_to_minio(dataset_id: str, filename: str, content: bytes) -> str:
-    """
-    Upload content to MinIO and return object path string (minio://bucket/object).
-    Raises exception on failure.
-    """
-    endpoint = settings.MINIO_ENDPOINT
-    access_key = settings.MINIO_ACCESS_KEY
-    secret_key = settings.MINIO_SECRET_KEY
-    bucket = settings.MINIO_BUCKET
+def content_object_name(content_hash: str, filename: str) -> str:
+    """Content-addressed object key; keeps the extension, which says how to parse the file."""
+    return f"objects/{content_hash}{Path(filename).suffix.lower()}"
+
+
+def _object_name(dataset_id: str, filename: str, content_hash: Optional[str]) -> str:
+    if content_hash:
+        return content_object_name(content_hash, filename)
+    return f"uploads/{dataset_id}-{_safe_name(filename)}"
+
+
+def _local_path(dataset_id: str, filename: str, content_hash: Optional[str]) -> Path:
+    if content_hash:
+        return _local_dir(LOCAL_OBJECT_DIR) / Path(content_object_name(content_hash, filename)).name
+    return _local_dir(LOCAL_UPLOAD_DIR) / f"{dataset_id}-{_safe_name(filename)}"
+
+
+def _object_exists(client: "Minio", bucket: str, object_name: str) -> bool:
+    from minio.error import S3Error
+
+    try:
+        client.stat_object(bucket, object_name)
+        return True
+    except S3Error as e:
+        if e.code in ("NoSuchKey", "NoSuchObject", "ResourceNotFound"):
+            return False
+        raise
+
+
+def _part_size() -> int:
+    return max(settings.MINIO_PART_SIZE, 5 * 1024 * 1024)  # S3 minimum part size
+
+
+def get_minio_client() -> "Minio":
+    """The process-wide MinIO client, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            import certifi
+            import urllib3
+            from minio import Minio
+
+            # same defaults as Minio's own pool, but sized for parallel part uploads
+            http_client = urllib3.PoolManager(
+                maxsize=max(settings.MINIO_MAX_CONNECTIONS, settings.MINIO_PARALLEL_UPLOADS),
+                block=True,
+                timeout=urllib3.Timeout(connect=30, read=300),
+                cert_reqs="CERT_REQUIRED",
+                ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+                retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+            )
+            # Minio expects host:port (no scheme) for endpoint in Minio() constructor
+            _client = Minio(
+                settings.MINIO_ENDPOINT,
+                access_key=settings.MINIO_ACCESS_KEY,
+                secret_key=settings.MINIO_SECRET_KEY,
+                secure=settings.MINIO_USE_SSL,
+                http_client=http_client,
+            )
+        return _client
+
+
+def close_storage() -> None:
+    """Drop the shared client and its pooled connections (shutdown, or after a settings change)."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client._http.clear()
+            _client = None
+        _buckets.clear()
+
 
-    # Minio expects host:port (no scheme) for endpoint in Minio() constructor
-    client = Minio(endpoint, access_key=access_key, secret_key=secret_key, secure=settings.MINIO_USE_SSL)
+def _minio_client(bucket: str) -> "Minio":
+    """The shared MinIO client, with `bucket` created if this process has not seen it yet."""
+    from minio.error import S3Error
 
-    # Ensure bucket exists
+    client = get_minio_client()
+    if bucket in _buckets:
+        return client
     try:
         if not client.bucket_exists(bucket):
             client.make_bucket(bucket)
+    except S3Error as e:
+        # another worker created it between our check and make_bucket
+        if e.code not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+            logger.warning("MinIO bucket check/create failed: %s", e)
+            raise
     except Exception as e:
         logger.warning("MinIO bucket check/create failed: %s", e)
         raise
+    _buckets.add(bucket)
+    return client
+
+
+def _forget_bucket(bucket: str, error: "S3Error") -> None:
+    # the bucket was removed behind our back; check again on the next upload
+    if error.code == "NoSuchBucket":
+        _buckets.discard(bucket)
+
 
-    safe_name = _safe_name(filename)
-    object_name = f"uploads/{dataset_id}-{safe_name}"
+def upload_to_minio(dataset_id: str, filename: str, content: bytes, content_hash: Optional[str] = None) -> str:
+    """
+    Upload content to MinIO and return object path string (minio://bucket/object).
+    With `content_hash`, the object is content-addressed and not re-uploaded
+    if it already exists. Raises exception on failure.
+    """
+    from minio.error import S3Error
+
+    bucket = settings.MINIO_BUCKET
+    client = _minio_client(bucket)
+    object_name = _object_name(dataset_id, filename, content_hash)
 
     try:
+        if content_hash and _object_exists(client, bucket, object_name):
+            return f"minio://{bucket}/{object_name}"
         # put_object expects a stream; use io.BytesIO
-        client.put_object(bucket, object_name, data=io.BytesIO(content), length=len(content))
+        client.put_object(
+            bucket,
+            object_name,
+            data=io.BytesIO(content),
+            length=len(content),
+            part_size=_part_size(),
+            num_parallel_uploads=settings.MINIO_PARALLEL_UPLOADS,
+        )
     except S3Error as e:
         logger.error("MinIO put_object failed: %s", e)
+        _forget_bucket(bucket, e)
         raise
     except Exception as e:
         logger.error("Unexpected MinIO error: %s", e)
@@ -59,13 +189,322 @@ def upload_to_minio(dataset_id: str, filename: str, content: bytes) -> str:
     return f"minio://{bucket}/{object_name}"
 
 
-def save_local_file(dataset_id: str, filename: str, content: bytes) -> str:
+def save_local_file(dataset_id: str, filename: str, content: bytes, content_hash: Optional[str] = None) -> str:
     """
     Save a local copy (fallback) and return relative path.
     """
-    safe = _safe_name(filename)
-    out_name = f"{dataset_id}-{safe}"
-    out_path = LOCAL_UPLOAD_DIR / out_name
-    out_path.write_bytes(content)
+    out_path = _local_path(dataset_id, filename, content_hash)
+    if not (content_hash and out_path.exists()):
+        out_path.write_bytes(content)
     # return relative path for readability
     return str(out_path.relative_to(Path.cwd()))
+
+
+def upload_file_to_minio(dataset_id: str, filename: str, path: str, content_hash: Optional[str] = None) -> str:
+    """
+    Upload a file from disk to MinIO (multipart, MINIO_PART_SIZE parts,
+    MINIO_PARALLEL_UPLOADS at a time) and return the object path string.
+    With `content_hash`, as for `upload_to_minio`. Raises exception on failure.
+    """
+    from minio.error import S3Error
+
+    bucket = settings.MINIO_BUCKET
+    client = _minio_client(bucket)
+    object_name = _object_name(dataset_id, filename, content_hash)
+    try:
+        if content_hash and _object_exists(client, bucket, object_name):
+            return f"minio://{bucket}/{object_name}"
+        client.fput_object(
+            bucket,
+            object_name,
+            str(path),
+            part_size=_part_size(),
+            num_parallel_uploads=settings.MINIO_PARALLEL_UPLOADS,
+        )
+    except S3Error as e:
+        logger.error("MinIO fput_object failed: %s", e)
+        _forget_bucket(bucket, e)
+        raise
+    return f"minio://{bucket}/{object_name}"
+
+
+def save_local_copy(dataset_id: str, filename: str, path: str, content_hash: Optional[str] = None) -> str:
+    """
+    Copy a file from disk into the local fallback directory and return the
+    relative path.
+    """
+    out_path = _local_path(dataset_id, filename, content_hash)
+    if not (content_hash and out_path.exists()):
+        shutil.copyfile(path, out_path)
+    return str(out_path.relative_to(Path.cwd()))
+
+
+def store_file(dataset_id: str, filename: str, path: str, content_hash: Optional[str] = None) -> str:
+    """Store a file from disk: MinIO if reachable, otherwise the local fallback."""
+    try:
+        return upload_file_to_minio(dataset_id, filename, path, content_hash)
+    except Exception as e:
+        logger.warning("MinIO upload failed: %s. Saving local copy.", e)
+        return save_local_copy(dataset_id, filename, path, content_hash)
+
+
+def store_bytes(dataset_id: str, filename: str, content: bytes, content_hash: Optional[str] = None) -> str:
+    """Store an in-memory upload: MinIO if reachable, otherwise the local fallback."""
+    try:
+        storage_path = upload_to_minio(dataset_id, filename, content, content_hash)
+        logger.info("Uploaded to MinIO: %s", storage_path)
+        return storage_path
+    except Exception as e:
+        logger.warning("MinIO upload failed: %s. Saving local copy.", e)
+        storage_path = save_local_file(dataset_id, filename, content, content_hash)
+        logger.info("Saved local fallback: %s", storage_path)
+        return storage_path
+
+
+async def store_content(dataset_id: str, filename: str, content: bytes, content_hash: Optional[str] = None) -> str:
+    """`store_bytes` in a worker thread, so the event loop keeps serving during the transfer."""
+    return await asyncio.to_thread(store_bytes, dataset_id, filename, content, content_hash)
+
+
+class _ChunkReader:
+    """
+    File-like object fed from a bounded queue of byte chunks, so a
+    background `put_object` can consume an upload while it is being received.
+    """
+
+    _ABORT = object()
+
+    def __init__(self, max_chunks: int):
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_chunks)
+        self._buffer = b""
+        self._eof = False
+
+    def put(self, chunk: Optional[bytes]) -> None:
+        """Queue a chunk; None marks the end of the stream."""
+        self._queue.put(chunk)
+
+    def abort(self) -> None:
+        """Make the consumer's next read fail so the upload is not completed."""
+        self._queue.put(self._ABORT)
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = self._queue.get()
+            if chunk is self._ABORT:
+                raise IOError("upload aborted")
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        out, self._buffer = self._buffer[:size], self._buffer[size:]
+        return out
+
+    def drain(self) -> None:
+        """Unblock a producer after the consumer has given up."""
+        self._eof = True
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+
+class MinioUploadSink:
+    """
+    Streams chunks to MinIO as a multipart upload of MINIO_PART_SIZE parts,
+    up to MINIO_PARALLEL_UPLOADS of them in flight. `write` blocks once
+    `max_buffer` bytes are queued, bounding memory (plus the parts being sent).
+    """
+
+    def __init__(self, dataset_id: str, filename: str, max_buffer: int):
+        self.bucket = settings.MINIO_BUCKET
+        self.filename = filename
+        self.object_name = f"uploads/{dataset_id}-{_safe_name(filename)}"
+        self._client = _minio_client(self.bucket)
+        chunk_size = max(settings.UPLOAD_CHUNK_SIZE, 1)
+        self._reader = _ChunkReader(max_chunks=max(max_buffer // chunk_size, 1))
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        from minio.error import S3Error
+
+        try:
+            self._client.put_object(
+                self.bucket,
+                self.object_name,
+                data=self._reader,
+                length=-1,
+                part_size=_part_size(),
+                num_parallel_uploads=settings.MINIO_PARALLEL_UPLOADS,
+            )
+        except BaseException as e:  # surfaced from write()/close()
+            self._error = e
+            if isinstance(e, S3Error):
+                _forget_bucket(self.bucket, e)
+            self._reader.drain()
+
+    def write(self, chunk: bytes) -> None:
+        if self._error is not None:
+            raise self._error
+        self._reader.put(chunk)
+
+    def close(self, content_hash: Optional[str] = None) -> str:
+        """
+        Finish the upload. With `content_hash` (known only once the stream
+        has ended) the object is moved to its content-addressed key, or
+        dropped if that key already holds the same bytes.
+        """
+        self._reader.put(None)
+        self._thread.join()
+        if self._error is not None:
+            logger.error("MinIO streaming upload failed: %s", self._error)
+            raise self._error
+        if not content_hash:
+            return f"minio://{self.bucket}/{self.object_name}"
+        from minio.commonconfig import ComposeSource
+
+        target = content_object_name(content_hash, self.filename)
+        if not _object_exists(self._client, self.bucket, target):
+            # server-side copy (multipart for objects over 5 GiB)
+            self._client.compose_object(self.bucket, target, [ComposeSource(self.bucket, self.object_name)])
+        self._client.remove_object(self.bucket, self.object_name)
+        return f"minio://{self.bucket}/{target}"
+
+    def abort(self) -> None:
+        if self._error is None:
+            self._reader.abort()
+        self._thread.join()
+
+
+class LocalUploadSink:
+    """Streams chunks to the local fallback directory."""
+
+    def __init__(self, dataset_id: str, filename: str):
+        self.filename = filename
+        self.path = _local_dir(LOCAL_UPLOAD_DIR) / f"{dataset_id}-{_safe_name(filename)}"
+        self._fh = open(self.path, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._fh.write(chunk)
+
+    def close(self, content_hash: Optional[str] = None) -> str:
+        self._fh.close()
+        if not content_hash:
+            return str(self.path.relative_to(Path.cwd()))
+        target = _local_path("", self.filename, content_hash)
+        if target.exists():
+            self.path.unlink()
+        else:
+            os.replace(self.path, target)
+        return str(target.relative_to(Path.cwd()))
+
+    def abort(self) -> None:
+        self._fh.close()
+        self.path.unlink(missing_ok=True)
+
+
+def open_upload_sink(dataset_id: str, filename: str, max_buffer: int):
+    """
+    Open a streaming sink: MinIO if reachable, otherwise the local fallback.
+    Sinks expose write(chunk), close(content_hash=None) -> storage path, and abort().
+    """
+    try:
+        return MinioUploadSink(dataset_id, filename, max_buffer)
+    except Exception as e:
+        logger.warning("MinIO unavailable for streaming upload: %s. Saving local copy.", e)
+        return LocalUploadSink(dataset_id, filename)
+
+
+class MinioRangeFile(io.RawIOBase):
+    """
+    Seekable, read-only file over a MinIO object. Reads are served from
+    ranged GETs of at least `block_size` bytes, so a Parquet reader that
+    seeks to the footer and then to a few column chunks fetches only those
+    byte ranges, and sequential reads stream block by block.
+    """
+
+    def __init__(self, bucket: str, object_name: str, block_size: Optional[int] = None):
+        super().__init__()
+        self._client = _minio_client(bucket)
+        self.bucket = bucket
+        self.object_name = object_name
+        self.block_size = block_size or settings.STORAGE_READ_BLOCK_SIZE
+        self.size = self._client.stat_object(bucket, object_name).size
+        self._pos = 0
+        self._block = b""
+        self._block_start = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._pos = offset
+        return self._pos
+
+    def _fetch(self, offset: int, length: int) -> bytes:
+        response = self._client.get_object(self.bucket, self.object_name, offset=offset, length=length)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def readinto(self, buffer) -> int:
+        want = min(len(buffer), self.size - self._pos)
+        if want <= 0:
+            return 0
+        end = self._block_start + len(self._block)
+        if not (self._block_start <= self._pos and self._pos + want <= end):
+            self._block_start = self._pos
+            self._block = self._fetch(self._pos, min(max(want, self.block_size), self.size - self._pos))
+        start = self._pos - self._block_start
+        data = self._block[start:start + want]
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+def resolve_local_path(storage_path: str) -> Path:
+    """Local fallback file of a storage path; refuses anything outside storage/."""
+    base = (ROOT / "storage").resolve()
+    path = (ROOT / storage_path).resolve()
+    if not path.is_relative_to(base):
+        raise ValueError(f"Not a local storage path: {storage_path}")
+    return path
+
+
+def open_stored(storage_path: str):
+    """
+    Open a stored upload for reading, lazily: a `minio://bucket/object`
+    path as a ranged-read MinioRangeFile, a local fallback path as a
+    pyarrow memory map (zero-copy). Raises FileNotFoundError if it is gone.
+    """
+    import pyarrow as pa
+
+    if storage_path.startswith("minio://"):
+        from minio.error import S3Error
+
+        bucket, _, object_name = storage_path[len("minio://"):].partition("/")
+        try:
+            return MinioRangeFile(bucket, object_name)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject", "NoSuchBucket"):
+                raise FileNotFoundError(storage_path) from e
+            raise
+    return pa.memory_map(str(resolve_local_path(storage_path)), "r")
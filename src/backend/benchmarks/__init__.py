@@ -0,0 +1 @@
+"""Performance benchmarks (run with PYTHONPATH=src/backend)."""
@@ -0,0 +1,200 @@
+"""
+Lineage traversal benchmark – hop-by-hop table_select vs. recursive CTE vs. closure table vs. in-memory index.
+
+    DATABASE_URL=postgresql://... PYTHONPATH=src/backend python -m benchmarks.bench_lineage --sizes 1000 5000 50000
+
+Everything runs in a scratch schema of that database (dropped afterwards).
+Graphs are layered pipelines: domains of 100 datasets in 5 layers, each
+dataset fed by 1-2 datasets of the previous layer (sometimes also one two
+layers back), and some marts also read another domain's staging data.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+SCHEMA = "lineage_bench"
+
+
+def _use_schema() -> None:
+    # asyncpg passes unknown DSN query parameters on as server settings
+    url = os.environ["DATABASE_URL"]
+    os.environ["DATABASE_URL"] = f"{url}{'&' if '?' in url else '?'}search_path={SCHEMA}"
+
+
+def make_lineage(n: int, seed: int = 0):
+    """(dataset ids, edges as (id, source, target, job_type)) of a layered DAG."""
+    rng = random.Random(seed)
+    ids = [f"ds{i:06d}" for i in range(n)]
+    domain_size, layers = 100, 5
+    per_layer = domain_size // layers
+    edges = []
+    for i in range(n):
+        domain, offset = divmod(i, domain_size)
+        layer = offset // per_layer
+        if layer == 0:
+            continue
+        prev = domain * domain_size + (layer - 1) * per_layer
+        for src in rng.sample(range(prev, prev + per_layer), rng.randint(1, 2)):
+            edges.append((src, i))
+        if layer > 1 and rng.random() < 0.1:  # skip a layer
+            edges.append((prev - per_layer + rng.randrange(per_layer), i))
+        if layer == layers - 1 and domain and rng.random() < 0.1:
+            # a mart reading another domain's staging data
+            other = rng.randrange(domain) * domain_size
+            edges.append((other + per_layer + rng.randrange(per_layer), i))
+    job_types = ["join", "filter", "aggregate", "transform"]
+    return ids, [(f"e{k}", ids[s], ids[t], rng.choice(job_types)) for k, (s, t) in enumerate(edges)]
+
+
+async def hop_by_hop(dataset_id: str) -> dict:
+    """What a client of GET /api/lineage/{id} does: one table_select per dataset reached."""
+    from app.supabase_client import table_select
+
+    depths = {dataset_id: 0}
+    frontier = [dataset_id]
+    while frontier:
+        nxt = []
+        for node in frontier:
+            rows = await table_select("lineage", columns="target_dataset_id", filters=f"source_dataset_id=eq.{node}")
+            for row in rows:
+                target = row["target_dataset_id"]
+                if target not in depths:
+                    depths[target] = depths[node] + 1
+                    nxt.append(target)
+        frontier = nxt
+    del depths[dataset_id]
+    return depths
+
+
+def _summary(samples) -> str:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    return f"median {statistics.median(samples) * 1000:8.2f} ms   p95 {p95 * 1000:8.2f} ms"
+
+
+async def load_schema(ids, edges) -> None:
+    """(Re)create the scratch schema's tables and load a graph into them."""
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateTable, CreateIndex
+    from app.models.dataset import Dataset, Lineage, LineageClosure
+    from app.supabase_client import acquire, execute
+
+    dialect = postgresql.dialect()
+    await execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await execute(f"CREATE SCHEMA {SCHEMA}")
+    for model in (Dataset, Lineage, LineageClosure):
+        await execute(str(CreateTable(model.__table__).compile(dialect=dialect)))
+        for index in model.__table__.indexes:
+            await execute(str(CreateIndex(index).compile(dialect=dialect)))
+
+    async with acquire() as conn:
+        await conn.copy_records_to_table("datasets", records=[(i, i) for i in ids], columns=["id", "name"])
+        await conn.copy_records_to_table(
+            "lineage", records=edges, columns=["id", "source_dataset_id", "target_dataset_id", "job_type"]
+        )
+        await conn.execute("ANALYZE")
+
+
+async def run(size: int, queries: int) -> None:
+    from app.config import get_settings
+    from app.supabase_client import acquire, execute, transaction
+    from app.services import lineage_db
+    from app.services.lineage_graph import LineageGraph, EDGE_COLUMNS
+
+    ids, edges = make_lineage(size)
+    await load_schema(ids, edges)
+
+    print(f"\n== {size:,} datasets, {len(edges):,} edges ==")
+    started = time.perf_counter()
+    closure_rows = await lineage_db.rebuild_closure()
+    print(f"closure rebuild:      {time.perf_counter() - started:8.2f} s   ({closure_rows:,} rows)")
+
+    # incremental maintenance: add then delete extra edges, closure must come back unchanged
+    rng = random.Random(1)
+    extra = []
+    for k in range(50):
+        s = rng.randrange(size - 1)
+        extra.append((f"x{k}", ids[s], ids[min(size - 1, s + rng.randint(1, 40))]))
+    started = time.perf_counter()
+    added = []
+    for edge_id, src, dst in extra:
+        try:
+            async with transaction():
+                await execute(
+                    "INSERT INTO lineage (id, source_dataset_id, target_dataset_id) VALUES ($1, $2, $3)",
+                    edge_id, src, dst,
+                )
+                await lineage_db.closure_add_edge(src, dst)
+            added.append((edge_id, src, dst))
+        except lineage_db.LineageCycleError:
+            pass
+    insert_time = time.perf_counter() - started
+    started = time.perf_counter()
+    for edge_id, src, dst in added:
+        async with transaction():
+            await execute("DELETE FROM lineage WHERE id = $1", edge_id)
+            await lineage_db.closure_remove_edge(src, dst)
+    delete_time = time.perf_counter() - started
+    async with acquire() as conn:
+        after = await conn.fetchval("SELECT COUNT(*) FROM lineage_closure")
+    print(f"closure edge insert:  {insert_time / max(len(added), 1) * 1000:8.2f} ms/edge")
+    print(f"closure edge delete:  {delete_time / max(len(added), 1) * 1000:8.2f} ms/edge   (rows restored: {after == closure_rows})")
+
+    async with acquire() as conn:
+        rows = [dict(r) for r in await conn.fetch(f"SELECT {EDGE_COLUMNS} FROM lineage")]
+    graph = LineageGraph.from_rows(rows)
+
+    # roots in the first layers, where the downstream blast radius is largest
+    roots = [ids[rng.randrange(0, 40) + 100 * rng.randrange(size // 100)] for _ in range(queries)]
+    timings = {"hop-by-hop": [], "recursive CTE": [], "closure table": [], "in-memory index": []}
+    reached, mismatches = [], 0
+    settings = get_settings()
+    for root in roots:
+        t = time.perf_counter()
+        expected = await hop_by_hop(root)
+        timings["hop-by-hop"].append(time.perf_counter() - t)
+        reached.append(len(expected))
+
+        for name, closure in (("recursive CTE", False), ("closure table", True)):
+            settings.LINEAGE_CLOSURE_ENABLED = closure
+            t = time.perf_counter()
+            result = await lineage_db.query_db(root, "downstream")
+            timings[name].append(time.perf_counter() - t)
+            mismatches += {n["dataset_id"]: n["depth"] for n in result["nodes"]} != expected
+
+        t = time.perf_counter()
+        result = graph.query(root, "downstream")
+        timings["in-memory index"].append(time.perf_counter() - t)
+        mismatches += {n["dataset_id"]: n["depth"] for n in result["nodes"]} != expected
+
+    print(f"downstream queries:   {queries} roots, {statistics.mean(reached):.0f} datasets reached on average")
+    for name, samples in timings.items():
+        print(f"  {name:<17} {_summary(samples)}")
+    print(f"mismatched results:   {mismatches}")
+
+
+async def amain(sizes, queries: int) -> None:
+    from app.supabase_client import execute, close_pool
+
+    try:
+        for size in sizes:
+            await run(size, queries)
+    finally:
+        await execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await close_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 50_000])
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+    _use_schema()
+    asyncio.run(amain(args.sizes, args.queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Seeded synthetic data for the benchmark suite – frames with a chosen dtype
+mix, null rate and cardinality, profile pairs for the detectors, and
+layered lineage graphs (see bench_lineage.make_lineage).
+
+Every generator takes a seed; the same arguments give the same data.
+"""
+from typing import Dict, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+# share of float / int / string / bool / datetime columns
+MIXES = {
+    "numeric": {"float": 0.7, "int": 0.3},
+    "mixed": {"float": 0.5, "int": 0.25, "string": 0.15, "bool": 0.05, "datetime": 0.05},
+    "text": {"string": 0.8, "int": 0.2},
+}
+
+
+def _column(rng: np.random.Generator, kind: str, rows: int, null_rate: float, cardinality: int, shift: float = 0.0):
+    nulls = rng.random(rows) < null_rate if null_rate else None
+    if kind == "float":
+        col = rng.normal(shift, 1.0, size=rows)
+        if nulls is not None:
+            col[nulls] = np.nan
+        return col
+    if kind == "int":
+        col = rng.integers(0, cardinality, size=rows) + int(shift * cardinality / 4)
+        if nulls is not None:
+            col = pd.array(col, dtype="Int64")
+            col[nulls] = pd.NA
+        return col
+    if kind == "string":
+        codes = rng.zipf(1.3, size=rows) % cardinality  # a few frequent values, a long tail
+        if shift:
+            codes = (codes + int(shift * 3)) % cardinality
+        col = np.array([f"v{c}" for c in range(cardinality)], dtype=object)[codes]
+        if nulls is not None:
+            col[nulls] = None
+        return col
+    if kind == "bool":
+        col = rng.random(rows) < 0.5 + shift / 10
+        if nulls is not None:
+            col = col.astype(object)
+            col[nulls] = None
+        return col
+    start = np.datetime64("2024-01-01") + np.timedelta64(int(shift * 30), "D")
+    return start + rng.integers(0, 365 * 24 * 3600, size=rows).astype("timedelta64[s]")
+
+
+def make_frame(
+    rows: int,
+    cols: int,
+    mix: str = "mixed",
+    null_rate: float = 0.05,
+    cardinality: int = 1_000,
+    seed: int = 0,
+    shift: float = 0.0,
+) -> pd.DataFrame:
+    """
+    A frame of `rows` x `cols` whose column kinds follow MIXES[mix]. Nulls
+    are spread uniformly at `null_rate`; ints and strings take up to
+    `cardinality` distinct values. `shift` moves every distribution (for
+    drift).
+    """
+    rng = np.random.default_rng(seed)
+    shares = MIXES[mix]
+    kinds = []
+    for kind, share in shares.items():
+        kinds += [kind] * round(share * cols)
+    kinds = (kinds + [next(iter(shares))] * cols)[:cols]
+    rng.shuffle(kinds)
+    return pd.DataFrame({
+        f"{kind[0]}{i}": _column(rng, kind, rows, null_rate if kind != "datetime" else 0.0, cardinality, shift)
+        for i, kind in enumerate(kinds)
+    })
+
+
+def make_profile_pair(
+    rows: int,
+    cols: int,
+    mix: str = "mixed",
+    seed: int = 0,
+    drift: float = 0.3,
+    schema_changes: int = 5,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Profiles (with sketches) of a frame and of a drifted copy: every
+    distribution shifted by `drift` and `schema_changes` columns each
+    dropped, added and retyped.
+    """
+    from app.services.profiler import DatasetProfiler
+
+    before = make_frame(rows, cols, mix=mix, seed=seed)
+    after = make_frame(rows, cols, mix=mix, seed=seed + 1, shift=drift)
+    columns = list(after.columns)
+    for k in range(min(schema_changes, cols // 3)):
+        after = after.drop(columns=columns[k])
+        after[f"added{k}"] = np.arange(rows)
+        retyped = columns[-(k + 1)]
+        after[retyped] = after[retyped].astype(str)
+    return DatasetProfiler.profile(before), DatasetProfiler.profile(after)
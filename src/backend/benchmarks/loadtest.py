@@ -0,0 +1,364 @@
+"""
+Load test – weighted request mixes against `app.main:app`, with per-endpoint
+latency percentiles, throughput and error rates, and event-loop lag.
+
+    # in-process (ASGI transport), 16 virtual users for 60 s
+    DATABASE_URL=postgresql://... PYTHONPATH=src/backend python -m benchmarks.loadtest --users 16 --duration 60
+    # through uvicorn on a local port, in this process
+    ... python -m benchmarks.loadtest --target uvicorn
+    # an already running server (no event-loop lag: it is another process)
+    ... python -m benchmarks.loadtest --url http://127.0.0.1:8000 --no-seed
+    # replay a request log: one {"method", "path", "params"?, "json"?, "name"?} per line
+    ... python -m benchmarks.loadtest --replay requests.log.jsonl
+
+Before the run, --seed-datasets small CSVs are uploaded, chained with
+lineage edges and given issues. In a path or parameter, "{dataset_id}" and
+"{profile_id}" pick a seeded dataset / its profile at random and "{seq}" is
+a per-request counter. Virtual users send requests back to back for
+--duration seconds after --warmup seconds whose samples are dropped.
+
+A "request" fails on a 5xx status or a transport error; 4xx are counted
+apart. Event-loop lag is the overshoot of a --lag-interval sleep. When it
+exceeds --stall-ms, every endpoint with a request in flight is charged with
+the stall: an endpoint that calls pandas or MinIO synchronously on the loop
+shows up with stalls it was present for far more often than its share of
+traffic.
+"""
+import io
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import collections
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+DEFAULT_MIX = [
+    {"name": "datasets.list", "method": "GET", "path": "/api/datasets/", "params": {"limit": 50}, "weight": 12},
+    {"name": "datasets.get", "method": "GET", "path": "/api/datasets/{dataset_id}", "weight": 10},
+    {"name": "datasets.rows", "method": "GET", "path": "/api/datasets/{dataset_id}/rows", "params": {"limit": 200}, "weight": 6},
+    {"name": "profiles.latest", "method": "GET", "path": "/api/profiles/{dataset_id}/latest", "weight": 12},
+    {"name": "profiles.drift", "method": "GET", "path": "/api/profiles/{dataset_id}/drift",
+     "params": {"baseline_profile_id": "{profile_id}"}, "weight": 5},
+    {"name": "issues.list", "method": "GET", "path": "/api/issues/", "params": {"limit": 50}, "weight": 12},
+    {"name": "issues.dataset", "method": "GET", "path": "/api/issues/dataset/{dataset_id}", "weight": 8},
+    {"name": "lineage.direct", "method": "GET", "path": "/api/lineage/{dataset_id}", "weight": 8},
+    {"name": "lineage.graph", "method": "GET", "path": "/api/lineage/{dataset_id}/graph", "weight": 8},
+    {"name": "diagnosis", "method": "GET", "path": "/api/diagnosis/{dataset_id}", "weight": 3},
+    {"name": "datasets.upload", "method": "POST", "path": "/api/datasets/upload", "upload": {"rows": 20_000, "cols": 12}, "weight": 4},
+    {"name": "datasets.upload_async", "method": "POST", "path": "/api/datasets/upload/async", "upload": {"rows": 20_000, "cols": 12}, "weight": 2},
+]
+
+
+def _csv(rows: int, cols: int, seed: int) -> bytes:
+    from benchmarks.datagen import make_frame
+
+    buffer = io.StringIO()
+    make_frame(rows, cols, mix="mixed", seed=seed).to_csv(buffer, index=False)
+    return buffer.getvalue().encode()
+
+
+def load_replay(path: Path) -> List[Dict[str, Any]]:
+    """A request log as a mix: each distinct (name, method, path) weighted by how often it occurs."""
+    counts: Dict[tuple, Dict[str, Any]] = {}
+    for line in path.read_text().splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        method = entry.get("method", "GET").upper()
+        name = entry.get("name") or f"{method} {entry['path']}"
+        key = (name, method, entry["path"], json.dumps(entry.get("params"), sort_keys=True))
+        if key in counts:
+            counts[key]["weight"] += 1
+        else:
+            counts[key] = {"name": name, "method": method, "path": entry["path"], "params": entry.get("params"),
+                           "json": entry.get("json"), "upload": entry.get("upload"), "weight": 1}
+    return list(counts.values())
+
+
+class Recorder:
+    """Latency samples, statuses, and in-flight requests per endpoint."""
+
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = collections.defaultdict(list)
+        self.status: Dict[str, collections.Counter] = collections.defaultdict(collections.Counter)
+        self.in_flight: collections.Counter = collections.Counter()
+        self.stalls: collections.Counter = collections.Counter()
+        self.stall_ms: collections.Counter = collections.Counter()
+        self.lag: List[float] = []
+        self.recording = False
+
+    def record(self, name: str, seconds: float, status: str) -> None:
+        if self.recording:
+            self.latency[name].append(seconds)
+            self.status[name][status] += 1
+
+    def stall(self, lag: float) -> None:
+        if self.recording:
+            for name, n in self.in_flight.items():
+                if n:
+                    self.stalls[name] += 1
+                    self.stall_ms[name] += lag * 1000
+
+
+async def monitor_lag(recorder: Recorder, interval: float, stall: float, stop: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - started - interval, 0.0)
+        if recorder.recording:
+            recorder.lag.append(lag)
+        if lag >= stall:
+            recorder.stall(lag)
+
+
+class LoadTest:
+    def __init__(self, client, mix: List[Dict[str, Any]], seed: int):
+        self.client = client
+        self.mix = mix
+        self.weights = [entry.get("weight", 1) for entry in mix]
+        self.seed = seed
+        self.dataset_ids: List[str] = []
+        self.profile_ids: List[str] = []
+        self.uploads: Dict[tuple, bytes] = {}
+        self.seq = 0
+        self.recorder = Recorder()
+
+    def _upload_body(self, spec: Dict[str, Any]) -> bytes:
+        key = (spec.get("rows", 10_000), spec.get("cols", 10))
+        if key not in self.uploads:
+            self.uploads[key] = _csv(*key, seed=self.seed)
+        # a unique last row, so upload dedup does not turn the upload into a lookup
+        first_line = self.uploads[key].split(b"\n", 1)[0]
+        return self.uploads[key] + f"{self.seq}".encode() + b"," * first_line.count(b",") + b"\n"
+
+    async def seed_data(self, datasets: int) -> None:
+        """Upload `datasets` CSVs, chain them with lineage and add issues."""
+        for i in range(datasets):
+            files = {"file": (f"seed_{i}.csv", _csv(2_000, 12, seed=self.seed + i), "text/csv")}
+            response = await self.client.post("/api/datasets/upload", files=files, params={"name": f"seed_{i}"})
+            response.raise_for_status()
+            self.dataset_ids.append(response.json()["id"])
+        await self._profiles()
+        edges = [
+            {"source_dataset_id": a, "target_dataset_id": b, "job_name": "loadtest", "job_type": "transform"}
+            for a, b in zip(self.dataset_ids, self.dataset_ids[1:])
+        ]
+        if edges:
+            (await self.client.post("/api/lineage/bulk", json=edges)).raise_for_status()
+        issues = [
+            {"dataset_id": d, "issue_type": "null_spike", "severity": "medium", "description": "load test"}
+            for d in self.dataset_ids
+        ]
+        if issues:
+            (await self.client.post("/api/issues/bulk", json=issues)).raise_for_status()
+
+    async def existing_datasets(self) -> None:
+        response = await self.client.get("/api/datasets/", params={"limit": 100, "fields": "id"})
+        response.raise_for_status()
+        self.dataset_ids = [row["id"] for row in response.json()]
+        await self._profiles()
+
+    async def _profiles(self) -> None:
+        for dataset_id in self.dataset_ids:
+            response = await self.client.get(f"/api/profiles/{dataset_id}/latest")
+            if response.status_code == 200:
+                self.profile_ids.append(response.json()["id"])
+
+    async def one(self, rng: random.Random) -> None:
+        entry = rng.choices(self.mix, weights=self.weights)[0]
+        self.seq += 1
+        values = {
+            "dataset_id": rng.choice(self.dataset_ids) if self.dataset_ids else "none",
+            "profile_id": rng.choice(self.profile_ids) if self.profile_ids else "none",
+            "seq": self.seq,
+        }
+        path = entry["path"].format(**values)
+        kwargs: Dict[str, Any] = {}
+        if entry.get("params"):
+            kwargs["params"] = {
+                key: value.format(**values) if isinstance(value, str) else value
+                for key, value in entry["params"].items()
+            }
+        if entry.get("json") is not None:
+            kwargs["json"] = entry["json"]
+        if entry.get("upload"):
+            kwargs["files"] = {"file": (f"load_{self.seq}.csv", self._upload_body(entry["upload"]), "text/csv")}
+        name = entry["name"]
+        self.recorder.in_flight[name] += 1
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(entry["method"], path, **kwargs)
+            status = f"{response.status_code // 100}xx"
+        except Exception as e:
+            status = f"error:{type(e).__name__}"
+        finally:
+            self.recorder.in_flight[name] -= 1
+        self.recorder.record(name, time.perf_counter() - started, status)
+
+    async def user(self, index: int, deadline: float) -> None:
+        rng = random.Random(self.seed * 1_000 + index)
+        while time.perf_counter() < deadline:
+            await self.one(rng)
+
+    async def run(self, users: int, duration: float, warmup: float, lag_interval: float, stall: float) -> float:
+        stop = asyncio.Event()
+        monitor = asyncio.create_task(monitor_lag(self.recorder, lag_interval, stall, stop))
+        started = time.perf_counter()
+        deadline = started + warmup + duration
+        tasks = [asyncio.create_task(self.user(i, deadline)) for i in range(users)]
+        await asyncio.sleep(warmup)
+        self.recorder.recording = True
+        measured = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - measured
+        self.recorder.recording = False
+        stop.set()
+        await monitor
+        return elapsed
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99), "max_ms": max(samples) * 1000}
+
+
+def report(recorder: Recorder, elapsed: float, lag_measured: bool) -> Dict[str, Any]:
+    endpoints = {}
+    all_samples = []
+    for name in sorted(recorder.latency, key=lambda n: -len(recorder.latency[n])):
+        samples = recorder.latency[name]
+        statuses = recorder.status[name]
+        count = len(samples)
+        failed = sum(n for status, n in statuses.items() if status == "5xx" or status.startswith("error"))
+        endpoints[name] = {
+            "requests": count,
+            "rps": count / elapsed,
+            "error_rate": failed / count,
+            "client_error_rate": statuses["4xx"] / count,
+            **_percentiles(samples),
+            "statuses": dict(statuses),
+            "loop_stalls": recorder.stalls[name],
+            "loop_stall_ms": recorder.stall_ms[name],
+        }
+        all_samples += samples
+    total = sum(e["requests"] for e in endpoints.values())
+    result = {
+        "seconds": elapsed,
+        "requests": total,
+        "rps": total / elapsed if elapsed else 0.0,
+        "error_rate": sum(e["error_rate"] * e["requests"] for e in endpoints.values()) / total if total else 0.0,
+        **_percentiles(all_samples),
+        "endpoints": endpoints,
+    }
+    if lag_measured:
+        result["event_loop_lag"] = {**_percentiles(recorder.lag), "samples": len(recorder.lag)}
+    return result
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    w = max([24] + [len(name) + 2 for name in result["endpoints"]])
+    print(f"\n{'endpoint':<{w}}{'reqs':>7}{'rps':>8}{'err%':>7}{'4xx%':>7}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'stalls':>8}{'stall ms':>10}")
+    for name, e in result["endpoints"].items():
+        print(f"{name:<{w}}{e['requests']:>7}{e['rps']:>8.1f}{e['error_rate'] * 100:>7.1f}"
+              f"{e['client_error_rate'] * 100:>7.1f}{e['p50_ms']:>10.1f}{e['p95_ms']:>10.1f}{e['p99_ms']:>10.1f}"
+              f"{e['loop_stalls']:>8}{e['loop_stall_ms']:>10.0f}")
+    print(f"{'total':<{w}}{result['requests']:>7}{result['rps']:>8.1f}{result['error_rate'] * 100:>7.1f}"
+          f"{'':>7}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}")
+    lag = result.get("event_loop_lag")
+    if lag:
+        print(f"\nevent-loop lag: p50 {lag['p50_ms']:.1f} ms, p95 {lag['p95_ms']:.1f} ms, "
+              f"p99 {lag['p99_ms']:.1f} ms, max {lag['max_ms']:.1f} ms ({lag['samples']} samples)")
+
+
+async def amain(args) -> Dict[str, Any]:
+    import httpx
+
+    mix = DEFAULT_MIX
+    if args.replay:
+        mix = load_replay(args.replay)
+    elif args.mix:
+        mix = json.loads(args.mix.read_text())
+
+    timeout = httpx.Timeout(args.timeout)
+    server = serve_task = lifespan = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=timeout)
+    else:
+        from app.main import app
+
+        if args.target == "uvicorn":
+            import uvicorn
+
+            server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+            serve_task = asyncio.create_task(server.serve())
+            while not server.started:
+                if serve_task.done():
+                    serve_task.result()
+                await asyncio.sleep(0.05)
+            client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=timeout,
+                                       limits=httpx.Limits(max_connections=args.users))
+        else:
+            lifespan = app.router.lifespan_context(app)
+            await lifespan.__aenter__()
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=timeout)
+
+    try:
+        test = LoadTest(client, mix, args.seed)
+        if args.seed_datasets:
+            started = time.perf_counter()
+            await test.seed_data(args.seed_datasets)
+            print(f"seeded {len(test.dataset_ids)} datasets in {time.perf_counter() - started:.1f}s")
+        else:
+            await test.existing_datasets()
+        print(f"{args.users} users, {args.duration:.0f}s (+{args.warmup:.0f}s warmup), "
+              f"{len(mix)} request kinds, {'in-process ASGI' if not args.url and args.target == 'asgi' else args.url or 'uvicorn'}")
+        elapsed = await test.run(args.users, args.duration, args.warmup, args.lag_interval / 1000, args.stall_ms / 1000)
+        return report(test.recorder, elapsed, lag_measured=not args.url)
+    finally:
+        await client.aclose()
+        if server is not None:
+            server.should_exit = True
+            await serve_task
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi", help="how to reach the in-process app")
+    parser.add_argument("--url", help="load an already running server instead")
+    parser.add_argument("--port", type=int, default=8765, help="port for --target uvicorn")
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds before measuring")
+    parser.add_argument("--mix", type=Path, help="JSON list of {name, method, path, weight, params?, json?, upload?}")
+    parser.add_argument("--replay", type=Path, help="JSONL request log to replay as a weighted mix")
+    parser.add_argument("--seed-datasets", type=int, default=10, help="datasets uploaded before the run (0: use existing)")
+    parser.add_argument("--no-seed", dest="seed_datasets", action="store_const", const=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--lag-interval", type=float, default=10.0, help="event-loop probe interval (ms)")
+    parser.add_argument("--stall-ms", type=float, default=50.0, help="lag that counts as a stall (ms)")
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="exit with status 1 above this error rate")
+    args = parser.parse_args()
+
+    result = asyncio.run(amain(args))
+    print_report(result)
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
+    if result["error_rate"] > args.max_error_rate:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
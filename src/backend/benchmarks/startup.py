@@ -0,0 +1,161 @@
+"""
+Startup benchmark – how long `import app.main` takes (from `python -X
+importtime`) and how long a fresh uvicorn process takes to answer its first
+request (time to first request, what a scaled-to-zero deployment's first
+user waits for).
+
+    PYTHONPATH=src/backend python -m benchmarks.startup
+    DATABASE_URL=postgresql://... PYTHONPATH=src/backend python -m benchmarks.startup --first-request --fast
+
+Every sample is a new interpreter, so nothing is cached in-process (the
+OS page cache still is: the first sample of a run is usually the slowest).
+The import breakdown lists the slowest imports by self and by cumulative
+time. Time to first request runs the app's startup hook, so it needs a
+reachable DATABASE_URL; the suite runs it only with --db.
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import subprocess
+import tempfile
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+BACKEND = Path(__file__).resolve().parent.parent
+# importing the app needs settings, not a database
+OFFLINE_DATABASE_URL = "postgresql://offline@127.0.0.1:1/benchmarks"
+
+
+def _env(extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", OFFLINE_DATABASE_URL)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(BACKEND), env.get("PYTHONPATH")]))
+    env.update(extra or {})
+    return env
+
+
+def import_profile(module: str = "app.main", env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Import `module` in a fresh interpreter under -X importtime.
+
+    Returns:
+        {"seconds": cumulative import time of `module`,
+         "imports": [{"name", "self_us", "cumulative_us", "depth"}, ...] in import order}
+    """
+    with tempfile.TemporaryDirectory() as cwd:  # the app may create logs/ and storage/ in its cwd
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=cwd, env=_env(env), capture_output=True, text=True,
+        )
+    if proc.returncode:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append({
+            "name": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+        })
+    total = next(entry["cumulative_us"] for entry in imports if entry["name"] == module)
+    return {"seconds": total / 1e6, "imports": imports}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_request_seconds(
+    path: str = "/health",
+    env: Optional[Dict[str, str]] = None,
+    timeout: float = 60.0,
+) -> float:
+    """Seconds from starting `uvicorn app.main:app` to the first 200 answer to GET `path`."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    with tempfile.TemporaryDirectory() as cwd, open(Path(cwd) / "server.log", "w+b") as log:
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=cwd, env=_env(env), stdout=log, stderr=subprocess.STDOUT,
+        )
+        try:
+            while True:
+                if proc.poll() is not None:
+                    log.seek(0)
+                    raise RuntimeError(f"uvicorn exited with {proc.returncode}:\n{log.read().decode()[-2000:]}")
+                try:
+                    with urllib.request.urlopen(url, timeout=1.0) as response:
+                        if response.status == 200:
+                            return time.perf_counter() - started
+                except OSError:
+                    pass
+                if time.perf_counter() - started > timeout:
+                    raise TimeoutError(f"no answer from {url} within {timeout:.0f}s")
+                time.sleep(0.005)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def _below(imports: List[Dict[str, Any]], module: str, levels: int) -> List[Dict[str, Any]]:
+    """Imports up to `levels` levels below `module` (-X importtime lists children before their parent)."""
+    end = next(i for i, entry in enumerate(imports) if entry["name"] == module)
+    depth = imports[end]["depth"]
+    start = end
+    while start > 0 and imports[start - 1]["depth"] > depth:
+        start -= 1
+    return [entry for entry in imports[start:end] if entry["depth"] <= depth + levels]
+
+
+def _slowest(imports: List[Dict[str, Any]], key: str, top: int) -> List[Dict[str, Any]]:
+    return sorted(imports, key=lambda entry: entry[key], reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="app.main", help="module to import (default app.main)")
+    parser.add_argument("--repeat", type=int, default=5, help="samples of each measurement")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--first-request", action="store_true", help="also time uvicorn to first request (needs DATABASE_URL)")
+    parser.add_argument("--path", default="/health", help="path of the first request")
+    parser.add_argument("--fast", action="store_true", help="start with FAST_STARTUP=true")
+    args = parser.parse_args()
+    if args.first_request and not os.environ.get("DATABASE_URL"):
+        parser.error("--first-request needs DATABASE_URL")
+
+    env = {"FAST_STARTUP": "true"} if args.fast else {}
+    profiles = [import_profile(args.module, env) for _ in range(args.repeat)]
+    seconds = np.array([profile["seconds"] for profile in profiles]) * 1000
+    print(f"import {args.module}: p50 {np.median(seconds):.1f} ms  min {seconds.min():.1f}  max {seconds.max():.1f}"
+          f"  ({len(profiles[-1]['imports'])} modules)")
+
+    imports = profiles[-1]["imports"]  # the warmest sample
+    print(f"\nslowest imports by cumulative time (top {args.top}, at most 2 levels below {args.module}):")
+    for entry in _slowest(_below(imports, args.module, 2), "cumulative_us", args.top):
+        print(f"  {entry['cumulative_us'] / 1000:8.1f} ms  {entry['name']}")
+    print(f"\nslowest imports by self time (top {args.top}):")
+    for entry in _slowest(imports, "self_us", args.top):
+        print(f"  {entry['self_us'] / 1000:8.1f} ms  {entry['name']}")
+
+    if args.first_request:
+        samples = np.array([first_request_seconds(args.path, env) for _ in range(args.repeat)]) * 1000
+        print(f"\ntime to first request (GET {args.path}): p50 {np.median(samples):.0f} ms"
+              f"  min {samples.min():.0f}  max {samples.max():.0f}")
+
+
+if __name__ == "__main__":
+    main()
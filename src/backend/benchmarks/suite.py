@@ -0,0 +1,347 @@
+"""
+Benchmark suite – profiler, detectors and lineage queries on seeded synthetic
+data, compared against a saved JSON baseline.
+
+    PYTHONPATH=src/backend python -m benchmarks.suite --quick
+    PYTHONPATH=src/backend python -m benchmarks.suite --save-baseline
+    DATABASE_URL=postgresql://... PYTHONPATH=src/backend python -m benchmarks.suite --db
+
+Each case runs in a fresh process, so its peak RSS is its own (data
+generation included; `setup_rss_mb` is the peak before timing started). A
+case reports latency percentiles over its samples and throughput (units per
+second at the median latency). A case regresses when its median latency
+grows by more than --threshold or its peak RSS by more than --rss-threshold
+relative to the baseline; any regression makes the run exit with status 1.
+
+Without --db nothing touches the network: lineage queries run on the
+in-memory index. With --db they also run as recursive CTE and closure-table
+queries in a scratch schema of DATABASE_URL (dropped afterwards), and
+startup/first-request times a fresh uvicorn process against it (see
+benchmarks/startup.py; startup/import needs no database).
+"""
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+BASELINE = Path(__file__).parent / "baselines" / "local.json"
+# settings need a DATABASE_URL even where nothing connects (no pool is opened offline)
+OFFLINE_DATABASE_URL = "postgresql://offline@127.0.0.1:1/benchmarks"
+
+
+# --- cases (run in the child process) ---
+
+def _time(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def case_profile(rows: int, cols: int, mix: str, null_rate: float, cardinality: int, repeat: int) -> Dict[str, Any]:
+    from benchmarks.datagen import make_frame
+    from app.services.profiler import DatasetProfiler
+
+    df = make_frame(rows, cols, mix=mix, null_rate=null_rate, cardinality=cardinality)
+    return {"samples": _time(lambda: DatasetProfiler.profile(df), repeat), "units": rows, "unit": "rows"}
+
+
+def case_schema(cols: int, repeat: int) -> Dict[str, Any]:
+    from benchmarks.datagen import make_profile_pair
+    from app.services.detectors import SchemaDetector
+
+    before, after = make_profile_pair(500, cols, schema_changes=max(cols // 20, 1))
+    return {"samples": _time(lambda: SchemaDetector.detect(before, after), repeat), "units": cols, "unit": "columns"}
+
+
+def case_drift(cols: int, kind: str, repeat: int) -> Dict[str, Any]:
+    from benchmarks.datagen import make_profile_pair
+    from app.services.detectors import DriftDetector
+
+    before, after = make_profile_pair(20_000, cols, mix="mixed")
+    score = {
+        "numeric": DriftDetector.score,
+        "categorical": DriftDetector.score_categorical,
+        "semantic": DriftDetector.score_semantic,
+    }[kind]
+    scored = len(score(before, after))
+    return {"samples": _time(lambda: score(before, after), repeat), "units": scored, "unit": "columns"}
+
+
+def case_embed(values: int, repeat: int) -> Dict[str, Any]:
+    from app.services.semantic import HashingEmbedder
+
+    rng = random.Random(0)
+    words = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+    texts = [f"{rng.choice(words)} {rng.choice(words)} {rng.randrange(10**6)}" for _ in range(values)]
+    embedder = HashingEmbedder()  # uncached: the cost of embedding values never seen before
+
+    def run():
+        for start in range(0, values, 512):  # SEMANTIC_BATCH_SIZE
+            embedder.embed(texts[start:start + 512])
+
+    return {"samples": _time(run, repeat), "units": values, "unit": "values"}
+
+
+def _roots(ids: List[str], queries: int) -> List[str]:
+    rng = random.Random(1)
+    # roots in a domain's first layers, where the downstream blast radius is largest
+    return [ids[rng.randrange(0, 40) + 100 * rng.randrange(len(ids) // 100)] for _ in range(queries)]
+
+
+def case_lineage_memory(size: int, queries: int) -> Dict[str, Any]:
+    from benchmarks.bench_lineage import make_lineage
+    from app.services.lineage_graph import LineageGraph
+
+    ids, edges = make_lineage(size)
+    rows = [
+        {"id": e, "source_dataset_id": s, "target_dataset_id": t, "job_type": j, "job_name": None, "confidence": 1.0}
+        for e, s, t, j in edges
+    ]
+    started = time.perf_counter()
+    graph = LineageGraph.from_rows(rows)
+    build = time.perf_counter() - started
+    samples = []
+    for root in _roots(ids, queries):
+        for direction in ("downstream", "upstream"):
+            started = time.perf_counter()
+            graph.query(root, direction)
+            samples.append(time.perf_counter() - started)
+    return {"samples": samples, "units": 1, "unit": "queries", "extra": {"edges": len(edges), "build_ms": build * 1000}}
+
+
+def case_lineage_db(size: int, queries: int, closure: bool) -> Dict[str, Any]:
+    import asyncio
+    from benchmarks import bench_lineage
+
+    async def run():
+        from app.config import get_settings
+        from app.supabase_client import execute, close_pool
+        from app.services import lineage_db
+
+        ids, edges = bench_lineage.make_lineage(size)
+        try:
+            await bench_lineage.load_schema(ids, edges)
+            get_settings().LINEAGE_CLOSURE_ENABLED = closure
+            if closure:
+                await lineage_db.rebuild_closure()
+            samples = []
+            for root in _roots(ids, queries):
+                for direction in ("downstream", "upstream"):
+                    started = time.perf_counter()
+                    await lineage_db.query_db(root, direction)
+                    samples.append(time.perf_counter() - started)
+            return samples
+        finally:
+            await execute(f"DROP SCHEMA IF EXISTS {bench_lineage.SCHEMA} CASCADE")
+            await close_pool()
+
+    bench_lineage._use_schema()
+    return {"samples": asyncio.run(run()), "units": 1, "unit": "queries"}
+
+
+def case_startup_import(repeat: int) -> Dict[str, Any]:
+    from benchmarks.startup import import_profile
+
+    samples = [import_profile()["seconds"] for _ in range(repeat)]
+    return {"samples": samples, "units": 1, "unit": "imports"}
+
+
+def case_startup_first_request(repeat: int, fast: bool) -> Dict[str, Any]:
+    from benchmarks.startup import first_request_seconds
+
+    env = {"FAST_STARTUP": "true" if fast else "false"}
+    return {"samples": [first_request_seconds(env=env) for _ in range(repeat)], "units": 1, "unit": "starts"}
+
+
+CASE_FUNCTIONS = {
+    "profile": case_profile,
+    "schema": case_schema,
+    "drift": case_drift,
+    "embed": case_embed,
+    "lineage_memory": case_lineage_memory,
+    "lineage_db": case_lineage_db,
+    "startup_import": case_startup_import,
+    "startup_first_request": case_startup_first_request,
+}
+# cases that use DATABASE_URL (the others run with OFFLINE_DATABASE_URL)
+DB_CASES = {"lineage_db", "startup_first_request"}
+
+
+def cases(quick: bool = False, db: bool = False) -> List[Dict[str, Any]]:
+    """(name, function, parameters) of every case; --quick shrinks the data ~10x."""
+    scale, repeat = (10, 3) if quick else (1, 5)
+    profile_shapes = [
+        # name, rows, cols, mix, null_rate, cardinality
+        ("numeric", 200_000, 20, "numeric", 0.05, 1_000),
+        ("mixed", 100_000, 60, "mixed", 0.05, 1_000),
+        ("wide", 20_000, 400, "mixed", 0.05, 1_000),
+        ("sparse", 100_000, 60, "mixed", 0.6, 1_000),
+        ("high_cardinality", 100_000, 20, "text", 0.05, 100_000),
+    ]
+    found = []
+    for label, rows, cols, mix, null_rate, cardinality in profile_shapes:
+        found.append({
+            "name": f"profile/{label}/{rows // scale}x{cols}",
+            "fn": "profile",
+            "params": {"rows": rows // scale, "cols": cols, "mix": mix, "null_rate": null_rate,
+                       "cardinality": cardinality, "repeat": repeat},
+        })
+    for cols in (50, 1_000):
+        found.append({"name": f"schema/{cols}cols", "fn": "schema", "params": {"cols": cols, "repeat": 1_000 // scale}})
+    for kind in ("numeric", "categorical", "semantic"):
+        found.append({"name": f"drift/{kind}/100cols", "fn": "drift", "params": {"cols": 100, "kind": kind, "repeat": 100 // scale}})
+    found.append({"name": f"semantic/embed/{100_000 // scale}", "fn": "embed", "params": {"values": 100_000 // scale, "repeat": repeat}})
+    queries = 10 if quick else 50
+    for size in (1_000, 5_000, 50_000):
+        found.append({"name": f"lineage/memory/{size}", "fn": "lineage_memory", "params": {"size": size, "queries": queries}})
+        if db:
+            for closure in (False, True):
+                mode = "closure" if closure else "cte"
+                found.append({"name": f"lineage/db-{mode}/{size}", "fn": "lineage_db",
+                              "params": {"size": size, "queries": queries, "closure": closure}})
+    found.append({"name": "startup/import", "fn": "startup_import", "params": {"repeat": repeat}})
+    if db:
+        for fast in (False, True):
+            found.append({"name": f"startup/first-request{'-fast' if fast else ''}", "fn": "startup_first_request",
+                          "params": {"repeat": repeat, "fast": fast}})
+    return found
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def run_case(fn: str, params: Dict[str, Any], offline: bool) -> Dict[str, Any]:
+    """Run one case and summarize it. Runs in a fresh worker process."""
+    if offline:
+        os.environ["DATABASE_URL"] = OFFLINE_DATABASE_URL
+    setup_rss = _peak_rss_mb()
+    result = CASE_FUNCTIONS[fn](**params)
+    samples = np.asarray(result["samples"])
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "samples": len(samples),
+        "p50_ms": p50 * 1000,
+        "p95_ms": p95 * 1000,
+        "p99_ms": p99 * 1000,
+        "mean_ms": float(samples.mean()) * 1000,
+        "throughput": result["units"] / p50 if p50 else None,
+        "unit": f"{result['unit']}/s",
+        "setup_rss_mb": setup_rss,
+        "peak_rss_mb": _peak_rss_mb(),
+        **result.get("extra", {}),
+    }
+
+
+# --- runner ---
+
+def _meta(quick: bool) -> Dict[str, Any]:
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "quick": quick,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float, rss_threshold: float) -> List[str]:
+    """Regressions of `results` against `baseline` (cases missing from either are ignored)."""
+    regressions = []
+    for name, now in results.items():
+        then = baseline.get(name)
+        if not then:
+            continue
+        if now["p50_ms"] > then["p50_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: median {then['p50_ms']:.3f} -> {now['p50_ms']:.3f} ms "
+                f"(+{now['p50_ms'] / then['p50_ms'] - 1:.0%})"
+            )
+        if now["peak_rss_mb"] > then["peak_rss_mb"] * (1 + rss_threshold):
+            regressions.append(
+                f"{name}: peak RSS {then['peak_rss_mb']:.0f} -> {now['peak_rss_mb']:.0f} MB "
+                f"(+{now['peak_rss_mb'] / then['peak_rss_mb'] - 1:.0%})"
+            )
+    return regressions
+
+
+def _print_row(name: str, result: Dict[str, Any], then: Optional[Dict[str, Any]]) -> None:
+    change = f"{result['p50_ms'] / then['p50_ms'] - 1:+7.1%}" if then else "       "
+    throughput = f"{result['throughput']:>12,.0f} {result['unit']}" if result["throughput"] else ""
+    print(
+        f"{name:<34} p50 {result['p50_ms']:9.3f} ms {change}  p95 {result['p95_ms']:9.3f}  "
+        f"p99 {result['p99_ms']:9.3f}  rss {result['peak_rss_mb']:6.0f} MB  {throughput}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quick", action="store_true", help="~10x smaller data (CI smoke run)")
+    parser.add_argument("--db", action="store_true", help="also run lineage queries against DATABASE_URL")
+    parser.add_argument("--only", nargs="+", metavar="PREFIX", help="run cases whose name starts with one of these")
+    parser.add_argument("--baseline", type=Path, default=BASELINE, help=f"baseline JSON (default {BASELINE})")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run's results as the baseline")
+    parser.add_argument("--output", type=Path, help="also write this run's results here")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed median latency increase (0.15 = 15%%)")
+    parser.add_argument("--rss-threshold", type=float, default=0.20, help="allowed peak RSS increase")
+    args = parser.parse_args()
+
+    if args.db and not os.environ.get("DATABASE_URL"):
+        parser.error("--db needs DATABASE_URL")
+    selected = [
+        case for case in cases(args.quick, args.db)
+        if not args.only or any(case["name"].startswith(prefix) for prefix in args.only)
+    ]
+    baseline = {}
+    if args.baseline.is_file():
+        baseline = json.loads(args.baseline.read_text()).get("results", {})
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for case in selected:
+        offline = case["fn"] not in DB_CASES
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[case["name"]] = pool.submit(run_case, case["fn"], case["params"], offline).result()
+        _print_row(case["name"], results[case["name"]], baseline.get(case["name"]))
+
+    report = {"meta": _meta(args.quick), "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"baseline saved to {args.baseline}")
+        return
+
+    if not baseline:
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    regressions = compare(results, baseline, args.threshold, args.rss_threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        sys.exit(1)
+    print(f"no regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Shared test setup. Settings require a DATABASE_URL even where nothing
+connects; the tests here only exercise in-process code.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/lineage_auditor_test")
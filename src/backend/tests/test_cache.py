@@ -0,0 +1,151 @@
+"""The response cache: invalidation generations, eviction, TTL and ETags."""
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app.services import cache as cache_module
+from app.services.cache import ResponseCache, _not_modified, cached_json
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+
+def _put(cache: ResponseCache, key: str, body: bytes, tags=("d1",)) -> bool:
+    return cache.put(key, body, f'"{key}"', tags, cache.generation(tags))
+
+
+def _request(path: str = "/api/profiles/d1/latest", query: str = "", if_none_match=None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({
+        "type": "http", "method": "GET", "path": path, "query_string": query.encode(), "headers": headers,
+    })
+
+
+def test_invalidation_during_a_slow_read_is_not_recached():
+    cache = ResponseCache(max_entries=10, max_bytes=1000, ttl=60)
+    generation = cache.generation(("d1",))
+    cache.invalidate(["d1"])  # a write commits while the read is building its body
+    assert not cache.put("k", b"stale", '"e"', ("d1",), generation)
+    assert cache.get("k") is None
+
+    # other datasets' writes do not block it
+    generation = cache.generation(("d1",))
+    cache.invalidate(["d2"])
+    assert cache.put("k", b"fresh", '"e"', ("d1",), generation)
+    assert cache.get("k") == (b"fresh", '"e"')
+
+
+def test_clear_during_a_read_is_not_recached():
+    cache = ResponseCache(max_entries=10, max_bytes=1000, ttl=60)
+    generation = cache.generation(("d1",))
+    cache.clear()
+    assert not cache.put("k", b"stale", '"e"', ("d1",), generation)
+
+
+def test_invalidate_drops_tagged_entries():
+    cache = ResponseCache(max_entries=10, max_bytes=1000, ttl=60)
+    _put(cache, "a", b"1", tags=("d1",))
+    _put(cache, "b", b"22", tags=("d1", "d2"))
+    _put(cache, "c", b"333", tags=("d2",))
+    assert cache.invalidate(["d1"]) == 2
+    assert (cache.get("a"), cache.get("b")) == (None, None)
+    assert cache.get("c") == (b"333", '"c"')
+    assert cache.info()["bytes"] == 3
+    assert cache.invalidate(["d2"]) == 1
+    assert (len(cache), cache.info()["bytes"]) == (0, 0)
+
+
+def test_eviction_is_bounded_by_bytes_least_recently_used_first():
+    cache = ResponseCache(max_entries=100, max_bytes=100, ttl=60)
+    for key in "abc":
+        assert _put(cache, key, b"x" * 40)
+    # a (oldest) went to make room for c
+    assert cache.get("a") is None
+    assert cache.info()["bytes"] == 80
+
+    cache.get("b")  # b is now the most recently used
+    _put(cache, "d", b"x" * 40)
+    assert cache.get("c") is None and cache.get("b") is not None
+    assert cache.info()["bytes"] <= 100 and cache.stats["evictions"] == 2
+
+    # a body larger than the whole cache is never stored
+    assert not _put(cache, "big", b"x" * 101)
+    assert cache.get("b") is not None
+
+
+def test_eviction_is_bounded_by_entries():
+    cache = ResponseCache(max_entries=2, max_bytes=1000, ttl=60)
+    for key in "abc":
+        _put(cache, key, b"x")
+    assert len(cache) == 2 and cache.get("a") is None
+
+
+def test_replacing_an_entry_keeps_the_byte_count():
+    cache = ResponseCache(max_entries=10, max_bytes=1000, ttl=60)
+    _put(cache, "a", b"x" * 10)
+    _put(cache, "a", b"x" * 30)
+    assert (len(cache), cache.info()["bytes"]) == (1, 30)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(max_entries=10, max_bytes=1000, ttl=60)
+    _put(cache, "a", b"body")
+    clock.now += 59
+    assert cache.get("a") is not None
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.stats["expirations"] == 1
+    assert (len(cache), cache.info()["bytes"]) == (0, 0)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ('"abc"', True),
+    ('"other"', False),
+    ('"other", "abc"', True),
+    ('"other" ,"abc" ', True),
+    ('W/"abc"', True),
+    ("*", True),
+    (" * ", True),
+    ("abc", False),
+])
+def test_not_modified_parses_if_none_match(header, expected):
+    assert _not_modified(_request(if_none_match=header), '"abc"') is expected
+
+
+def test_cached_json_hits_and_revalidates(monkeypatch):
+    monkeypatch.setattr(cache_module, "_cache", ResponseCache(max_entries=10, max_bytes=10_000, ttl=60))
+    calls = []
+
+    async def build():
+        calls.append(1)
+        return {"id": "d1", "rows": len(calls)}
+
+    def serve(**kwargs):
+        return asyncio.run(cached_json(_request(query="fields=id", **kwargs), ["d1"], build))
+
+    first = serve()
+    assert (first.headers["X-Cache"], first.body) == ("MISS", b'{"id":"d1","rows":1}')
+    second = serve()
+    assert (second.headers["X-Cache"], second.body, len(calls)) == ("HIT", first.body, 1)
+
+    unchanged = serve(if_none_match=first.headers["ETag"])
+    assert (unchanged.status_code, unchanged.body) == (304, b"")
+
+    asyncio.run(cache_module.invalidate("d1"))
+    third = serve(if_none_match=first.headers["ETag"])
+    assert (third.status_code, third.headers["X-Cache"], len(calls)) == (200, "MISS", 2)
+    assert third.headers["ETag"] != first.headers["ETag"]
@@ -0,0 +1,38 @@
+"""Semantic drift scores of merged profiles against a single pass."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.drift import DriftEngine
+from app.services.profiler import DatasetProfiler
+
+CITIES = ["Berlin", "Paris", "Rome", "Oslo", "Lima", "Kyoto"]
+
+
+def _cities(rows: int, weights, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"city": rng.choice(CITIES, size=rows, p=weights)})
+
+
+def _chunked(df: pd.DataFrame, rows: int) -> dict:
+    return DatasetProfiler.merge(DatasetProfiler.profile(df.iloc[start:start + rows]) for start in range(0, len(df), rows))
+
+
+def test_semantic_summary_does_not_depend_on_chunking():
+    df = _cities(100_000, None, seed=1)
+    whole = DatasetProfiler.profile(df)
+    merged = _chunked(df, 1_000)
+
+    same = DriftEngine.compare_semantic(whole, merged)["city"]
+    assert same["values"] == {"before": len(CITIES), "after": len(CITIES)}
+    assert not same["is_drift"]
+    assert same["p_value"] == pytest.approx(1.0)
+
+    # a reweighted mix scores the same against either profile
+    baseline = DatasetProfiler.profile(_cities(100_000, [0.5, 0.1, 0.1, 0.1, 0.1, 0.1], seed=2))
+    expected = DriftEngine.compare_semantic(baseline, whole)["city"]
+    got = DriftEngine.compare_semantic(baseline, merged)["city"]
+    assert got["values"] == expected["values"]
+    assert got["is_drift"] == expected["is_drift"]
+    for key in ("cosine_distance", "centroid_shift", "t2_statistic", "p_value"):
+        assert got[key] == pytest.approx(expected[key], rel=1e-6, abs=1e-9)
@@ -0,0 +1,164 @@
+"""
+Closure-table maintenance (signed path counts) against a rebuild and a
+brute-force path count.
+
+The statements of services/lineage_db.py run on an in-memory SQLite
+database through a small adapter for the PostgreSQL syntax they use
+(numbered parameters, casts, advisory locks, TRUNCATE, unnest).
+"""
+import asyncio
+import contextlib
+import re
+import sqlite3
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from app.services import lineage_db
+from app.services.lineage_db import LineageCycleError
+
+SCHEMA = """
+CREATE TABLE lineage (id TEXT PRIMARY KEY, source_dataset_id TEXT NOT NULL, target_dataset_id TEXT NOT NULL);
+CREATE TABLE lineage_closure (
+    ancestor_id TEXT NOT NULL, descendant_id TEXT NOT NULL, depth INTEGER NOT NULL, path_count NUMERIC NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id, depth)
+);
+"""
+
+
+class SQLiteAdapter:
+    """`fetch` / `execute` / `transaction` of app.supabase_client over SQLite."""
+
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _translate(sql: str) -> str:
+        sql = re.sub(r"::\w+(\[\])?", "", sql)
+        sql = re.sub(r"\$(\d+)", r"?\1", sql)
+        return re.sub(r"\bTRUNCATE\b", "DELETE FROM", sql)
+
+    def _run(self, sql: str, args: tuple):
+        if "pg_advisory_xact_lock" in sql:
+            return None
+        match = re.search(r"\(([^)]*)\) IN \(SELECT \* FROM unnest\(([^)]*)\)\)", sql)
+        if match:
+            # row-wise delete of the keys in the parallel arrays
+            columns = [c.strip() for c in match.group(1).split(",")]
+            sql = sql.replace(match.group(0), " AND ".join(f"{c} = ?" for c in columns))
+            cursor = None
+            for key in zip(*args):
+                cursor = self.conn.execute(self._translate(sql), key)
+            return cursor
+        return self.conn.execute(self._translate(sql), args)
+
+    async def fetch(self, sql: str, *args):
+        cursor = self._run(sql, args)
+        return cursor.fetchall() if cursor is not None else []
+
+    async def execute(self, sql: str, *args) -> str:
+        cursor = self._run(sql, args)
+        verb = sql.split()[0].upper()
+        count = cursor.rowcount if cursor is not None else 0
+        return f"INSERT 0 {count}" if verb == "INSERT" else f"{verb} {count}"
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        yield
+
+    def closure(self) -> dict:
+        rows = self.conn.execute("SELECT ancestor_id, descendant_id, depth, path_count FROM lineage_closure")
+        return {(a, d, depth): int(n) for a, d, depth, n in rows}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    adapter = SQLiteAdapter()
+    for name in ("fetch", "execute", "transaction"):
+        monkeypatch.setattr(lineage_db, name, getattr(adapter, name))
+    return adapter
+
+
+def _dag_edges(n_nodes: int, n_edges: int, seed: int) -> list:
+    """Random DAG edges (lower to higher node number), parallel edges included."""
+    rng = np.random.default_rng(seed)
+    edges = []
+    while len(edges) < n_edges:
+        a, b = sorted(rng.integers(n_nodes, size=2).tolist())
+        if a != b:
+            edges.append((f"e{len(edges)}", f"d{a:02d}", f"d{b:02d}"))
+    return edges
+
+
+def _path_counts(edges: list) -> dict:
+    """{(ancestor, descendant, length): number of paths}, by enumerating paths."""
+    out = {}
+    for _, s, t in edges:
+        out.setdefault(s, []).append(t)
+    counts = Counter()
+
+    def walk(start, node, length):
+        for nxt in out.get(node, []):
+            counts[(start, nxt, length + 1)] += 1
+            walk(start, nxt, length + 1)
+
+    for start in {s for _, s, _ in edges}:
+        walk(start, start, 0)
+    return dict(counts)
+
+
+def _add(db: SQLiteAdapter, edge: tuple) -> None:
+    db.conn.execute("INSERT INTO lineage VALUES (?, ?, ?)", edge)
+    asyncio.run(lineage_db.closure_add_edge(edge[1], edge[2]))
+
+
+def _remove(db: SQLiteAdapter, edge: tuple) -> None:
+    db.conn.execute("DELETE FROM lineage WHERE id = ?", (edge[0],))
+    asyncio.run(lineage_db.closure_remove_edge(edge[1], edge[2]))
+
+
+def test_insert_then_delete_matches_rebuild(db):
+    edges = _dag_edges(14, 40, seed=1)
+    for edge in edges:
+        _add(db, edge)
+    assert db.closure() == _path_counts(edges)
+
+    removed = edges[::3]
+    for edge in removed:
+        _remove(db, edge)
+    live = [edge for edge in edges if edge not in removed]
+    incremental = db.closure()
+    assert incremental == _path_counts(live)
+    assert all(n > 0 for n in incremental.values())  # emptied rows are deleted
+
+    total = asyncio.run(lineage_db.rebuild_closure())
+    assert db.closure() == incremental
+    assert total == len(incremental)
+
+
+def test_deleting_every_edge_empties_the_closure(db):
+    edges = _dag_edges(8, 15, seed=2)
+    for edge in edges:
+        _add(db, edge)
+    for edge in reversed(edges):
+        _remove(db, edge)
+    assert db.closure() == {}
+
+
+def test_cycle_is_rejected(db):
+    for edge in [("e0", "a", "b"), ("e1", "b", "c")]:
+        _add(db, edge)
+    with pytest.raises(LineageCycleError):
+        asyncio.run(lineage_db.closure_add_edge("c", "a"))
+    with pytest.raises(LineageCycleError):
+        asyncio.run(lineage_db.closure_add_edge("a", "a"))
+    assert db.closure() == _path_counts([("e0", "a", "b"), ("e1", "b", "c")])
+
+
+def test_rebuild_rejects_a_cycle(db):
+    db.conn.executemany("INSERT INTO lineage VALUES (?, ?, ?)", [("e0", "a", "b"), ("e1", "b", "a")])
+    with pytest.raises(LineageCycleError):
+        asyncio.run(lineage_db.rebuild_closure())
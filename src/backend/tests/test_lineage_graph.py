@@ -0,0 +1,105 @@
+"""The CSR lineage index (with its delta list and compaction) against a plain BFS."""
+from collections import deque
+
+import numpy as np
+import pytest
+
+from app.services.lineage_graph import DOWNSTREAM, UPSTREAM, LineageGraph
+
+JOB_TYPES = ["join", "filter", None]
+
+
+def _edges(n_nodes: int, n_edges: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "id": f"e{i}",
+            "source_dataset_id": f"d{rng.integers(n_nodes)}",
+            "target_dataset_id": f"d{rng.integers(n_nodes)}",
+            "job_name": f"job{i}",
+            "job_type": JOB_TYPES[i % len(JOB_TYPES)],
+            "confidence": 1.0,
+        }
+        for i in range(n_edges)
+    ]
+
+
+def _bfs(rows: list, start: str, direction: str, max_depth=None, job_types=None) -> dict:
+    """{dataset: depth} of every dataset reached from `start`, by brute force."""
+    walk_from, walk_to = (
+        ("source_dataset_id", "target_dataset_id") if direction == DOWNSTREAM
+        else ("target_dataset_id", "source_dataset_id")
+    )
+    depth = {start: 0}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        if max_depth is not None and depth[node] >= max_depth:
+            continue
+        for row in rows:
+            if row[walk_from] == node and row[walk_to] not in depth:
+                if job_types is None or row["job_type"] in job_types:
+                    depth[row[walk_to]] = depth[node] + 1
+                    queue.append(row[walk_to])
+    del depth[start]
+    return depth
+
+
+def _check(graph: LineageGraph, rows: list, starts, **kwargs) -> None:
+    for start in starts:
+        for direction in (DOWNSTREAM, UPSTREAM):
+            result = graph.query(start, direction, paths=True, **kwargs)
+            got = {node["dataset_id"]: node["depth"] for node in result["nodes"]}
+            assert got == _bfs(rows, start, direction, **kwargs)
+            for node in result["nodes"]:
+                # each path is a chain of live edges of the reported length
+                path = node["path"]
+                assert path[0] == start and len(path) == node["depth"] + 1
+                via = node["via"]
+                ends = (via["source_id"], via["target_id"])
+                assert ends == ((path[-2], path[-1]) if direction == DOWNSTREAM else (path[-1], path[-2]))
+
+
+@pytest.mark.parametrize("compact", [True, False])
+def test_add_forget_and_compact_match_bfs(compact):
+    rows = _edges(60, 240, seed=1)
+    graph = LineageGraph.from_rows(rows[:100])
+    for row in rows[100:]:
+        graph.add_edge(row, compact=compact)  # without compaction, these stay in the delta list
+    starts = [f"d{i}" for i in range(0, 60, 7)]
+    _check(graph, rows, starts)
+
+    removed = {row["id"] for row in rows[::3]}
+    for row_id in removed:
+        assert graph.remove_edge(row_id)
+    assert not graph.remove_edge("e0")
+    live = [row for row in rows if row["id"] not in removed]
+    assert graph.edge_count == len(live)
+    _check(graph, live, starts)
+
+    graph.compact()
+    _check(graph, live, starts)
+    _check(graph, live, starts, max_depth=2)
+    _check(graph, live, starts, job_types=["join"])
+
+
+def test_readding_an_edge_is_ignored():
+    rows = _edges(10, 20, seed=2)
+    graph = LineageGraph.from_rows(rows)
+    graph.add_edge(rows[0])
+    assert graph.edge_count == 20
+    assert rows[0]["id"] in graph
+
+
+def test_edges_of_the_traversed_subgraph():
+    rows = _edges(30, 90, seed=3)
+    graph = LineageGraph.from_rows(rows)
+    result = graph.query("d0", DOWNSTREAM)
+    visited = {"d0"} | {node["dataset_id"] for node in result["nodes"]}
+    expected = {row["id"] for row in rows if row["source_dataset_id"] in visited and row["target_dataset_id"] in visited}
+    assert {edge["id"] for edge in result["edges"]} == expected
+
+
+def test_unknown_dataset():
+    graph = LineageGraph.from_rows(_edges(5, 5, seed=4))
+    assert graph.query("nowhere") == {"nodes": [], "edges": []}
@@ -0,0 +1,66 @@
+"""List responses: unpaged requests return every row, paged ones a cursor."""
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.utils import pagination
+
+COLUMNS = {name: name for name in ("id", "name", "created_at")}
+ROWS = [
+    {"id": f"r{i}", "name": f"row {i}", "created_at": datetime(2024, 1, 1) - timedelta(minutes=i)}
+    for i in range(250)
+]
+
+
+@pytest.fixture
+def table(monkeypatch):
+    async def table_stream(table, columns, filters, order_by, after=None, limit=None, prefetch=500):
+        for row in ROWS[:limit]:
+            yield dict(row)
+
+    async def table_select_page(table, columns, filters, order_by, limit, after=None):
+        start = 0 if after is None else next(i for i, row in enumerate(ROWS) if row["id"] == after[1]) + 1
+        page = [dict(row) for row in ROWS[start:start + limit]]
+        more = start + limit < len(ROWS)
+        return page, (page[-1]["created_at"], page[-1]["id"]) if more else None
+
+    monkeypatch.setattr(pagination, "table_stream", table_stream)
+    monkeypatch.setattr(pagination, "table_select_page", table_select_page)
+
+
+def _body(response) -> str:
+    if hasattr(response, "body_iterator"):
+        async def read():
+            return "".join([chunk async for chunk in response.body_iterator])
+        return asyncio.run(read())
+    return response.body.decode()
+
+
+def _list(**kwargs):
+    return asyncio.run(pagination.list_response("items", COLUMNS, ["id", "name"], **kwargs))
+
+
+def test_unpaged_returns_every_row(table):
+    response = _list()
+    assert pagination.NEXT_CURSOR_HEADER not in response.headers
+    assert [row["id"] for row in json.loads(_body(response))] == [row["id"] for row in ROWS]
+
+
+def test_paged_follows_cursor(table):
+    seen, cursor = [], None
+    while True:
+        response = _list(limit=100, cursor=cursor)
+        page = json.loads(_body(response))
+        assert len(page) <= 100 and set(page[0]) == {"id", "name"}
+        seen += [row["id"] for row in page]
+        cursor = response.headers.get(pagination.NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+    assert seen == [row["id"] for row in ROWS]
+
+
+def test_ndjson_streams_rows(table):
+    lines = _body(_list(format="ndjson", limit=120)).splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [row["id"] for row in ROWS[:120]]
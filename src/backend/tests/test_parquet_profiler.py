@@ -0,0 +1,25 @@
+"""Row-group profiles of Parquet files against pandas reading the whole file."""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.services.parquet_profiler import ParquetProfiler
+from app.services.profiler import DatasetProfiler
+
+
+@pytest.mark.parametrize("nulls_first", [False, True])
+def test_all_null_row_group_of_int_column(tmp_path, nulls_first):
+    """An int column whose nulls fill one row group reads as float64, as in pandas."""
+    values = [None] * 1_000 + list(range(1_000))
+    if not nulls_first:
+        values = values[1_000:] + values[:1_000]
+    path = str(tmp_path / "ints.parquet")
+    table = pa.table({"a": pa.array(values, type=pa.int64()), "b": pa.array(np.arange(2_000))})
+    pq.write_table(table, path, row_group_size=1_000)
+
+    got = ParquetProfiler.profile(path)["profile"]["columns_metadata"]
+    whole = DatasetProfiler.profile(pd.read_parquet(path))["columns_metadata"]
+    for col in ("a", "b"):
+        assert (got[col]["dtype"], got[col]["null_count"]) == (whole[col]["dtype"], whole[col]["null_count"])
@@ -0,0 +1,131 @@
+"""Merged and incremental profiles against a single pass over the whole frame."""
+import io
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.profiler import DatasetProfiler, IncrementalProfiler
+
+HLL_ERROR = 3 * 1.04 / math.sqrt(1 << 14)  # three standard errors at p=14
+
+
+@pytest.fixture
+def frame() -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    rows = 40_000
+    amount = rng.gamma(2.0, 50.0, size=rows)
+    amount[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "amount": amount,
+        "score": rng.integers(0, 5_000, size=rows),
+        "city": rng.choice(["Berlin", "Paris", "Rome", "Oslo", "Lima"], size=rows),
+    })
+
+
+def check_approximate(whole: dict, got: dict, values: pd.DataFrame) -> None:
+    """Exact where the sketches are exact, within the stated error elsewhere."""
+    assert list(got["columns_metadata"]) == list(whole["columns_metadata"])
+    for col, meta in whole["columns_metadata"].items():
+        other = got["columns_metadata"][col]
+        assert (other["dtype"], other["null_count"]) == (meta["dtype"], meta["null_count"])
+        assert other["null_percentage"] == pytest.approx(meta["null_percentage"])
+        assert abs(other["cardinality"] - meta["cardinality"]) <= max(1, HLL_ERROR * meta["cardinality"])
+    for col, stats in whole["statistics"].items():
+        other = got["statistics"][col]
+        assert (other["min"], other["max"]) == (stats["min"], stats["max"])
+        assert other["mean"] == pytest.approx(stats["mean"], rel=1e-9)
+        assert other["std"] == pytest.approx(stats["std"], rel=1e-9)
+        valid = np.sort(values[col].dropna().to_numpy(dtype=np.float64))
+        rank = np.searchsorted(valid, other["median"]) / len(valid)
+        assert abs(rank - 0.5) <= 2 * got["sketches"]["columns"][col]["rank_error"] + 1 / len(valid)
+
+
+def test_merged_chunks_match_single_pass(frame):
+    whole = DatasetProfiler.profile(frame)
+    parts = [DatasetProfiler.profile(frame.iloc[start:start + 7_000]) for start in range(0, len(frame), 7_000)]
+    merged = DatasetProfiler.merge(parts)
+    check_approximate(whole, merged, frame)
+    assert merged["sample_rows"] == whole["sample_rows"]
+
+
+def test_merge_order_does_not_matter(frame):
+    parts = [DatasetProfiler.profile(frame.iloc[start:start + 10_000]) for start in range(0, len(frame), 10_000)]
+    forward = DatasetProfiler.merge(parts)
+    backward = DatasetProfiler.merge(parts[::-1])
+    for section in ("columns_metadata", "statistics"):
+        for col, metrics in forward[section].items():
+            for key, value in metrics.items():
+                if key == "median":
+                    continue  # KLL compaction depends on arrival order; bounded above
+                assert backward[section][col][key] == pytest.approx(value, rel=1e-9)
+
+
+def test_incremental_dataframes_match_single_pass(frame):
+    incremental = IncrementalProfiler()
+    for start in range(0, len(frame), 3_000):
+        incremental.feed_dataframe(frame.iloc[start:start + 3_000])
+    assert (incremental.row_count, incremental.column_count) == frame.shape
+    check_approximate(DatasetProfiler.profile(frame), incremental.result(), frame)
+
+
+def test_incremental_csv_matches_single_pass(frame):
+    data = frame.to_csv(index=False).encode()
+    parsed = pd.read_csv(io.BytesIO(data))
+    incremental = IncrementalProfiler(buffer_size=64 * 1024)
+    for start in range(0, len(data), 10_000):
+        incremental.feed_csv(data[start:start + 10_000])
+    incremental.finish_csv()
+    assert incremental.row_count == len(frame)
+    check_approximate(DatasetProfiler.profile(parsed), incremental.result(), parsed)
+
+
+def _feed_csv(data: bytes, buffer_size: int, chunk: int = 1_000) -> IncrementalProfiler:
+    incremental = IncrementalProfiler(buffer_size=buffer_size)
+    for start in range(0, len(data), chunk):
+        incremental.feed_csv(data[start:start + chunk])
+    incremental.finish_csv()
+    return incremental
+
+
+def test_incremental_csv_header_only():
+    data = b"id,city\n"
+    incremental = _feed_csv(data, buffer_size=1024)
+    whole = DatasetProfiler.profile(pd.read_csv(io.BytesIO(data)))
+    assert (incremental.row_count, incremental.column_count) == (0, 2)
+    assert incremental.result()["columns_metadata"] == whole["columns_metadata"]
+
+
+def test_incremental_csv_locks_text_columns():
+    """Buffers of only digits in a text column are read as text, as a whole-file parse does."""
+    rng = np.random.default_rng(5)
+    keys = [str(k) for k in rng.integers(0, 2_000, size=10_000)]
+    keys[0] = "x" + keys[0]  # text in the first buffer only
+    data = pd.DataFrame({"key": keys}).to_csv(index=False).encode()
+    parsed = pd.read_csv(io.BytesIO(data))
+    check_approximate(DatasetProfiler.profile(parsed), _feed_csv(data, buffer_size=4_000).result(), parsed)
+
+
+def test_incremental_csv_float_turning_text():
+    values = [f"{v:.2f}" for v in np.random.default_rng(6).random(5_000)] + ["unknown"]
+    data = pd.DataFrame({"value": values}).to_csv(index=False).encode()
+    incremental = _feed_csv(data, buffer_size=4_000)
+    meta = incremental.result()["columns_metadata"]["value"]
+    assert (incremental.row_count, meta["dtype"], meta["null_count"]) == (5_001, "object", 0)
+
+
+def test_profiling_needs_no_database_settings(monkeypatch):
+    """CPU-only profiling (scripts, benchmarks) runs without DATABASE_URL."""
+    from pydantic import ValidationError
+
+    from app import config
+
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setattr(config, "_settings_instance", None)
+    monkeypatch.setattr(config, "_profiling_settings_instance", None)
+    profile = DatasetProfiler.profile(pd.DataFrame({"city": ["Oslo", "Lima", None], "n": [1, 2, 3]}))
+    assert profile["sketches"]["columns"]["city"]["semantic"]["values"] == 2
+    with pytest.raises(ValidationError):
+        config.get_settings()  # the app's own settings still require it
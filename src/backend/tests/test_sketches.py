@@ -0,0 +1,109 @@
+"""Mergeable sketches: error bounds, serialization and merge associativity."""
+import base64
+import math
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.sketches import HyperLogLog, KLLSketch, ProfileSketch
+
+
+def _frame(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(size=rows)
+    values[rng.random(rows) < 0.1] = np.nan
+    return pd.DataFrame({
+        "value": values,
+        "count": rng.integers(0, 1000, size=rows),
+        "city": rng.choice(["Berlin", "Paris", "Rome", None], size=rows),
+    })
+
+
+@pytest.mark.parametrize("n", [10, 1_000, 50_000, 300_000])
+def test_hll_within_error(n):
+    hll = HyperLogLog()
+    hll.update(np.arange(n, dtype=np.float64))
+    # three standard errors of 1.04 / sqrt(m)
+    assert abs(hll.count() - n) <= 3 * 1.04 / math.sqrt(hll.m) * n
+
+
+def test_hll_merge_matches_union():
+    a, b, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    a.update(np.arange(0, 60_000, dtype=np.float64))
+    b.update(np.arange(40_000, 100_000, dtype=np.float64))
+    both.update(np.arange(0, 100_000, dtype=np.float64))
+    assert np.array_equal(a.merge(b).registers, both.registers)
+
+
+@pytest.mark.parametrize("n", [0, 10, 1_000, 100_000])
+def test_hll_roundtrip(n):
+    hll = HyperLogLog()
+    hll.update(np.array([f"v{i}" for i in range(n)], dtype=object))
+    restored = HyperLogLog.from_dict(hll.to_dict())
+    assert np.array_equal(restored.registers, hll.registers)
+
+
+def test_hll_reads_dense_registers():
+    """Sketches stored before the sparse encoding still load."""
+    hll = HyperLogLog()
+    hll.update(np.arange(5_000, dtype=np.float64))
+    stored = {"p": hll.p, "registers": base64.b64encode(zlib.compress(hll.registers.tobytes())).decode("ascii")}
+    assert np.array_equal(HyperLogLog.from_dict(stored).registers, hll.registers)
+
+
+@pytest.mark.parametrize("batches", [1, 7, 50])
+def test_kll_within_rank_error(batches):
+    rng = np.random.default_rng(3)
+    values = rng.normal(size=200_000)
+    kll = KLLSketch()
+    for part in np.array_split(values, batches):
+        part_sketch = KLLSketch(seed=len(part))
+        part_sketch.update(part)
+        kll.merge(part_sketch)
+    qs = np.linspace(0.01, 0.99, 99)
+    ranks = np.searchsorted(np.sort(values), kll.quantiles(qs)) / len(values)
+    # rank_error is a typical bound; allow twice that for the worst of 99 quantiles
+    assert np.max(np.abs(ranks - qs)) <= 2 * kll.rank_error
+
+
+def test_kll_exact_until_compacted():
+    kll = KLLSketch()
+    kll.update([3.0, 1.0, np.nan, 2.0])
+    assert (kll.n, kll.rank_error, kll.quantile(0.5)) == (3, 0.0, 2.0)
+
+
+def _summary(sketch: ProfileSketch) -> dict:
+    """Everything a merge must reproduce exactly (floating-point moments aside)."""
+    return {
+        col: (
+            c.dtype, c.rows, c.null_count, c.hll.registers.tobytes(),
+            c.moments.n, c.moments.min, c.moments.max, c.kll.n, c.top.top(),
+        )
+        for col, c in sketch.columns.items()
+    }
+
+
+def test_profile_sketch_merge_is_associative():
+    parts = [ProfileSketch.from_dataframe(_frame(rows, seed)) for seed, rows in enumerate((3_000, 500, 8_000))]
+    a, b, c = (ProfileSketch.from_dict(p.to_dict(), p.sample_rows) for p in parts)
+    left = ProfileSketch.merge_all([ProfileSketch.merge_all([a, b]), c])
+    a, b, c = (ProfileSketch.from_dict(p.to_dict(), p.sample_rows) for p in parts)
+    right = ProfileSketch.merge_all([a, ProfileSketch.merge_all([b, c])])
+
+    assert left.row_count == right.row_count == 11_500
+    assert _summary(left) == _summary(right)
+    for col in ("value", "count"):
+        lm, rm = left.columns[col].moments, right.columns[col].moments
+        assert lm.mean == pytest.approx(rm.mean, rel=1e-12)
+        assert lm.std == pytest.approx(rm.std, rel=1e-12)
+    assert left.sample_rows == right.sample_rows == parts[0].sample_rows
+
+
+def test_profile_sketch_merge_adds_missing_columns():
+    first = ProfileSketch.from_dataframe(pd.DataFrame({"a": [1.0, 2.0]}))
+    second = ProfileSketch.from_dataframe(pd.DataFrame({"b": ["x", "y", "z"]}))
+    merged = first.merge(second)
+    assert (merged.columns["a"].rows, merged.columns["a"].null_count) == (5, 3)
+    assert (merged.columns["b"].rows, merged.columns["b"].null_count) == (5, 2)